@@ -0,0 +1,69 @@
+"""Baseline: tabela videos como criada por init_db()
+
+Bancos já existentes (criados via Base.metadata.create_all) devem ser marcados
+com `alembic stamp 0001` antes de aplicar as próximas migrações.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models.video import VideoStatus
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "videos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("youtube_id", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(500), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("thumbnail_url", sa.String(500)),
+        sa.Column("duration_seconds", sa.Integer(), nullable=False),
+        sa.Column("channel_name", sa.String(200)),
+        sa.Column("channel_id", sa.String(100)),
+        sa.Column("channel_thumbnail", sa.String(500)),
+        sa.Column("published_at", sa.DateTime()),
+        sa.Column("view_count", sa.Integer()),
+        sa.Column("like_count", sa.Integer()),
+        sa.Column("comment_count", sa.Integer()),
+        sa.Column("status", sa.Enum(VideoStatus, name="videostatus"), nullable=False),
+        sa.Column("video_path", sa.String(500)),
+        sa.Column("audio_path", sa.String(500)),
+        sa.Column("transcript_path", sa.String(500)),
+        sa.Column("download_progress", sa.Float()),
+        sa.Column("download_error", sa.Text()),
+        sa.Column("audio_extraction_progress", sa.Float()),
+        sa.Column("audio_extraction_error", sa.Text()),
+        sa.Column("transcription_progress", sa.Float()),
+        sa.Column("transcription_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("downloaded_at", sa.DateTime()),
+        sa.Column("extracted_at", sa.DateTime()),
+        sa.Column("transcribed_at", sa.DateTime()),
+        sa.Column("analyzed_at", sa.DateTime()),
+        sa.Column("download_reviewed_at", sa.DateTime()),
+        sa.Column("audio_reviewed_at", sa.DateTime()),
+        sa.Column("transcription_reviewed_at", sa.DateTime()),
+        sa.Column("highlights_reviewed_at", sa.DateTime()),
+        sa.Column("cutting_reviewed_at", sa.DateTime()),
+        sa.Column("ranking_reviewed_at", sa.DateTime()),
+        sa.Column("subtitles_reviewed_at", sa.DateTime()),
+        sa.Column("deleted_at", sa.DateTime()),
+    )
+    op.create_index("ix_videos_id", "videos", ["id"])
+    op.create_index("ix_videos_youtube_id", "videos", ["youtube_id"], unique=True)
+    op.create_index("ix_videos_status", "videos", ["status"])
+
+def downgrade():
+    op.drop_index("ix_videos_status", table_name="videos")
+    op.drop_index("ix_videos_youtube_id", table_name="videos")
+    op.drop_index("ix_videos_id", table_name="videos")
+    op.drop_table("videos")
+    sa.Enum(name="videostatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,41 @@
+"""Índices parciais para vídeos ativos (deleted_at IS NULL)
+
+Listagem, filtro por status e contagem filtram sempre `deleted_at IS NULL`
+e ordenam por `created_at`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("deleted_at IS NULL")
+
+def upgrade():
+    op.create_index(
+        "ix_videos_active_status_created",
+        "videos",
+        ["status", "created_at"],
+        postgresql_where=ACTIVE,
+        sqlite_where=ACTIVE,
+    )
+    op.create_index(
+        "ix_videos_active_created",
+        "videos",
+        ["created_at", "id"],
+        postgresql_where=ACTIVE,
+        sqlite_where=ACTIVE,
+    )
+    # Redundante com o parcial (status, created_at); empatava com ele no planner
+    op.drop_index("ix_videos_status", table_name="videos")
+
+def downgrade():
+    op.create_index("ix_videos_status", "videos", ["status"])
+    op.drop_index("ix_videos_active_created", table_name="videos")
+    op.drop_index("ix_videos_active_status_created", table_name="videos")
@@ -0,0 +1,41 @@
+"""Tabela stage_runs com o histórico de execuções por etapa
+
+Progresso de alta frequência passa a ser gravado nessa tabela estreita;
+`videos` ganha apenas o ponteiro `current_stage_run_id`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "stage_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("stage", sa.String(50), nullable=False),
+        sa.Column("attempt", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("progress", sa.Float(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("duration_seconds", sa.Float()),
+        sa.Column("error", sa.Text()),
+        sa.Column("worker", sa.String(100)),
+    )
+    op.create_index("ix_stage_runs_video_stage_attempt", "stage_runs", ["video_id", "stage", "attempt"], unique=True)
+    op.create_index("ix_stage_runs_stage_status", "stage_runs", ["stage", "status"])
+    op.add_column("videos", sa.Column("current_stage_run_id", sa.Integer()))
+
+def downgrade():
+    op.drop_column("videos", "current_stage_run_id")
+    op.drop_index("ix_stage_runs_stage_status", table_name="stage_runs")
+    op.drop_index("ix_stage_runs_video_stage_attempt", table_name="stage_runs")
+    op.drop_table("stage_runs")
@@ -0,0 +1,19 @@
+"""Registro do remux fast-start após o download
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("faststart_at", sa.DateTime()))
+
+def downgrade():
+    op.drop_column("videos", "faststart_at")
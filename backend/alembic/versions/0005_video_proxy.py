@@ -0,0 +1,19 @@
+"""Rendição proxy para o player de revisão
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("proxy_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "proxy_path")
@@ -0,0 +1,19 @@
+"""Diretório HLS (fMP4) do vídeo
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("hls_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "hls_path")
@@ -0,0 +1,40 @@
+"""Tabela media_probes com o ffprobe de cada vídeo (inclui keyframes)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "media_probes",
+        sa.Column("video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("probed_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("file_mtime", sa.Float(), nullable=False),
+        sa.Column("format_name", sa.String(100)),
+        sa.Column("duration_seconds", sa.Float()),
+        sa.Column("bit_rate", sa.BigInteger()),
+        sa.Column("video_codec", sa.String(50)),
+        sa.Column("width", sa.Integer()),
+        sa.Column("height", sa.Integer()),
+        sa.Column("fps", sa.Float()),
+        sa.Column("video_bit_rate", sa.BigInteger()),
+        sa.Column("audio_codec", sa.String(50)),
+        sa.Column("audio_sample_rate", sa.Integer()),
+        sa.Column("audio_channels", sa.Integer()),
+        sa.Column("audio_bit_rate", sa.BigInteger()),
+        sa.Column("streams_json", sa.Text()),
+        sa.Column("keyframes", sa.LargeBinary()),
+        sa.Column("keyframe_count", sa.Integer(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("media_probes")
@@ -0,0 +1,21 @@
+"""PCM decodificado e hash do áudio do vídeo
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("pcm_path", sa.String(500)))
+    op.add_column("videos", sa.Column("audio_sha256", sa.String(64)))
+
+def downgrade():
+    op.drop_column("videos", "audio_sha256")
+    op.drop_column("videos", "pcm_path")
@@ -0,0 +1,19 @@
+"""Picos da waveform do vídeo
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("waveform_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "waveform_path")
@@ -0,0 +1,19 @@
+"""Features de sinal (loudness, fluxo espectral, fala) do vídeo
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("features_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "features_path")
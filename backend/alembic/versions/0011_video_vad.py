@@ -0,0 +1,19 @@
+"""Intervalos de fala do pré-passe de VAD
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("vad_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "vad_path")
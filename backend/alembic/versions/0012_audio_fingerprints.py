@@ -0,0 +1,42 @@
+"""Fingerprints de áudio (tabela hash) e sobreposições entre vídeos
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "audio_fingerprints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("hash", sa.Integer(), nullable=False),
+        sa.Column("video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("offset", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_audio_fingerprints_hash", "audio_fingerprints", ["hash"])
+    op.create_index("ix_audio_fingerprints_video_id", "audio_fingerprints", ["video_id"])
+    op.create_table(
+        "audio_matches",
+        sa.Column("video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("source_video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("offset_seconds", sa.Float(), nullable=False),
+        sa.Column("start_seconds", sa.Float(), nullable=False),
+        sa.Column("end_seconds", sa.Float(), nullable=False),
+        sa.Column("votes", sa.Integer(), nullable=False),
+        sa.Column("matched_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.add_column("videos", sa.Column("fingerprint_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "fingerprint_path")
+    op.drop_table("audio_matches")
+    op.drop_index("ix_audio_fingerprints_video_id", table_name="audio_fingerprints")
+    op.drop_index("ix_audio_fingerprints_hash", table_name="audio_fingerprints")
+    op.drop_table("audio_fingerprints")
@@ -0,0 +1,19 @@
+"""Timestamps por palavra da transcrição (arquivo colunar)
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("words_path", sa.String(500)))
+
+def downgrade():
+    op.drop_column("videos", "words_path")
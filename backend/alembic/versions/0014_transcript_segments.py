@@ -0,0 +1,31 @@
+"""Segmentos da transcrição no banco
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "transcript_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("video_id", sa.Integer(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("idx", sa.Integer(), nullable=False),
+        sa.Column("start", sa.Float(), nullable=False),
+        sa.Column("end", sa.Float(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.UniqueConstraint("video_id", "idx", name="uq_transcript_segments_video_idx"),
+    )
+    op.create_index("ix_transcript_segments_video_start", "transcript_segments", ["video_id", "start"])
+    # Transcrições existentes são carregadas sob demanda na primeira consulta
+
+def downgrade():
+    op.drop_index("ix_transcript_segments_video_start", table_name="transcript_segments")
+    op.drop_table("transcript_segments")
@@ -0,0 +1,19 @@
+"""Versão da transcrição para edições com concorrência otimista
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015"
+down_revision = "0014"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("videos", sa.Column("transcript_version", sa.Integer(), server_default="0", nullable=False))
+
+def downgrade():
+    op.drop_column("videos", "transcript_version")
@@ -0,0 +1,21 @@
+"""Marcas de edição e realinhamento dos segmentos da transcrição
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0016"
+down_revision = "0015"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("transcript_segments", sa.Column("edited_at", sa.DateTime()))
+    op.add_column("transcript_segments", sa.Column("aligned_at", sa.DateTime()))
+
+def downgrade():
+    op.drop_column("transcript_segments", "aligned_at")
+    op.drop_column("transcript_segments", "edited_at")
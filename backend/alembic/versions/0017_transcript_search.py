@@ -0,0 +1,28 @@
+"""Índice de busca textual (tsvector em português) nos segmentos da transcrição
+
+Expressão idêntica à de `search_vector()` em app/services/transcript_search.py.
+No SQLite a busca usa LIKE e não há índice.
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0017"
+down_revision = "0016"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "CREATE INDEX ix_transcript_segments_search ON transcript_segments "
+        "USING gin (to_tsvector('portuguese', text))"
+    )
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX ix_transcript_segments_search")
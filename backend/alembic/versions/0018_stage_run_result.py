@@ -0,0 +1,19 @@
+"""Resumo do resultado da execução de uma etapa
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0018"
+down_revision = "0017"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("stage_runs", sa.Column("result", sa.Text()))
+
+def downgrade():
+    op.drop_column("stage_runs", "result")
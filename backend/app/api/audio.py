@@ -1,9 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.db.database import get_db
+from app.api.responses import media_file_response, validator_headers, is_not_modified, not_modified
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import get_live_progress
+from app.services.waveform import (
+    WAVEFORM_LEVELS,
+    OVERVIEW_LEVEL,
+    MAX_WAVEFORM_PIXELS,
+    build_waveform,
+    load_waveform,
+    waveform_payload,
+)
+from app.services.features import FEATURE_RATE, FEATURE_NAMES, load_features, feature_window
+from app.services.vad import load_intervals
+from app.services.fingerprint import get_overlap
 from datetime import datetime
 from loguru import logger
+import os
 
 router = APIRouter()
 
@@ -38,6 +56,16 @@ async def extract_audio(
     from app.services.audio_extraction import extract_audio_task
     background_tasks.add_task(extract_audio_task, video_id)
     
+    # Rodam após a extração (background tasks são sequenciais) sobre o PCM gerado
+    from app.services.features import compute_features_task
+    background_tasks.add_task(compute_features_task, video_id)
+    
+    from app.services.vad import detect_speech_task
+    background_tasks.add_task(detect_speech_task, video_id)
+    
+    from app.services.fingerprint import fingerprint_task
+    background_tasks.add_task(fingerprint_task, video_id)
+    
     logger.info(f"Extração de áudio iniciada para vídeo: {video.id}")
     
     return {"message": "Extração de áudio iniciada", "video_id": video_id}
@@ -53,7 +81,7 @@ async def get_audio_progress(video_id: int, db: Session = Depends(get_db)):
     return {
         "video_id": video_id,
         "status": video.status.value,
-        "progress": getattr(video, 'audio_extraction_progress', 0),
+        "progress": get_live_progress(db, video, PipelineStage.audio_extraction, video.audio_extraction_progress),
         "error": getattr(video, 'audio_extraction_error', None)
     }
 
@@ -88,11 +116,6 @@ async def review_audio(video_id: int, db: Session = Depends(get_db)):
 @router.get("/{video_id}/audio-stream")
 async def stream_audio(video_id: int, request: Request, db: Session = Depends(get_db)):
     """Retorna o arquivo de áudio para streaming com suporte a range requests"""
-    from fastapi.responses import StreamingResponse
-    from pathlib import Path
-    import re
-    import os
-    
     video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
     
     if not video:
@@ -101,57 +124,192 @@ async def stream_audio(video_id: int, request: Request, db: Session = Depends(ge
     if not video.audio_path or not os.path.exists(video.audio_path):
         raise HTTPException(status_code=404, detail="Arquivo de áudio não encontrado")
     
-    file_path = Path(video.audio_path)
-    file_size = file_path.stat().st_size
-    
-    # Verifica se há Range request (para seek no player)
-    range_header = request.headers.get("range")
-    
-    if range_header:
-        # Parse do range header (formato: "bytes=start-end")
-        range_match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-        if range_match:
-            start = int(range_match.group(1))
-            end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
-            
-            # Valida range
-            if start >= file_size:
-                raise HTTPException(status_code=416, detail="Range Not Satisfiable")
-            
-            end = min(end, file_size - 1)
-            content_length = end - start + 1
-            
-            def iterfile():
-                with open(file_path, 'rb') as f:
-                    f.seek(start)
-                    remaining = content_length
-                    while remaining > 0:
-                        chunk_size = min(8192, remaining)
-                        data = f.read(chunk_size)
-                        if not data:
-                            break
-                        remaining -= len(data)
-                        yield data
-            
-            headers = {
-                'Content-Range': f'bytes {start}-{end}/{file_size}',
-                'Accept-Ranges': 'bytes',
-                'Content-Length': str(content_length),
-                'Content-Type': 'audio/mpeg',
-            }
-            
-            return StreamingResponse(iterfile(), status_code=206, headers=headers)
-    
-    # Sem range request, retorna o arquivo completo
-    def iterfile():
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                yield chunk
-    
-    headers = {
-        'Accept-Ranges': 'bytes',
-        'Content-Length': str(file_size),
-        'Content-Type': 'audio/mpeg',
+    return media_file_response(request, video.audio_path, media_type="audio/mpeg")
+
+@router.get("/{video_id}/waveform")
+async def get_waveform(
+    video_id: int,
+    request: Request,
+    zoom: int = Query(OVERVIEW_LEVEL, description=f"Amostras por pixel: {', '.join(map(str, WAVEFORM_LEVELS))}"),
+    start: float = Query(0.0, ge=0, description="Início da janela (s)"),
+    end: Optional[float] = Query(None, gt=0, description="Fim da janela (s)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna os picos pré-calculados da waveform (JSON no formato do audiowaveform).
+    Sem `zoom` devolve a visão geral do vídeo inteiro; níveis finos pedem uma janela.
+    """
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if zoom not in WAVEFORM_LEVELS:
+        raise HTTPException(status_code=400, detail=f"zoom deve ser um de {list(WAVEFORM_LEVELS)}")
+    
+    if not video.waveform_path or not os.path.exists(video.waveform_path):
+        # Vídeos extraídos antes dos picos: gera sob demanda a partir do PCM
+        if not video.pcm_path or not os.path.exists(video.pcm_path):
+            raise HTTPException(status_code=404, detail="Waveform não disponível")
+        waveform_path = f"{os.path.splitext(video.pcm_path)[0]}.peaks.npz"
+        await run_in_threadpool(build_waveform, video.pcm_path, waveform_path)
+        video.waveform_path = waveform_path
+        db.commit()
+    
+    stat_result = os.stat(video.waveform_path)
+    if is_not_modified(request.headers, stat_result):
+        return not_modified(stat_result)
+    
+    sample_rate, peaks = load_waveform(video.waveform_path)
+    seconds_per_pixel = zoom / sample_rate
+    window_end = end if end is not None else len(peaks[zoom]) * seconds_per_pixel
+    if (window_end - start) / seconds_per_pixel > MAX_WAVEFORM_PIXELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Janela grande demais para zoom={zoom}: informe start/end (máx. {MAX_WAVEFORM_PIXELS} pixels)"
+        )
+    payload = waveform_payload(peaks[zoom], zoom, sample_rate, start, end)
+    return ORJSONResponse(payload, headers=validator_headers(stat_result))
+
+@router.post("/{video_id}/features")
+async def start_features(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """(Re)calcula as features de sinal a partir do PCM decodificado"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.pcm_path or not os.path.exists(video.pcm_path):
+        raise HTTPException(status_code=400, detail="Áudio precisa estar extraído para calcular as features")
+    
+    from app.services.features import compute_features_task
+    background_tasks.add_task(compute_features_task, video_id)
+    
+    logger.info(f"Cálculo de features agendado para vídeo: {video.id}")
+    
+    return {"message": "Cálculo de features iniciado", "video_id": video_id}
+
+@router.get("/{video_id}/features")
+async def get_features(
+    video_id: int,
+    request: Request,
+    start: float = Query(0.0, ge=0, description="Início da janela (s)"),
+    end: Optional[float] = Query(None, gt=0, description="Fim da janela (s)"),
+    db: Session = Depends(get_db)
+):
+    """Retorna loudness, fluxo espectral e máscara de fala (10 Hz) de uma janela de tempo"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.features_path or not os.path.exists(video.features_path):
+        raise HTTPException(status_code=404, detail="Features não calculadas para este vídeo")
+    
+    stat_result = os.stat(video.features_path)
+    if is_not_modified(request.headers, stat_result):
+        return not_modified(stat_result)
+    
+    first, window = feature_window(load_features(video.features_path), start, end)
+    payload = {
+        "video_id": video_id,
+        "frame_rate": FEATURE_RATE,
+        "start": first / FEATURE_RATE,
+        "length": len(window["rms_db"]),
+    }
+    for name in FEATURE_NAMES:
+        values = window[name]
+        payload[name] = values.tolist() if name == "speech" else values.round(2).tolist()
+    
+    return ORJSONResponse(payload, headers=validator_headers(stat_result))
+
+@router.post("/{video_id}/vad")
+async def start_vad(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """(Re)detecta os trechos de fala usados para pular silêncio/música na transcrição"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.pcm_path or not os.path.exists(video.pcm_path):
+        raise HTTPException(status_code=400, detail="Áudio precisa estar extraído para detectar fala")
+    
+    from app.services.vad import detect_speech_task
+    background_tasks.add_task(detect_speech_task, video_id)
+    
+    logger.info(f"Detecção de fala agendada para vídeo: {video.id}")
+    
+    return {"message": "Detecção de fala iniciada", "video_id": video_id}
+
+@router.get("/{video_id}/speech-intervals")
+async def get_speech_intervals(video_id: int, db: Session = Depends(get_db)):
+    """Retorna os trechos de fala detectados (segundos)"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.vad_path or not os.path.exists(video.vad_path):
+        raise HTTPException(status_code=404, detail="Trechos de fala não detectados para este vídeo")
+    
+    intervals = load_intervals(video.vad_path)
+    speech_seconds = float((intervals[:, 1] - intervals[:, 0]).sum()) if len(intervals) else 0.0
+    
+    return {
+        "video_id": video_id,
+        "speech_seconds": round(speech_seconds, 2),
+        "speech_ratio": round(speech_seconds / video.duration_seconds, 3) if video.duration_seconds else None,
+        "intervals": intervals.round(3).tolist()
     }
+
+@router.post("/{video_id}/fingerprint")
+async def start_fingerprint(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """(Re)calcula o fingerprint do áudio e procura trechos em comum com outros vídeos"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.pcm_path or not os.path.exists(video.pcm_path):
+        raise HTTPException(status_code=400, detail="Áudio precisa estar extraído para calcular o fingerprint")
+    
+    from app.services.fingerprint import fingerprint_task
+    background_tasks.add_task(fingerprint_task, video_id)
     
-    return StreamingResponse(iterfile(), headers=headers)
+    logger.info(f"Fingerprint agendado para vídeo: {video.id}")
+    
+    return {"message": "Fingerprint iniciado", "video_id": video_id}
+
+@router.get("/{video_id}/overlap")
+async def get_audio_overlap(video_id: int, db: Session = Depends(get_db)):
+    """Trecho deste vídeo que já existe em outro vídeo processado (re-upload, corte)"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    match = get_overlap(db, video)
+    if not match:
+        raise HTTPException(status_code=404, detail="Nenhum trecho em comum encontrado")
+    
+    return {
+        "video_id": video_id,
+        "source_video_id": match.source_video_id,
+        "start": round(match.start_seconds, 2),
+        "end": round(match.end_seconds, 2),
+        "source_start": round(match.start_seconds + match.offset_seconds, 2),
+        "source_end": round(match.end_seconds + match.offset_seconds, 2),
+        "votes": match.votes
+    }
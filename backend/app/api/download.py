@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
 from sqlalchemy.orm import Session
-from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+from typing import Literal
 import os
-import re
 from app.db.database import get_db
+from app.api.responses import media_file_response
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import get_live_progress
+from app.services.probe import get_probe
+from app.services.keyframes import get_keyframe_index
+from app.schemas.video import MediaProbeResponse
+from app.config.settings import settings
 from datetime import datetime
 from loguru import logger
 
@@ -36,6 +42,15 @@ async def start_download(
     from app.services.download import download_video_task
     background_tasks.add_task(download_video_task, video_id)
     
+    # Background tasks rodam em sequência: proxy/HLS começam após o download
+    if settings.PROXY_ENABLED:
+        from app.services.proxy import generate_proxy_task
+        background_tasks.add_task(generate_proxy_task, video_id)
+    
+    if settings.HLS_ENABLED:
+        from app.services.hls import package_hls_task
+        background_tasks.add_task(package_hls_task, video_id)
+    
     logger.info(f"Download iniciado para vídeo: {video.id}")
     
     return {"message": "Download iniciado", "video_id": video_id}
@@ -51,7 +66,7 @@ async def get_download_progress(video_id: int, db: Session = Depends(get_db)):
     return {
         "video_id": video_id,
         "status": video.status.value,
-        "progress": video.download_progress,
+        "progress": get_live_progress(db, video, PipelineStage.download, video.download_progress),
         "error": video.download_error
     }
 
@@ -83,63 +98,91 @@ async def review_download(video_id: int, db: Session = Depends(get_db)):
     
     return video
 
+@router.post("/{video_id}/proxy")
+async def generate_proxy(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Gera (ou regera) a rendição proxy para o player de revisão"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.video_path or not os.path.exists(video.video_path):
+        raise HTTPException(status_code=400, detail="Vídeo precisa estar baixado para gerar o proxy")
+    
+    from app.services.proxy import generate_proxy_task
+    background_tasks.add_task(generate_proxy_task, video_id)
+    
+    logger.info(f"Geração de proxy agendada para vídeo: {video.id}")
+    
+    return {"message": "Geração de proxy iniciada", "video_id": video_id}
+
+@router.get("/{video_id}/probe", response_model=MediaProbeResponse)
+async def get_video_probe(video_id: int, db: Session = Depends(get_db)):
+    """Retorna trilhas, codecs e keyframes do arquivo baixado (probe em cache)"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    # Sem cache, o ffprobe pode levar minutos: roda fora do event loop
+    probe = await run_in_threadpool(get_probe, db, video)
+    if not probe:
+        raise HTTPException(status_code=404, detail="Probe indisponível: vídeo não baixado ou ffprobe falhou")
+    
+    return probe
+
+@router.get("/{video_id}/keyframes")
+async def get_video_keyframes(
+    video_id: int,
+    t: float = Query(..., ge=0, description="Instante (s) a localizar"),
+    db: Session = Depends(get_db)
+):
+    """Keyframes vizinhos de `t`, para snap do seek e planejamento de cortes"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    index = await run_in_threadpool(get_keyframe_index, db, video)
+    if not index:
+        raise HTTPException(status_code=404, detail="Índice de keyframes indisponível")
+    
+    return {
+        "video_id": video_id,
+        "t": t,
+        "before": index.before(t),
+        "after": index.after(t),
+        "nearest": index.nearest(t),
+        "count": len(index)
+    }
+
 @router.get("/{video_id}/stream")
-async def stream_video(video_id: int, request: Request, db: Session = Depends(get_db)):
+async def stream_video(
+    video_id: int,
+    request: Request,
+    rendition: Literal["original", "proxy"] = "original",
+    db: Session = Depends(get_db)
+):
     """Retorna o arquivo de vídeo para streaming com suporte a range requests"""
     video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
     
     if not video:
         raise HTTPException(status_code=404, detail="Vídeo não encontrado")
     
-    if not video.video_path or not os.path.exists(video.video_path):
-        raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado")
-    
-    file_path = Path(video.video_path)
-    file_size = file_path.stat().st_size
-    
-    # Verifica se há Range request (para seek no player)
-    range_header = request.headers.get("range")
-    
-    if range_header:
-        # Parse do range header (formato: "bytes=start-end")
-        range_match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-        if range_match:
-            start = int(range_match.group(1))
-            end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
-            
-            # Garante que não ultrapassa o tamanho do arquivo
-            end = min(end, file_size - 1)
-            content_length = end - start + 1
-            
-            def iterfile():
-                with open(file_path, "rb") as f:
-                    f.seek(start)
-                    remaining = content_length
-                    while remaining > 0:
-                        chunk_size = min(8192, remaining)
-                        data = f.read(chunk_size)
-                        if not data:
-                            break
-                        remaining -= len(data)
-                        yield data
-            
-            headers = {
-                "Content-Range": f"bytes {start}-{end}/{file_size}",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(content_length),
-            }
-            
-            return StreamingResponse(
-                iterfile(),
-                status_code=206,  # Partial Content
-                headers=headers,
-                media_type="video/mp4"
-            )
-    
-    # Sem range request, retorna o arquivo completo
-    return FileResponse(
-        video.video_path,
-        media_type="video/mp4",
-        headers={"Accept-Ranges": "bytes"},
-        filename=f"{video.youtube_id}.mp4"
-    )
+    if rendition == "proxy":
+        if not video.proxy_path or not os.path.exists(video.proxy_path):
+            raise HTTPException(status_code=404, detail="Proxy do vídeo não encontrado")
+        path = video.proxy_path
+        filename = f"{video.youtube_id}_proxy.mp4"
+    else:
+        if not video.video_path or not os.path.exists(video.video_path):
+            raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado")
+        path = video.video_path
+        filename = f"{video.youtube_id}.mp4"
+    
+    # Range (seek no player), multi-range e 416 tratados em media_file_response
+    return media_file_response(request, path, media_type="video/mp4", filename=filename)
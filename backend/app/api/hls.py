@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.api.responses import (
+    media_file_response,
+    validator_headers,
+    is_not_modified,
+    not_modified,
+    IMMUTABLE_CACHE_CONTROL
+)
+from app.models.video import Video
+from app.services.hls import PLAYLIST_NAME, INIT_NAME, rewrite_playlist, hls_segment_path
+from loguru import logger
+import os
+
+router = APIRouter()
+
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+
+def _get_video(video_id: int, db: Session) -> Video:
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    return video
+
+@router.post("/{video_id}/hls")
+async def package_hls(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Gera (ou regera) a versão HLS do vídeo baixado"""
+    video = _get_video(video_id, db)
+
+    if not video.video_path or not os.path.exists(video.video_path):
+        raise HTTPException(status_code=400, detail="Vídeo precisa estar baixado para gerar o HLS")
+
+    from app.services.hls import package_hls_task
+    background_tasks.add_task(package_hls_task, video_id)
+
+    logger.info(f"Empacotamento HLS agendado para vídeo: {video.id}")
+
+    return {"message": "Empacotamento HLS iniciado", "video_id": video_id}
+
+@router.get("/{video_id}/hls/index.m3u8")
+async def get_hls_playlist(video_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Retorna a playlist HLS. Ela é revalidada a cada uso (no-cache); os
+    segmentos referenciados têm a chave do empacotamento na URL e são imutáveis.
+    """
+    video = _get_video(video_id, db)
+
+    playlist_path = os.path.join(video.hls_path, PLAYLIST_NAME) if video.hls_path else None
+    if not playlist_path or not os.path.exists(playlist_path):
+        raise HTTPException(status_code=404, detail="HLS não gerado para este vídeo")
+
+    stat_result = os.stat(playlist_path)
+    if is_not_modified(request.headers, stat_result):
+        return not_modified(stat_result)
+
+    with open(playlist_path, "r", encoding="utf-8") as f:
+        playlist = rewrite_playlist(f.read(), os.path.basename(video.hls_path))
+
+    return Response(
+        content=playlist,
+        media_type=PLAYLIST_MEDIA_TYPE,
+        headers=validator_headers(stat_result)
+    )
+
+@router.get("/{video_id}/hls/{key}/{segment}")
+async def get_hls_segment(video_id: int, key: str, segment: str, request: Request, db: Session = Depends(get_db)):
+    """Retorna o init ou um segmento fMP4 com cache de longa duração"""
+    video = _get_video(video_id, db)
+
+    path = hls_segment_path(video, key, segment)
+    if not path:
+        raise HTTPException(status_code=404, detail="Segmento não encontrado")
+
+    media_type = "video/mp4" if segment == INIT_NAME else "video/iso.segment"
+    return media_file_response(request, path, media_type=media_type, cache_control=IMMUTABLE_CACHE_CONTROL)
@@ -0,0 +1,159 @@
+"""Middlewares HTTP da API"""
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.api.responses import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele negociamos apenas gzip
+    brotli = None
+
+# Só comprime payloads textuais; mídia (mp4/mp3/m4s) já é comprimida
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/vnd.apple.mpegurl",
+    "application/x-mpegurl",
+    "text/",
+)
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    """Extrai as codificações aceitas (q > 0) do header Accept-Encoding"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Prefere brotli (menor) quando disponível, senão gzip"""
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class _Compressor:
+    """Interface comum para gzip (zlib) e brotli em modo streaming"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 -> container gzip
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+class CompressionMiddleware:
+    """
+    Comprime respostas acima de `minimum_size` com brotli ou gzip, conforme
+    o Accept-Encoding do cliente.
+
+    Respostas parciais (206), já codificadas ou de tipos não textuais passam
+    intactas, para não interferir no streaming de vídeo/áudio.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        initial_message: Message = {}
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+        started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal initial_message, compressor, passthrough, started
+
+            if message["type"] == "http.response.start":
+                # Segura o início até saber se o corpo será comprimido
+                initial_message = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                # pathsend/zerocopysend: arquivo enviado pelo servidor, nunca comprimido
+                if not started:
+                    started = True
+                    passthrough = True
+                    await send(initial_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if not started:
+                started = True
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(initial_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=initial_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+
+                data = compressor.compress(body)
+                if not more_body:
+                    data += compressor.flush()
+                    headers["Content-Length"] = str(len(data))
+                elif "content-length" in headers:
+                    del headers["Content-Length"]
+
+                await send(initial_message)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.flush()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
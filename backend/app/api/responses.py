@@ -0,0 +1,358 @@
+"""Respostas HTTP para servir arquivos de mídia com suporte a Range e cache"""
+import os
+import re
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import quote
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Chunks começam pequenos (primeiro byte rápido após um seek) e crescem até o
+# máximo, reduzindo o número de voltas pelo event loop em leituras longas
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+# Proteção contra headers com centenas de ranges minúsculos
+MAX_RANGES = 16
+
+RANGE_SPEC_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+# Arquivos que podem ser substituídos no mesmo caminho (re-download,
+# re-extração, edição): o navegador guarda, mas revalida (304) antes de usar
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Artefatos endereçados por conteúdo (a URL muda quando o conteúdo muda)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Sufixos que o CompressionMiddleware acrescenta ao ETag
+ENCODED_ETAG_SUFFIXES = ("-gzip", "-br")
+
+def _read_at(f, position: int, size: int) -> bytes:
+    # seek+read em vez de os.pread para funcionar também no Windows
+    f.seek(position)
+    return f.read(size)
+
+class RangeNotSatisfiable(Exception):
+    """Nenhum dos ranges pedidos cabe no arquivo (HTTP 416)"""
+
+def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[list[tuple[int, int]]]:
+    """
+    Interpreta um header `Range: bytes=...` e devolve ranges inclusivos ordenados.
+
+    Retorna None quando o header está ausente ou malformado (o RFC 9110 manda
+    ignorá-lo e responder 200). Lança RangeNotSatisfiable se nenhum range for
+    satisfazível. Ranges sobrepostos ou adjacentes são mesclados.
+    """
+    if not range_header:
+        return None
+
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        match = RANGE_SPEC_RE.match(spec)
+        if not match:
+            return None
+        first, last = match.groups()
+
+        if not first and not last:
+            return None
+        if not first:
+            # Sufixo: últimos N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(file_size - length, 0), file_size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else file_size - 1
+            if last and end < start:
+                return None
+            if start >= file_size:
+                continue
+            end = min(end, file_size - 1)
+
+        ranges.append((start, end))
+
+    if not ranges or file_size == 0:
+        raise RangeNotSatisfiable()
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def file_etag(stat_result: os.stat_result, version: Optional[int] = None) -> str:
+    """
+    ETag forte derivado da identidade do arquivo (inode, tamanho e mtime).
+    `version` entra para arquivos que ficam atrás do banco até serem regravados.
+    """
+    etag = f"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+    if version is not None:
+        etag = f"{etag}-v{version:x}"
+    return f'"{etag}"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag da representação comprimida (RFC 9110 8.8.3): `"x"` vira `"x-gzip"`.
+    Bytes diferentes não podem repetir o ETag forte da versão sem compressão.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def _strip_encoding(etag: str) -> str:
+    for suffix in ENCODED_ETAG_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return f'{etag[:-len(suffix) - 1]}"'
+    return etag
+
+def validator_headers(
+    stat_result: os.stat_result,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+    version: Optional[int] = None
+) -> dict:
+    """Headers de validação/cache para um arquivo"""
+    return {
+        "ETag": file_etag(stat_result, version),
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+def _parse_http_date(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def _etag_in_list(etag: str, header: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if weak:
+            # Versão comprimida é a mesma entidade para revalidação
+            candidate = _strip_encoding(candidate.removeprefix("W/"))
+        elif candidate.startswith("W/"):
+            continue
+        if candidate == etag:
+            return True
+    return False
+
+def is_not_modified(request_headers, stat_result: os.stat_result, version: Optional[int] = None) -> bool:
+    """
+    Avalia If-None-Match / If-Modified-Since (RFC 9110 13.2.2).
+
+    If-None-Match tem precedência e usa comparação fraca; If-Modified-Since
+    só é considerado quando não há If-None-Match.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_in_list(file_etag(stat_result, version), if_none_match, weak=True)
+
+    since = _parse_http_date(request_headers.get("if-modified-since"))
+    return since is not None and int(stat_result.st_mtime) <= since
+
+def if_range_matches(request_headers, stat_result: os.stat_result) -> bool:
+    """
+    Avalia If-Range: o Range só vale se o validador ainda for o atual.
+    Caso contrário o cliente recebe o arquivo inteiro (200).
+    """
+    if_range = request_headers.get("if-range")
+    if if_range is None:
+        return True
+
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Comparação forte: ETag fraco nunca casa
+        return if_range == file_etag(stat_result)
+
+    date = _parse_http_date(if_range)
+    return date is not None and date == int(stat_result.st_mtime)
+
+def not_modified(
+    stat_result: os.stat_result,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+    version: Optional[int] = None
+) -> Response:
+    """Resposta 304 repetindo os validadores"""
+    return Response(status_code=304, headers=validator_headers(stat_result, cache_control, version))
+
+def range_not_satisfiable(file_size: int) -> Response:
+    """Resposta 416 com o tamanho real do recurso"""
+    return Response(
+        status_code=416,
+        headers={"Content-Range": f"bytes */{file_size}", "Accept-Ranges": "bytes"}
+    )
+
+class RangeFileResponse(Response):
+    """
+    Serve um arquivo inteiro (200), um range (206) ou vários ranges
+    (206 multipart/byteranges).
+
+    Quando o servidor ASGI oferece as extensões `http.response.pathsend` ou
+    `http.response.zerocopysend`, o envio é delegado a ele (sendfile, sem
+    passar os bytes pelo interpretador). Caso contrário lê o arquivo em
+    chunks adaptativos numa thread, sem bloquear o event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ranges: Optional[list[tuple[int, int]]] = None,
+        media_type: str = "application/octet-stream",
+        headers: Optional[dict] = None,
+        filename: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.path = path
+        self.media_type = media_type
+        self.background = background
+        stat_result = stat_result or os.stat(path)
+        self.file_size = stat_result.st_size
+        self.ranges = ranges or []
+        self.boundary = secrets.token_hex(16)
+
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+
+        if filename is not None:
+            quoted = quote(filename)
+            if quoted != filename:
+                disposition = f"attachment; filename*=utf-8''{quoted}"
+            else:
+                disposition = f'attachment; filename="{filename}"'
+            self.headers.setdefault("content-disposition", disposition)
+
+        if not self.ranges:
+            self.status_code = 200
+            self.headers["content-type"] = media_type
+            self.headers["content-length"] = str(self.file_size)
+        elif len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = 206
+            self.headers["content-type"] = media_type
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            self.status_code = 206
+            self.headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+            self.headers["content-length"] = str(
+                sum(len(self._part_header(s, e)) + (e - s + 1) + 2 for s, e in self.ranges)
+                + len(self._closing_boundary())
+            )
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _closing_boundary(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            extensions = scope.get("extensions") or {}
+            if not self.ranges and "http.response.pathsend" in extensions:
+                await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            else:
+                await self._send_ranges(send, zero_copy="http.response.zerocopysend" in extensions)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_ranges(self, send: Send, zero_copy: bool) -> None:
+        ranges = self.ranges or [(0, self.file_size - 1)]
+        multipart = len(ranges) > 1
+
+        with open(self.path, "rb") as f:
+            for start, end in ranges:
+                if multipart:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+
+                if zero_copy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True,
+                    })
+                else:
+                    await self._send_file_range(send, f, start, end)
+
+                if multipart:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+
+        closing = self._closing_boundary() if multipart else b""
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+    async def _send_file_range(self, send: Send, f, start: int, end: int) -> None:
+        position = start
+        chunk_size = MIN_CHUNK_SIZE
+        while position <= end:
+            size = min(chunk_size, end - position + 1)
+            data = await anyio.to_thread.run_sync(_read_at, f, position, size)
+            if not data:
+                break
+            position += len(data)
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+            chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+
+def media_file_response(
+    request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL
+) -> Response:
+    """
+    Monta a resposta de mídia adequada à requisição: 304 para cache válido,
+    416 para range impossível, 206 para Range/If-Range válidos, senão 200.
+    """
+    stat_result = os.stat(path)
+
+    if is_not_modified(request.headers, stat_result):
+        return not_modified(stat_result, cache_control)
+
+    ranges = None
+    if if_range_matches(request.headers, stat_result):
+        try:
+            ranges = parse_range_header(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            return range_not_satisfiable(stat_result.st_size)
+
+    return RangeFileResponse(
+        path,
+        ranges=ranges,
+        media_type=media_type,
+        headers=validator_headers(stat_result, cache_control),
+        filename=filename,
+        stat_result=stat_result
+    )
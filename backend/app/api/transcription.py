@@ -1,21 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.database import get_db
+from app.api.responses import is_not_modified, not_modified, validator_headers
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import get_live_progress
+from app.services.words import open_words
+from app.services.transcript_store import (
+    sync_segments, ensure_segments, segment_at, segments_in_range, segment_payload,
+    apply_ops, flush_transcript_task, write_transcript_json, transcript_lock, read_transcript,
+    TranscriptEditError,
+)
+from app.services.alignment import pending_segments, realign_transcript_task
+from app.schemas.video import TranscriptPatch, TranscriptUpdate
+from typing import Optional
 from datetime import datetime
 from loguru import logger
 import os
 import json
 
+# Segmentos por página quando a janela não informa `limit`
+TRANSCRIPT_PAGE_SIZE = 200
+
 router = APIRouter()
 
+def _claim_version(db: Session, video: Video, version: int) -> int:
+    """
+    Reserva a próxima versão no próprio UPDATE: de dois editores na mesma
+    versão, só um passa; o outro recebe 409. Retorna a nova versão (sem commit).
+    """
+    claimed = db.query(Video).filter(
+        Video.id == video.id, Video.transcript_version == version
+    ).update({Video.transcript_version: Video.transcript_version + 1}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        db.refresh(video)
+        raise HTTPException(
+            status_code=409,
+            detail=f"Transcrição alterada por outra edição (versão atual: {video.transcript_version})"
+        )
+    return version + 1
+
+def _replace_transcript(db: Session, video: Video, transcript: TranscriptUpdate) -> int:
+    """
+    Troca os segmentos do JSON e das linhas sob a trava da transcrição. A nova
+    versão é confirmada antes de soltar a trava: um flush pendente que entre
+    depois vê que a versão dele ficou para trás e não sobrescreve o JSON.
+    """
+    with transcript_lock(video.id):
+        version = _claim_version(db, video, transcript.version)
+        try:
+            # Lê transcrição atual
+            with open(video.transcript_path, 'r', encoding='utf-8') as f:
+                transcript_data = json.load(f)
+            
+            # Atualiza apenas os segmentos
+            transcript_data['segments'] = transcript.segments
+            transcript_data['version'] = version
+            transcript_data['updated_at'] = datetime.now().isoformat()
+            
+            # Salva de volta (temporário + rename)
+            write_transcript_json(video.transcript_path, transcript_data)
+            
+            sync_segments(db, video.id, transcript_data['segments'], edit=True)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return version
+
 @router.post("/{video_id}/transcribe")
 async def transcribe_video(
     video_id: int,
     background_tasks: BackgroundTasks,
+    quality: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Inicia a transcrição do áudio"""
+    """
+    Inicia a transcrição do áudio. Usa as legendas do YouTube quando existem;
+    `quality=true` força o Whisper local.
+    """
     video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
     
     if not video:
@@ -40,7 +106,7 @@ async def transcribe_video(
     
     # Agenda transcrição em background
     from app.services.transcription import transcribe_audio_task
-    background_tasks.add_task(transcribe_audio_task, video_id)
+    background_tasks.add_task(transcribe_audio_task, video_id, prefer_captions=not quality)
     
     logger.info(f"Transcrição iniciada para vídeo: {video.id}")
     
@@ -57,13 +123,24 @@ async def get_transcription_progress(video_id: int, db: Session = Depends(get_db
     return {
         "video_id": video_id,
         "status": video.status.value,
-        "progress": getattr(video, 'transcription_progress', 0),
+        "progress": get_live_progress(db, video, PipelineStage.transcription, video.transcription_progress),
         "error": getattr(video, 'transcription_error', None)
     }
 
 @router.get("/{video_id}/transcript")
-async def get_transcript(video_id: int, db: Session = Depends(get_db)):
-    """Retorna a transcrição completa"""
+async def get_transcript(
+    video_id: int,
+    request: Request,
+    start: Optional[float] = Query(None, alias="from", ge=0, description="Início da janela (s)"),
+    end: Optional[float] = Query(None, alias="to", gt=0, description="Fim da janela (s)"),
+    offset: Optional[int] = Query(None, ge=0, description="Segmentos a pular"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Máximo de segmentos"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna a transcrição completa, ou só os segmentos de uma janela de tempo
+    (paginados) quando `from`, `to`, `offset` ou `limit` são informados.
+    """
     video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
     
     if not video:
@@ -72,18 +149,98 @@ async def get_transcript(video_id: int, db: Session = Depends(get_db)):
     if not video.transcript_path or not os.path.exists(video.transcript_path):
         raise HTTPException(status_code=404, detail="Transcrição não encontrada")
     
+    if any(value is not None for value in (start, end, offset, limit)):
+        # Janela vem do banco pelo índice (video_id, start), sem abrir o JSON
+        ensure_segments(db, video)
+        query = segments_in_range(db, video_id, start, end)
+        offset = offset or 0
+        limit = limit or TRANSCRIPT_PAGE_SIZE
+        segments = query.offset(offset).limit(limit).all()
+        return ORJSONResponse({
+            "video_id": video_id,
+            "from": start,
+            "to": end,
+            "offset": offset,
+            "limit": limit,
+            "total": query.count(),
+            "segments": [segment_payload(segment) for segment in segments],
+        })
+    
+    # Revalidação barata: se o arquivo não mudou, nem lê o JSON. O ETag leva a
+    # versão: depois de um PATCH o antigo não casa, mesmo com o JSON ainda por
+    # regravar. If-Modified-Since não vale aqui (mtime em segundos não separa
+    # duas versões gravadas no mesmo segundo)
+    stat_result = os.stat(video.transcript_path)
+    if "if-none-match" in request.headers and is_not_modified(request.headers, stat_result, video.transcript_version):
+        return not_modified(stat_result, version=video.transcript_version)
+    
     try:
-        with open(video.transcript_path, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
+        # Grava edições pendentes antes de ler (trava de thread: fora do event loop)
+        transcript_data, stat_result = await run_in_threadpool(read_transcript, db, video)
+        version = transcript_data.get("version", 0)
         
-        return transcript_data
+        # Resposta direta evita o jsonable_encoder percorrer milhares de segmentos
+        return ORJSONResponse(transcript_data, headers=validator_headers(stat_result, version=version))
     except Exception as e:
         logger.error(f"Erro ao ler transcrição: {e}")
         raise HTTPException(status_code=500, detail="Erro ao carregar transcrição")
 
+@router.get("/{video_id}/transcript/segment-at")
+async def get_segment_at(
+    video_id: int,
+    t: float = Query(..., ge=0, description="Tempo no vídeo (s)"),
+    db: Session = Depends(get_db)
+):
+    """Retorna o segmento da transcrição que está tocando no tempo t"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not ensure_segments(db, video):
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+    
+    segment = segment_at(db, video_id, t)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Nenhum segmento neste tempo")
+    
+    return segment_payload(segment)
+
+@router.get("/{video_id}/words")
+async def get_words(
+    video_id: int,
+    request: Request,
+    start: float = Query(0.0, ge=0, description="Início da janela (s)"),
+    end: Optional[float] = Query(None, gt=0, description="Fim da janela (s)"),
+    db: Session = Depends(get_db)
+):
+    """Retorna os timestamps por palavra de uma janela de tempo, em colunas"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not video.words_path or not os.path.exists(video.words_path):
+        raise HTTPException(status_code=404, detail="Timestamps por palavra não disponíveis")
+    
+    stat_result = os.stat(video.words_path)
+    if is_not_modified(request.headers, stat_result):
+        return not_modified(stat_result)
+    
+    # Só a janela pedida é lida do arquivo mapeado em memória
+    window = open_words(video.words_path).window(start, end)
+    payload = {
+        "video_id": video_id,
+        "start": start,
+        "end": end,
+        "count": len(window["word"]),
+        **window,
+    }
+    return ORJSONResponse(payload, headers=validator_headers(stat_result))
+
 @router.put("/{video_id}/transcript")
-async def update_transcript(video_id: int, transcript: dict, db: Session = Depends(get_db)):
-    """Atualiza a transcrição"""
+async def update_transcript(video_id: int, transcript: TranscriptUpdate, db: Session = Depends(get_db)):
+    """Substitui a transcrição inteira sobre a versão informada"""
     video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
     
     if not video:
@@ -92,25 +249,82 @@ async def update_transcript(video_id: int, transcript: dict, db: Session = Depen
     if not video.transcript_path or not os.path.exists(video.transcript_path):
         raise HTTPException(status_code=404, detail="Transcrição não encontrada")
     
+    # As linhas são a referência do que mudou (e guardam as marcas de alinhamento)
+    ensure_segments(db, video)
+    
     try:
-        # Lê transcrição atual
-        with open(video.transcript_path, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
-        
-        # Atualiza apenas os segmentos
-        transcript_data['segments'] = transcript.get('segments', [])
-        transcript_data['updated_at'] = datetime.now().isoformat()
-        
-        # Salva de volta
-        with open(video.transcript_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Transcrição atualizada para vídeo {video_id}")
-        
-        return {"message": "Transcrição atualizada com sucesso"}
+        # A trava é de thread: fora do event loop
+        version = await run_in_threadpool(_replace_transcript, db, video, transcript)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao atualizar transcrição: {e}")
         raise HTTPException(status_code=500, detail="Erro ao atualizar transcrição")
+    
+    logger.info(f"Transcrição atualizada para vídeo {video_id} (versão {version})")
+    
+    return {"message": "Transcrição atualizada com sucesso", "version": version}
+
+@router.patch("/{video_id}/transcript")
+async def patch_transcript(
+    video_id: int,
+    patch: TranscriptPatch,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Aplica edições por segmento (edit, split, merge, retime) sobre a versão
+    informada. Só as linhas afetadas são gravadas; o JSON é regravado em background.
+    """
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not ensure_segments(db, video):
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+    
+    version = _claim_version(db, video, patch.version)
+    
+    try:
+        touched = apply_ops(db, video_id, patch.ops)
+    except TranscriptEditError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    db.commit()
+    background_tasks.add_task(flush_transcript_task, video_id, version)
+    
+    logger.info(f"Transcrição do vídeo {video_id}: {len(patch.ops)} edições (versão {version})")
+    
+    return {
+        "version": version,
+        "segments": [segment_payload(segment) for segment in touched],
+    }
+
+@router.post("/{video_id}/realign")
+async def realign_transcript(
+    video_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Realinha as palavras dos segmentos editados desde o último alinhamento"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    if not ensure_segments(db, video):
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+    
+    if not video.pcm_path or not os.path.exists(video.pcm_path):
+        raise HTTPException(status_code=400, detail="Áudio decodificado (PCM) não disponível")
+    
+    pending = len(pending_segments(db, video_id))
+    if pending:
+        background_tasks.add_task(realign_transcript_task, video_id)
+    
+    return {"message": "Realinhamento iniciado" if pending else "Nenhum segmento pendente", "pending": pending}
 
 @router.post("/{video_id}/review-transcription")
 async def review_transcription(video_id: int, db: Session = Depends(get_db)):
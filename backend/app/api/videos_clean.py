@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.db.database import get_db
 from app.schemas.video import (
     VideoCreate,
     VideoResponse,
-    VideoListResponse
+    VideoListResponse,
+    VideoStatsResponse,
+    StageRunListResponse,
+    TranscriptSearchResponse
 )
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRunStatus
 from app.services.youtube import youtube_service
+from app.services.stage_runs import get_current_stage_run, list_stage_runs, PROGRESS_FIELDS
+from app.services.stats import get_video_stats, invalidate_video_stats
+from app.services.transcript_search import search_transcripts, unindexed_videos, index_transcripts_task
 from datetime import datetime
 from loguru import logger
 
@@ -47,6 +54,8 @@ async def create_video(
     db.commit()
     db.refresh(video)
     
+    invalidate_video_stats()
+    
     logger.info(f"Vídeo criado: {video.id} - {video.title}")
     
     # Agenda busca de thumbnail do canal em background (se não foi fornecido)
@@ -80,6 +89,33 @@ async def list_videos(
     
     return VideoListResponse(videos=videos, total=total)
 
+# Precisa vir antes de /{video_id} para "stats" não ser lido como id
+@router.get("/stats", response_model=VideoStatsResponse)
+async def get_stats(db: Session = Depends(get_db)):
+    """Resumo do dashboard: vídeos por status, em andamento e duração média das etapas"""
+    return get_video_stats(db)
+
+# Também antes de /{video_id}
+@router.get("/search", response_model=TranscriptSearchResponse)
+async def search(
+    q: str = Query(..., min_length=2, description="Texto buscado nas transcrições"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Busca em todas as transcrições: segmentos (vídeo, início, fim) com trecho destacado"""
+    hits = search_transcripts(db, q, limit=limit, offset=offset)
+    return TranscriptSearchResponse(query=q, limit=limit, offset=offset, hits=hits)
+
+@router.post("/search/reindex")
+async def reindex_search(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Indexa as transcrições antigas que ainda não estão na busca"""
+    pending = len(unindexed_videos(db))
+    if pending:
+        background_tasks.add_task(index_transcripts_task)
+    
+    return {"message": "Indexação iniciada" if pending else "Todas as transcrições já estão indexadas", "pending": pending}
+
 @router.get("/{video_id}", response_model=VideoResponse)
 async def get_video(video_id: int, db: Session = Depends(get_db)):
     """Retorna um vídeo específico"""
@@ -88,7 +124,28 @@ async def get_video(video_id: int, db: Session = Depends(get_db)):
     if not video:
         raise HTTPException(status_code=404, detail="Vídeo não encontrado")
     
-    return video
+    response = VideoResponse.model_validate(video)
+    
+    # Progresso da etapa em andamento vive em stage_runs, não na linha do vídeo
+    run = get_current_stage_run(db, video)
+    if run and run.status == StageRunStatus.running and run.stage in PROGRESS_FIELDS:
+        setattr(response, PROGRESS_FIELDS[run.stage], run.progress)
+    
+    return response
+
+@router.get("/{video_id}/stages", response_model=StageRunListResponse)
+async def get_video_stages(video_id: int, db: Session = Depends(get_db)):
+    """Histórico de execuções das etapas (tentativas, duração e erros)"""
+    video = db.query(Video).filter(Video.id == video_id, Video.deleted_at.is_(None)).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+    
+    return StageRunListResponse(
+        video_id=video.id,
+        current_stage_run_id=video.current_stage_run_id,
+        runs=list_stage_runs(db, video.id)
+    )
 
 @router.delete("/{video_id}")
 async def delete_video(video_id: int, db: Session = Depends(get_db)):
@@ -100,6 +157,7 @@ async def delete_video(video_id: int, db: Session = Depends(get_db)):
     
     video.deleted_at = datetime.now()
     db.commit()
+    invalidate_video_stats()
     
     logger.info(f"Vídeo deletado: {video.id}")
     
@@ -15,6 +15,8 @@ class Settings(BaseSettings):
     
     # YouTube
     YOUTUBE_API_KEY: Optional[str] = None
+    # Usa as legendas do YouTube (manuais/automáticas em pt) antes do Whisper
+    YOUTUBE_CAPTIONS_ENABLED: bool = True
     
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
@@ -29,6 +31,29 @@ class Settings(BaseSettings):
     TRANSCRIPTS_PATH: str = "./storage/transcripts"
     CLIPS_PATH: str = "./storage/clips"
     
+    # Transcrição: "single" (WHISPER_MODEL em tudo) ou "tiered" (WHISPER_FAST_MODEL
+    # primeiro e WHISPER_MODEL só nos trechos de baixa confiança)
+    TRANSCRIPTION_MODE: str = "single"
+    WHISPER_MODEL: str = "small"
+    WHISPER_FAST_MODEL: str = "base"
+    # > 1.0 acelera o áudio (atempo) antes do Whisper: mais throughput, pouca perda de precisão
+    TRANSCRIPTION_SPEED: float = 1.0
+    
+    # Proxy de revisão (rendição leve gerada após o download)
+    PROXY_ENABLED: bool = False
+    PROXY_HEIGHT: int = 360
+    PROXY_VIDEO_BITRATE: str = "500k"
+    
+    # HLS (fMP4) para seek por segmento no player de revisão
+    HLS_ENABLED: bool = False
+    HLS_SEGMENT_SECONDS: int = 6
+    
+    # Respostas acima deste tamanho (bytes) são comprimidas com brotli/gzip
+    COMPRESSION_MIN_SIZE: int = 1024
+    
+    # Dashboard
+    STATS_CACHE_TTL_SECONDS: float = 2.0
+    
     # CORS
     BACKEND_CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost:3001"]
     
@@ -0,0 +1,47 @@
+"""Índice de fingerprints de áudio e sobreposições encontradas entre vídeos"""
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class AudioFingerprint(Base):
+    """
+    Tabela hash dos fingerprints: uma linha por par de picos espectrais da
+    amostra indexada (ver `index_mask` em services/fingerprint.py).
+
+    `hash` codifica (frequência âncora, frequência alvo, distância em quadros)
+    e `offset` é o quadro da âncora no vídeo. A busca por hash encontra
+    candidatos; o alinhamento fino usa o arquivo de fingerprint do vídeo.
+    """
+    __tablename__ = "audio_fingerprints"
+    __table_args__ = (
+        Index("ix_audio_fingerprints_hash", "hash"),
+        Index("ix_audio_fingerprints_video_id", "video_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    hash = Column(Integer, nullable=False)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    offset = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<AudioFingerprint(hash={self.hash}, video_id={self.video_id}, offset={self.offset})>"
+
+class AudioMatch(Base):
+    """
+    Trecho do vídeo que é cópia (cortada/re-encodada) de outro já processado.
+
+    `start_seconds`/`end_seconds` estão no tempo deste vídeo; o mesmo trecho
+    no vídeo de origem é deslocado por `offset_seconds` (origem = este + offset).
+    """
+    __tablename__ = "audio_matches"
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    source_video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    offset_seconds = Column(Float, nullable=False)
+    start_seconds = Column(Float, nullable=False)
+    end_seconds = Column(Float, nullable=False)
+    votes = Column(Integer, nullable=False)  # pares de picos alinhados no offset
+    matched_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AudioMatch(video_id={self.video_id}, source={self.source_video_id}, {self.start_seconds}-{self.end_seconds}s)>"
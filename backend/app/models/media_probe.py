@@ -0,0 +1,48 @@
+"""Resultado do ffprobe de cada vídeo baixado"""
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Float, LargeBinary, ForeignKey
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class MediaProbe(Base):
+    """
+    Probe do arquivo baixado, feito uma vez após o download.
+
+    As etapas seguintes (áudio, proxy, HLS, cortes) leem daqui em vez de
+    rodar o ffprobe de novo. `file_size`/`file_mtime` identificam o arquivo
+    probado: se o arquivo mudar, o probe é refeito.
+    """
+    __tablename__ = "media_probes"
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    probed_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    file_size = Column(BigInteger, nullable=False)
+    file_mtime = Column(Float, nullable=False)
+
+    # Container
+    format_name = Column(String(100))
+    duration_seconds = Column(Float)
+    bit_rate = Column(BigInteger)
+
+    # Primeira trilha de vídeo
+    video_codec = Column(String(50))
+    width = Column(Integer)
+    height = Column(Integer)
+    fps = Column(Float)
+    video_bit_rate = Column(BigInteger)
+
+    # Primeira trilha de áudio
+    audio_codec = Column(String(50))
+    audio_sample_rate = Column(Integer)
+    audio_channels = Column(Integer)
+    audio_bit_rate = Column(BigInteger)
+
+    # Todas as trilhas (subconjunto do JSON do ffprobe)
+    streams_json = Column(Text)
+
+    # Timestamps (s) dos keyframes da trilha de vídeo: float64 little-endian ordenados
+    keyframes = Column(LargeBinary)
+    keyframe_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MediaProbe(video_id={self.video_id}, {self.video_codec} {self.width}x{self.height}, {self.duration_seconds}s)>"
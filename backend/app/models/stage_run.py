@@ -0,0 +1,54 @@
+"""Histórico de execuções das etapas do pipeline"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum, Float, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+import enum
+
+class PipelineStage(enum.Enum):
+    download = "download"
+    audio_extraction = "audio_extraction"
+    transcription = "transcription"
+    proxy = "proxy"
+    hls = "hls"
+    features = "features"
+    vad = "vad"
+    fingerprint = "fingerprint"
+    alignment = "alignment"
+
+class StageRunStatus(enum.Enum):
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class StageRun(Base):
+    """
+    Uma tentativa de execução de uma etapa para um vídeo.
+
+    Recebe as escritas de alta frequência (progresso) que antes reescreviam a
+    linha larga de `videos`. O vídeo guarda apenas `current_stage_run_id`.
+    """
+    __tablename__ = "stage_runs"
+    __table_args__ = (
+        Index("ix_stage_runs_video_stage_attempt", "video_id", "stage", "attempt", unique=True),
+        Index("ix_stage_runs_stage_status", "stage", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+
+    # Enums como VARCHAR: novas etapas não exigem ALTER TYPE no PostgreSQL
+    stage = Column(SQLEnum(PipelineStage, native_enum=False, length=50), nullable=False)
+    attempt = Column(Integer, nullable=False, default=1)
+    status = Column(SQLEnum(StageRunStatus, native_enum=False, length=20), nullable=False, default=StageRunStatus.running)
+    progress = Column(Float, nullable=False, default=0.0)  # 0-100
+
+    started_at = Column(DateTime, server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime)
+    duration_seconds = Column(Float)  # Preenchido ao finalizar (média por etapa sem aritmética de datas no SQL)
+
+    error = Column(Text)
+    result = Column(Text)  # Resumo de uma execução bem-sucedida (ex.: o que ficou de fora)
+    worker = Column(String(100))  # host:pid que executou a etapa
+
+    def __repr__(self):
+        return f"<StageRun(video_id={self.video_id}, stage={self.stage}, attempt={self.attempt}, status={self.status})>"
@@ -0,0 +1,38 @@
+"""Segmentos da transcrição no banco, para consultas por janela de tempo e busca textual"""
+from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy import text as sql_text
+from app.db.database import Base
+
+# Configuração de texto do PostgreSQL (stemming e stopwords em português)
+SEARCH_CONFIG = "portuguese"
+
+class TranscriptSegment(Base):
+    """
+    Um segmento da transcrição de um vídeo.
+
+    Estas linhas são a fonte da verdade dos segmentos: as edições do editor
+    alteram só elas, e o JSON em TRANSCRIPTS_PATH (que guarda também os
+    metadados da transcrição) é regravado a partir delas depois, em
+    `flush_transcript`. `idx` é a posição do segmento no JSON.
+    """
+    __tablename__ = "transcript_segments"
+    __table_args__ = (
+        UniqueConstraint("video_id", "idx", name="uq_transcript_segments_video_idx"),
+        Index("ix_transcript_segments_video_start", "video_id", "start"),
+        # Índice invertido só no PostgreSQL (o SQLite de dev/testes busca com LIKE)
+        Index(
+            "ix_transcript_segments_search", sql_text(f"to_tsvector('{SEARCH_CONFIG}', text)"), postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    idx = Column(Integer, nullable=False)
+    start = Column(Float, nullable=False)
+    end = Column(Float, nullable=False)
+    text = Column(Text, nullable=False)
+    edited_at = Column(DateTime)  # Última edição pelo editor (None = saída do Whisper)
+    aligned_at = Column(DateTime)  # Último realinhamento das palavras após uma edição
+
+    def __repr__(self):
+        return f"<TranscriptSegment(video_id={self.video_id}, idx={self.idx}, {self.start}-{self.end}s)>"
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum, Float, Boolean
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum, Float, Boolean, Index
+from sqlalchemy.sql import func, text
 from app.db.database import Base
 import enum
 
@@ -51,8 +51,40 @@ class VideoStatus(enum.Enum):
     # Deprecated (manter por compatibilidade temporária)
     failed = "failed"
 
+# Status de etapas em execução (contam como "em andamento" no dashboard)
+IN_FLIGHT_STATUSES = frozenset({
+    VideoStatus.downloading,
+    VideoStatus.extracting_audio,
+    VideoStatus.transcribing,
+    VideoStatus.analyzing,
+    VideoStatus.generating_highlights,
+    VideoStatus.cutting,
+    VideoStatus.ranking,
+    VideoStatus.generating_subtitles,
+})
+
+FAILED_STATUSES = frozenset(status for status in VideoStatus if status.value.endswith("failed"))
+
+# Quase toda consulta da API filtra `deleted_at IS NULL` e ordena por `created_at`.
+# Índices parciais cobrem só as linhas ativas e servem listagem, filtro por status e contagem.
+ACTIVE_VIDEOS_PREDICATE = text("deleted_at IS NULL")
+
 class Video(Base):
     __tablename__ = "videos"
+    __table_args__ = (
+        Index(
+            "ix_videos_active_status_created",
+            "status", "created_at",
+            postgresql_where=ACTIVE_VIDEOS_PREDICATE,
+            sqlite_where=ACTIVE_VIDEOS_PREDICATE,
+        ),
+        Index(
+            "ix_videos_active_created",
+            "created_at", "id",
+            postgresql_where=ACTIVE_VIDEOS_PREDICATE,
+            sqlite_where=ACTIVE_VIDEOS_PREDICATE,
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -71,14 +103,28 @@ class Video(Base):
     comment_count = Column(Integer)
     
     # Processing status
-    status = Column(SQLEnum(VideoStatus), default=VideoStatus.pending, nullable=False, index=True)
+    # Sem índice próprio: toda consulta por status filtra as linhas ativas e usa ix_videos_active_status_created
+    status = Column(SQLEnum(VideoStatus), default=VideoStatus.pending, nullable=False)
+    current_stage_run_id = Column(Integer)  # Execução ativa/última em stage_runs (progresso fica lá)
     
     # File paths
-    video_path = Column(String(500))  # Path do vídeo baixado
+    video_path = Column(String(500))  # Path do vídeo baixado (original, usado nos cortes)
+    proxy_path = Column(String(500))  # Rendição leve para o player de revisão (opcional)
+    hls_path = Column(String(500))  # Diretório da playlist/segmentos HLS (opcional)
     audio_path = Column(String(500))  # Path do áudio extraído
+    pcm_path = Column(String(500))  # PCM float32 mono 16 kHz (lido via memmap pela transcrição/análise)
+    audio_sha256 = Column(String(64))  # Hash das amostras do PCM (identidade do conteúdo de áudio)
+    waveform_path = Column(String(500))  # Picos min/max multirresolução (.npz)
+    features_path = Column(String(500))  # Loudness, fluxo espectral e máscara de fala a 10 Hz (.npz)
+    vad_path = Column(String(500))  # Intervalos de fala (s) do pré-passe de VAD (.npy)
+    fingerprint_path = Column(String(500))  # Hashes de picos espectrais do áudio (.npz)
     transcript_path = Column(String(500))  # Path da transcrição
+    words_path = Column(String(500))  # Timestamps por palavra (arquivo colunar ao lado da transcrição)
+    transcript_version = Column(Integer, default=0, server_default="0", nullable=False)  # Incrementada a cada edição (concorrência otimista)
     
     # Download info
+    faststart_at = Column(DateTime)  # MP4 remuxado com moov no início (ou já estava)
+    # *_progress só é gravado nas transições (início/fim); ticks vão para stage_runs
     download_progress = Column(Float, default=0.0)  # 0-100
     download_error = Column(Text)
     
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -95,13 +95,23 @@ class VideoResponse(BaseModel):
     
     # Paths
     video_path: Optional[str] = None
+    proxy_path: Optional[str] = None
+    hls_path: Optional[str] = None
     audio_path: Optional[str] = None
+    pcm_path: Optional[str] = None
+    waveform_path: Optional[str] = None
+    features_path: Optional[str] = None
+    vad_path: Optional[str] = None
+    fingerprint_path: Optional[str] = None
     transcript_path: Optional[str] = None
+    words_path: Optional[str] = None
+    transcript_version: Optional[int] = None
     
     # Download
     download_progress: float = 0
     download_error: Optional[str] = None
     download_reviewed_at: Optional[datetime] = None
+    faststart_at: Optional[datetime] = None
     
     # Audio Extraction
     audio_extraction_progress: Optional[float] = 0
@@ -123,6 +133,104 @@ class VideoResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TranscriptOp(BaseModel):
+    """
+    Operação sobre um segmento da transcrição. `idx` é a posição do segmento
+    no momento em que a operação é aplicada (as anteriores já aplicadas).
+    """
+    op: Literal["edit", "split", "merge", "retime"]
+    idx: int = Field(..., ge=0)
+    text: Optional[str] = None  # edit
+    start: Optional[float] = Field(None, ge=0)  # retime
+    end: Optional[float] = Field(None, gt=0)  # retime
+    at: Optional[float] = Field(None, gt=0)  # split: tempo do corte (s)
+    position: Optional[int] = Field(None, ge=0)  # split: posição do corte no texto
+
+class TranscriptUpdate(BaseModel):
+    """Transcrição inteira (PUT). Os segmentos são gravados como vieram"""
+    version: int = Field(..., ge=0, description="Versão da transcrição que o cliente editou")
+    segments: list[dict]
+
+class TranscriptPatch(BaseModel):
+    version: int = Field(..., ge=0, description="Versão da transcrição que o cliente editou")
+    ops: list[TranscriptOp] = Field(..., min_length=1)
+
 class VideoListResponse(BaseModel):
     videos: list[VideoResponse]
     total: int
+
+class StageRunResponse(BaseModel):
+    id: int
+    stage: str
+    attempt: int
+    status: str
+    progress: float
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[str] = None
+    worker: Optional[str] = None
+
+    @field_validator("stage", "status", mode="before")
+    @classmethod
+    def enum_value(cls, value):
+        return getattr(value, "value", value)
+
+    class Config:
+        from_attributes = True
+
+class StageRunListResponse(BaseModel):
+    video_id: int
+    current_stage_run_id: Optional[int] = None
+    runs: list[StageRunResponse]
+
+class MediaProbeResponse(BaseModel):
+    video_id: int
+    probed_at: datetime
+    file_size: int
+    format_name: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    bit_rate: Optional[int] = None
+    video_codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    video_bit_rate: Optional[int] = None
+    audio_codec: Optional[str] = None
+    audio_sample_rate: Optional[int] = None
+    audio_channels: Optional[int] = None
+    audio_bit_rate: Optional[int] = None
+    keyframe_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+class StageDurationStats(BaseModel):
+    runs: int
+    failed_runs: int
+    avg_duration_seconds: Optional[float] = None
+
+class VideoStatsResponse(BaseModel):
+    total: int
+    in_flight: int
+    failed: int
+    counts: dict[str, int]
+    stages: dict[str, StageDurationStats]
+    generated_at: datetime
+
+class TranscriptSearchHit(BaseModel):
+    video_id: int
+    youtube_id: str
+    title: Optional[str] = None
+    idx: int
+    start: float
+    end: float
+    rank: Optional[float] = None  # None no fallback sem índice (SQLite)
+    snippet: str
+
+class TranscriptSearchResponse(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    hits: list[TranscriptSearchHit]
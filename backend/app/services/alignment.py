@@ -0,0 +1,180 @@
+"""
+Realinhamento forçado dos segmentos editados na revisão.
+
+Quando o revisor corrige o texto, as palavras do segmento deixam de bater com
+os timestamps do Whisper. Em vez de retranscrever, o texto corrigido é
+alinhado contra o trecho do áudio do próprio segmento (uma passada do encoder
+por segmento, via `find_alignment` do faster-whisper). Só entram segmentos
+editados depois do último alinhamento; os longos demais para uma janela do
+encoder continuam pendentes e ficam listados no resultado da execução.
+"""
+import os
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from sqlalchemy import or_
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.stage_run import PipelineStage
+from app.models.transcript_segment import TranscriptSegment
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.pcm import open_pcm, PcmAudio
+from app.services.words import open_words, write_words, words_path_for
+from app.services.transcript_store import segment_payload, transcript_lock
+from app.services.transcription import load_whisper_model
+from app.config.settings import settings
+from loguru import logger
+
+# Contexto de áudio dos dois lados do segmento (s)
+ALIGN_PADDING_SECONDS = 0.3
+# O encoder do Whisper enxerga no máximo 30 s
+MAX_ALIGN_SECONDS = 30.0
+
+def pending_segments(db, video_id: int) -> list[TranscriptSegment]:
+    """Segmentos editados e ainda não realinhados desde a edição"""
+    return (
+        db.query(TranscriptSegment)
+        .filter(
+            TranscriptSegment.video_id == video_id,
+            TranscriptSegment.edited_at.isnot(None),
+            or_(TranscriptSegment.aligned_at.is_(None), TranscriptSegment.aligned_at < TranscriptSegment.edited_at),
+        )
+        .order_by(TranscriptSegment.idx)
+        .all()
+    )
+
+def force_align(model, audio: np.ndarray, text: str, language: str = "pt") -> list[dict]:
+    """Palavras de `text` com tempos (s, relativos ao trecho) dentro de `audio`"""
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+
+    tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+    features = model.feature_extractor(audio)
+    num_frames = min(features.shape[-1], model.feature_extractor.nb_max_frames)
+    encoder_output = model.encode(pad_or_trim(features))
+
+    # faster-whisper 1.0.x: um texto (lista plana de tokens) -> lista de palavras
+    alignment = model.find_alignment(tokenizer, tokenizer.encode(f" {text.strip()}"), encoder_output, num_frames)
+    return [
+        {"start": float(word["start"]), "end": float(word["end"]), "word": word["word"].strip(),
+         "probability": round(float(word["probability"]), 3)}
+        for word in alignment if word["word"].strip()
+    ]
+
+def align_segment(model, pcm: PcmAudio, segment: TranscriptSegment) -> Optional[list[dict]]:
+    """
+    Palavras do segmento no tempo do vídeo, limitadas às bordas do segmento.
+    None se o segmento não cabe numa janela do encoder.
+    """
+    if not segment.text.strip():
+        return []
+    if segment.end - segment.start > MAX_ALIGN_SECONDS - 2 * ALIGN_PADDING_SECONDS:
+        return None
+
+    window_start = max(0.0, segment.start - ALIGN_PADDING_SECONDS)
+    window_end = min(pcm.duration, segment.end + ALIGN_PADDING_SECONDS)
+    audio = np.asarray(pcm.slice(window_start, window_end), dtype=np.float32)
+
+    words = []
+    for word in force_align(model, audio, segment.text):
+        start = min(max(word["start"] + window_start, segment.start), segment.end)
+        end = min(max(word["end"] + window_start, start), segment.end)
+        words.append({**word, "start": round(start, 3), "end": round(end, 3)})
+    return words
+
+def splice_words(words: list[dict], segments: list[TranscriptSegment], aligned: dict) -> list[dict]:
+    """Troca as palavras dentro dos segmentos realinhados pelas novas"""
+    spans = np.array([(s.start, s.end) for s in segments if s.id in aligned], dtype=np.float64).reshape(-1, 2)
+    starts = np.array([word["start"] for word in words], dtype=np.float64)
+    inside = ((starts[:, None] >= spans[:, 0]) & (starts[:, None] < spans[:, 1])).any(axis=1)
+    kept = [word for word, replaced in zip(words, inside) if not replaced]
+    return kept + [word for segment in segments for word in aligned.get(segment.id, [])]
+
+def realign_transcript_task(video_id: int):
+    """
+    Task em background que realinha as palavras dos segmentos editados desde
+    o último alinhamento e regrava o arquivo de palavras.
+    """
+    db = SessionLocal()
+    run = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.pcm_path or not os.path.exists(video.pcm_path):
+            logger.warning(f"Realinhamento ignorado: vídeo {video_id} sem PCM decodificado")
+            return
+
+        segments = pending_segments(db, video_id)
+        if not segments:
+            logger.info(f"Nenhum segmento editado para realinhar no vídeo {video_id}")
+            return
+
+        logger.info(f"Realinhando {len(segments)} segmentos editados do vídeo {video_id}")
+        run = start_stage_run(db, video, PipelineStage.alignment)
+        # Edição feita durante o alinhamento mantém o segmento pendente
+        edited_at = {segment.id: segment.edited_at for segment in segments}
+
+        model = load_whisper_model(settings.WHISPER_MODEL)
+        pcm = open_pcm(video.pcm_path)
+        update_stage_progress(db, run, 10.0)
+
+        aligned = {}
+        too_long = []
+        for i, segment in enumerate(segments):
+            words = align_segment(model, pcm, segment)
+            if words is None:
+                logger.warning(f"Segmento {segment.idx} do vídeo {video_id} longo demais para realinhar")
+                too_long.append(segment.idx)
+            else:
+                aligned[segment.id] = words
+            update_stage_progress(db, run, 10.0 + 80.0 * (i + 1) / len(segments))
+
+        with transcript_lock(video_id):
+            # Estado atual das linhas: segmento editado de novo durante o alinhamento
+            # continua pendente e mantém as palavras que tinha
+            db.expire_all()
+            all_segments = (
+                db.query(TranscriptSegment)
+                .filter(TranscriptSegment.video_id == video_id)
+                .order_by(TranscriptSegment.idx)
+                .all()
+            )
+            current = {segment.id: segment.edited_at for segment in all_segments}
+            aligned = {
+                segment_id: words for segment_id, words in aligned.items()
+                if current.get(segment_id) == edited_at[segment_id]
+            }
+
+            words_path = video.words_path or words_path_for(video.transcript_path)
+            existing = open_words(words_path).words() if os.path.exists(words_path) else []
+            write_words(words_path, splice_words(existing, all_segments, aligned), [segment_payload(s) for s in all_segments])
+            video.words_path = words_path
+
+            # Só os realinhados saem da fila; os longos demais seguem pendentes
+            now = datetime.now()
+            for segment_id in aligned:
+                db.query(TranscriptSegment).filter(
+                    TranscriptSegment.id == segment_id, TranscriptSegment.edited_at == edited_at[segment_id]
+                ).update({TranscriptSegment.aligned_at: now}, synchronize_session=False)
+            db.commit()
+
+        result = None
+        if too_long:
+            result = (f"Segmentos acima de {MAX_ALIGN_SECONDS - 2 * ALIGN_PADDING_SECONDS:.1f}s não realinhados: "
+                      f"{', '.join(str(idx) for idx in too_long)}")
+        finish_stage_run(db, run, result=result)
+        logger.info(f"Realinhamento concluído: {video_id} - {len(aligned)} segmentos")
+
+    except Exception as e:
+        logger.error(f"Erro no realinhamento do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        db.close()
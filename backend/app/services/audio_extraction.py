@@ -1,16 +1,126 @@
 import subprocess
 import os
 import threading
+import re
 from pathlib import Path
 from app.db.database import SessionLocal
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.probe import get_media_duration
+from app.services.pcm import PcmWriter, PCM_SAMPLE_RATE
+from app.services.waveform import build_waveform
 from app.config.settings import settings
 from datetime import datetime
 from loguru import logger
 
+# Linhas do -progress (out_time_ms=..., progress=continue, ...)
+PROGRESS_LINE_RE = re.compile(r"^[a-z_0-9]+=")
+
+PCM_READ_CHUNK = 1024 * 1024
+
+def build_extraction_command(video_path: str, audio_path: str) -> list:
+    """
+    ffmpeg com duas saídas do mesmo decode: MP3 em arquivo e PCM float32 mono
+    16 kHz no stdout. O progresso vai para o stderr (-progress pipe:2).
+    """
+    return [
+        'ffmpeg',
+        '-v', 'error',
+        '-nostats',
+        '-progress', 'pipe:2',
+        '-i', video_path,
+        # Saída 1: MP3 para o player
+        '-map', '0:a:0',
+        '-acodec', 'libmp3lame',
+        '-ab', '192k',
+        '-ar', '44100',
+        '-ac', '2',
+        '-y',
+        audio_path,
+        # Saída 2: PCM para transcrição/análise
+        '-map', '0:a:0',
+        '-acodec', 'pcm_f32le',
+        '-ar', str(PCM_SAMPLE_RATE),
+        '-ac', '1',
+        '-f', 'f32le',
+        'pipe:1'
+    ]
+
+def extract_audio_and_pcm(
+    video_path: str,
+    audio_path: str,
+    pcm_path: str,
+    duration: float,
+    on_progress=None,
+    timeout: int = 300
+) -> PcmWriter:
+    """
+    Extrai o MP3 e grava o PCM decodificado (com hash) em streaming.
+    Retorna o PcmWriter já fechado (num_samples, sha256).
+    """
+    process = subprocess.Popen(
+        build_extraction_command(video_path, audio_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    
+    # Thread do stderr: separa linhas de progresso (key=value) das mensagens de erro
+    state = {"progress": None}
+    stderr_lines = []
+    def read_stderr():
+        for raw in process.stderr:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if line.startswith('out_time_ms='):
+                try:
+                    current_time = int(line.split('=')[1]) / 1000000.0
+                    if duration > 0:
+                        state["progress"] = min(current_time / duration * 100, 99)
+                except ValueError:
+                    pass
+            elif not PROGRESS_LINE_RE.match(line):
+                stderr_lines.append(line)
+                logger.warning(f"FFmpeg stderr: {line}")
+    
+    stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+    stderr_thread.start()
+    
+    writer = PcmWriter(pcm_path)
+    try:
+        reported = None
+        while True:
+            chunk = process.stdout.read(PCM_READ_CHUNK)
+            if not chunk:
+                break
+            writer.write(chunk)
+            # DB só é tocado nesta thread
+            progress = state["progress"]
+            if on_progress and progress is not None and progress != reported:
+                reported = progress
+                on_progress(progress)
+        
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.error("FFmpeg travou! Matando processo...")
+            process.kill()
+            raise Exception(f"FFmpeg travou após {timeout}s sem resposta")
+        
+        stderr_thread.join(timeout=10)
+        if returncode != 0:
+            stderr = "\n".join(stderr_lines)
+            raise Exception(f"Erro no ffmpeg (código {returncode}): {stderr[-500:]}")
+        
+        writer.close()
+        return writer
+    except Exception:
+        writer.abort()
+        raise
+
 def extract_audio_task(video_id: int):
     """Task em background para extrair áudio do vídeo usando ffmpeg"""
     db = SessionLocal()
+    run = None
     
     try:
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -21,6 +131,8 @@ def extract_audio_task(video_id: int):
         
         logger.info(f"Iniciando extração de áudio: {video.id} - {video.title}")
         
+        run = start_stage_run(db, video, PipelineStage.audio_extraction)
+        
         if not video.video_path or not os.path.exists(video.video_path):
             raise Exception("Arquivo de vídeo não encontrado")
         
@@ -34,150 +146,49 @@ def extract_audio_task(video_id: int):
         
         logger.info(f"Extraindo áudio de {video.video_path} para {audio_path}")
         
-        # Primeiro, pega a duração do vídeo
-        probe_command = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            video.video_path
-        ]
-        
-        probe_result = subprocess.run(probe_command, capture_output=True, text=True)
-        total_duration = float(probe_result.stdout.strip()) if probe_result.stdout.strip() else 0
+        # Duração vem do probe feito após o download (sem rodar ffprobe de novo)
+        total_duration = get_media_duration(db, video)
         
         logger.info(f"Duração total do vídeo: {total_duration}s")
         
-        # Comando ffmpeg para extrair áudio com progresso
-        command = [
-            'ffmpeg',
-            '-i', video.video_path,
-            '-vn',  # Sem vídeo
-            '-acodec', 'libmp3lame',
-            '-ab', '192k',
-            '-ar', '44100',
-            '-ac', '2',
-            '-y',  # Sobrescrever se existir
-            '-progress', 'pipe:1',  # Output de progresso
-            audio_path
-        ]
-        
-        # Executa comando com captura de progresso
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            bufsize=1
-        )
-        
-        # Thread para consumir stderr e evitar deadlock
-        stderr_lines = []
-        def read_stderr():
-            try:
-                for line in process.stderr:
-                    stderr_lines.append(line)
-                    # Log stderr em tempo real para debug
-                    if 'error' in line.lower() or 'warning' in line.lower():
-                        logger.warning(f"FFmpeg stderr: {line.strip()}")
-            except Exception as e:
-                logger.error(f"Erro ao ler stderr: {e}")
-        
-        stderr_thread = threading.Thread(target=read_stderr, daemon=True)
-        stderr_thread.start()
-        logger.info("Thread stderr iniciada")
-        
-        # Monitora progresso
-        current_time = 0
-        line_count = 0
-        last_progress_time = 0
-        logger.info("Iniciando monitoramento de progresso do ffmpeg...")
-        
-        try:
-            for line in process.stdout:
-                line = line.strip()
-                line_count += 1
-                
-                # Log a cada 100 linhas para debug
-                if line_count % 100 == 0:
-                    logger.debug(f"Processadas {line_count} linhas do ffmpeg")
-                
-                # Log todas as linhas que começam com 'progress' para debug
-                if line.startswith('progress='):
-                    logger.debug(f"Progress line: {line}")
-                
-                if line.startswith('out_time_ms='):
-                    try:
-                        microseconds = int(line.split('=')[1])
-                        current_time = microseconds / 1000000.0  # Converte para segundos
-                        
-                        if total_duration > 0:
-                            progress = min((current_time / total_duration) * 100, 99)
-                            
-                            # Só atualiza DB se mudou significativamente (evita muitos commits)
-                            if progress - last_progress_time >= 0.1:
-                                video.audio_extraction_progress = progress
-                                db.commit()
-                                db.refresh(video)
-                                last_progress_time = progress
-                                logger.debug(f"Progresso: {progress:.1f}% (tempo: {current_time:.1f}s/{total_duration:.1f}s)")
-                    except Exception as e:
-                        logger.warning(f"Erro ao processar linha de progresso: {line} - {e}")
-                        
-        except Exception as e:
-            logger.error(f"Erro no loop de progresso: {e}", exc_info=True)
-        
-        logger.info(f"Loop de progresso finalizado após {line_count} linhas")
-        logger.info(f"Tempo de progresso final: {current_time:.1f}s")
+        # Um único decode gera o MP3 (player) e o PCM 16 kHz (análise/transcrição)
+        pcm_path = os.path.join(audio_dir, f"{video.youtube_id}.f32")
         
-        # Verifica se o processo ainda está rodando
-        if process.poll() is None:
-            logger.info("Processo ffmpeg ainda rodando, aguardando...")
-        else:
-            logger.info(f"Processo ffmpeg já finalizou com código: {process.poll()}")
+        def on_progress(progress: float):
+            if update_stage_progress(db, run, progress, min_delta=0.1):
+                logger.debug(f"Progresso: {progress:.1f}%")
         
-        # Aguarda conclusão com timeout
-        logger.info("Aguardando conclusão do processo ffmpeg...")
-        try:
-            returncode = process.wait(timeout=300)  # 5 minutos de timeout
-            logger.info(f"Processo ffmpeg finalizado com código: {returncode}")
-        except subprocess.TimeoutExpired:
-            logger.error("FFmpeg travou! Matando processo...")
-            process.kill()
-            raise Exception("FFmpeg travou após 5 minutos sem resposta")
+        pcm = extract_audio_and_pcm(video.video_path, audio_path, pcm_path, total_duration, on_progress)
         
-        # Aguarda thread do stderr
-        logger.info("Aguardando thread stderr...")
-        stderr_thread.join(timeout=10)
-        stderr = ''.join(stderr_lines)
-        
-        if stderr:
-            logger.info(f"STDERR do ffmpeg ({len(stderr)} chars): {stderr[-1000:]}")  # Últimos 1000 chars
-        
-        if returncode != 0:
-            error_msg = f"Erro no ffmpeg (código {returncode}): {stderr[-500:]}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
-        
-        # Verifica se o arquivo foi criado
-        logger.info(f"Verificando se arquivo de áudio foi criado: {audio_path}")
         if not os.path.exists(audio_path):
             raise Exception("Arquivo de áudio não foi criado")
         
         file_size = os.path.getsize(audio_path)
         logger.info(f"Arquivo de áudio criado com sucesso! Tamanho: {file_size / 1024 / 1024:.2f}MB")
+        logger.info(f"PCM decodificado: {pcm.num_samples / PCM_SAMPLE_RATE:.1f}s em {pcm_path}")
+        
+        # Picos da waveform para o player de revisão (falha não bloqueia a etapa)
+        waveform_path = os.path.join(audio_dir, f"{video.youtube_id}.peaks.npz")
+        try:
+            build_waveform(pcm_path, waveform_path)
+            video.waveform_path = waveform_path
+        except Exception as e:
+            logger.warning(f"Não foi possível gerar a waveform do vídeo {video.id}: {e}")
         
         # Atualiza vídeo com sucesso
         video.audio_path = audio_path
+        video.pcm_path = pcm_path
+        video.audio_sha256 = pcm.sha256
         video.status = VideoStatus.audio_extracted
         video.audio_extraction_progress = 100.0
         video.extracted_at = datetime.now()
-        db.commit()
+        finish_stage_run(db, run)
         
         logger.info(f"Extração de áudio concluída: {video.id} - {audio_path}")
         
     except Exception as e:
         logger.error(f"Erro na extração de áudio do vídeo {video_id}: {e}", exc_info=True)
+        db.rollback()
         
         # Atualiza com erro mas mantém status anterior para permitir retry
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -187,7 +198,10 @@ def extract_audio_task(video_id: int):
             video.status = VideoStatus.audio_extraction_failed
             video.audio_extraction_error = str(e)
             video.audio_extraction_progress = 0.0
-            db.commit()
+            if run:
+                finish_stage_run(db, run, error=str(e))
+            else:
+                db.commit()
             logger.info(f"Status atualizado para audio_extraction_failed")
     
     finally:
@@ -0,0 +1,106 @@
+"""
+Legendas do próprio YouTube como atalho da transcrição.
+
+Muitos vídeos já têm legenda em português (manual ou automática do YouTube).
+Buscamos a faixa em json3 pelo yt-dlp e convertemos para o mesmo formato de
+`segments` do Whisper; o Whisper só roda se não houver legenda utilizável.
+"""
+import re
+import json
+from typing import Optional
+import yt_dlp
+from loguru import logger
+
+# Ordem de preferência das faixas manuais
+CAPTION_LANGUAGES = ("pt-BR", "pt", "pt-PT")
+
+# Legenda automática no idioma original do áudio (as demais são traduções automáticas)
+AUTO_CAPTION_LANGUAGES = ("pt-orig", "pt-BR-orig")
+
+# Anotações como "[Música]" ou "[Aplausos]" não são fala
+_ANNOTATION_RE = re.compile(r"^\[[^\]]*\]$")
+
+def parse_json3(data: dict) -> list[dict]:
+    """
+    Converte o json3 do YouTube em segmentos {start, end, text} (segundos).
+    Eventos sem texto (quebras de linha, janelas) são ignorados e o fim de cada
+    segmento é limitado ao início do próximo: as legendas automáticas rolam em
+    duas linhas e os eventos se sobrepõem.
+    """
+    segments = []
+    for event in data.get("events", []):
+        if "segs" not in event or "tStartMs" not in event:
+            continue
+        text = " ".join("".join(seg.get("utf8", "") for seg in event["segs"]).split())
+        if not text or _ANNOTATION_RE.match(text):
+            continue
+        start = event["tStartMs"] / 1000.0
+        end = start + event.get("dDurationMs", 0) / 1000.0
+        segments.append({"start": start, "end": end, "text": text})
+
+    segments.sort(key=lambda segment: segment["start"])
+    for current, following in zip(segments, segments[1:]):
+        current["end"] = max(current["start"], min(current["end"], following["start"]))
+    return segments
+
+def _json3_track(tracks: list[dict]) -> Optional[dict]:
+    return next((track for track in tracks or [] if track.get("ext") == "json3"), None)
+
+def select_caption_track(info: dict) -> Optional[tuple[str, str, dict]]:
+    """
+    Escolhe a melhor faixa em português. Retorna (origem, idioma, faixa) com
+    origem "youtube_manual" ou "youtube_auto", ou None.
+    """
+    subtitles = info.get("subtitles") or {}
+    for language in CAPTION_LANGUAGES:
+        track = _json3_track(subtitles.get(language))
+        if track:
+            return "youtube_manual", language, track
+
+    automatic = info.get("automatic_captions") or {}
+    languages = list(AUTO_CAPTION_LANGUAGES)
+    # yt-dlp antigo não marca "-orig": só confia em "pt" se o áudio for português
+    if (info.get("language") or "").startswith("pt"):
+        languages.append("pt")
+    for language in languages:
+        track = _json3_track(automatic.get(language))
+        if track:
+            return "youtube_auto", language, track
+
+    return None
+
+def fetch_captions(youtube_id: str) -> Optional[dict]:
+    """
+    Busca a legenda em português do vídeo. Retorna {source, language, segments}
+    ou None se não houver legenda utilizável (ou se a busca falhar).
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitlesformat': 'json3',
+        'socket_timeout': 10,
+    }
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(f"https://youtube.com/watch?v={youtube_id}", download=False)
+            selected = select_caption_track(info or {})
+            if not selected:
+                logger.info(f"Sem legenda em português no YouTube: {youtube_id}")
+                return None
+
+            source, language, track = selected
+            data = json.loads(ydl.urlopen(track["url"]).read())
+    except Exception as e:
+        logger.warning(f"Falha ao buscar legendas do YouTube ({youtube_id}): {e}")
+        return None
+
+    segments = parse_json3(data)
+    if not segments:
+        logger.info(f"Legenda {language} do YouTube vazia: {youtube_id}")
+        return None
+
+    return {"source": source, "language": language, "segments": segments}
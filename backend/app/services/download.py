@@ -1,6 +1,10 @@
 from app.db.database import SessionLocal
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
 from app.services.youtube import youtube_service
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.media import ensure_faststart
+from app.services.probe import get_probe
 from app.config.settings import settings
 from datetime import datetime
 from loguru import logger
@@ -9,6 +13,7 @@ import os
 def download_video_task(video_id: int):
     """Task em background para baixar vídeo"""
     db = SessionLocal()
+    run = None
     
     try:
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -19,14 +24,15 @@ def download_video_task(video_id: int):
         
         logger.info(f"Iniciando download do vídeo: {video.id} - {video.title}")
         
+        run = start_stage_run(db, video, PipelineStage.download)
+        
         # Cria diretório se não existir
         os.makedirs(settings.DOWNLOADS_PATH, exist_ok=True)
         
-        # Callback para atualizar progresso
+        # Callback para atualizar progresso (grava só em stage_runs)
         def update_progress(progress: float):
-            video.download_progress = round(progress, 2)
-            db.commit()
-            logger.info(f"Progresso do download {video.id}: {progress:.1f}%")
+            if update_stage_progress(db, run, progress, min_delta=0.5):
+                logger.info(f"Progresso do download {video.id}: {progress:.1f}%")
         
         # Faz o download
         filepath = youtube_service.download_video(
@@ -35,17 +41,25 @@ def download_video_task(video_id: int):
             progress_callback=update_progress
         )
         
+        # Move o moov para o início: o player começa sem buscar o fim do arquivo
+        if ensure_faststart(filepath):
+            video.faststart_at = datetime.now()
+        
         # Atualiza vídeo com sucesso
         video.video_path = filepath
         video.status = VideoStatus.downloaded
         video.download_progress = 100.0
         video.downloaded_at = datetime.now()
-        db.commit()
+        finish_stage_run(db, run)
         
         logger.info(f"Download concluído: {video.id} - {filepath}")
         
+        # Probe único (trilhas, codecs, keyframes) lido pelas etapas seguintes
+        get_probe(db, video)
+        
     except Exception as e:
         logger.error(f"Erro no download do vídeo {video_id}: {e}")
+        db.rollback()
         
         # Atualiza com erro específico de download
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -53,7 +67,10 @@ def download_video_task(video_id: int):
             video.status = VideoStatus.download_failed
             video.download_error = str(e)
             video.download_progress = 0.0
-            db.commit()
+            if run:
+                finish_stage_run(db, run, error=str(e))
+            else:
+                db.commit()
     
     finally:
         db.close()
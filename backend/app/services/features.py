@@ -0,0 +1,182 @@
+"""
+Features de sinal por vídeo a 10 Hz, calculadas uma vez a partir do PCM:
+
+- `rms_db`: energia RMS de cada quadro de 100 ms (dBFS)
+- `loudness_lufs`: loudness momentânea estilo BS.1770 (ponderação K, janela de 400 ms)
+- `spectral_flux`: variação espectral positiva entre quadros (mudanças de cena, risadas, gritos)
+- `speech`: máscara barata de fala (energia acima do ruído + energia na banda de voz)
+
+Usadas pelas fases de análise/highlights e pelo pré-filtro de fala da transcrição.
+"""
+import os
+from typing import Optional
+import numpy as np
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.pcm import open_pcm
+from loguru import logger
+
+FEATURE_RATE = 10  # quadros por segundo
+FFT_SIZE = 2048
+FRAMES_PER_BLOCK = 3000  # 5 min de áudio por bloco: memória limitada em trilhas longas
+MOMENTARY_FRAMES = 4  # 400 ms (BS.1770)
+FEATURE_NAMES = ("rms_db", "loudness_lufs", "spectral_flux", "speech")
+
+SPEECH_BAND_HZ = (300.0, 3400.0)
+SPEECH_MARGIN_DB = 10.0  # acima do piso de ruído
+SPEECH_BAND_RATIO = 0.5
+SPEECH_SMOOTH_FRAMES = 5
+
+_EPS = 1e-10
+
+# Filtros de ponderação K do BS.1770 (shelf + passa-alta), coeficientes de 48 kHz.
+# Aplicados como resposta de magnitude no espectro de cada quadro: evita filtrar
+# a trilha inteira amostra a amostra
+_K_SHELF = ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585])
+_K_HIGHPASS = ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621])
+
+def _biquad_power(coefficients, freqs: np.ndarray, fs: float = 48000.0) -> np.ndarray:
+    b, a = coefficients
+    z = np.exp(-1j * 2 * np.pi * freqs / fs)
+    numerator = b[0] + b[1] * z + b[2] * z ** 2
+    denominator = a[0] + a[1] * z + a[2] * z ** 2
+    return np.abs(numerator / denominator) ** 2
+
+def k_weighting_power(freqs: np.ndarray) -> np.ndarray:
+    """Ganho de potência da ponderação K em cada frequência"""
+    return _biquad_power(_K_SHELF, freqs) * _biquad_power(_K_HIGHPASS, freqs)
+
+def _smooth_mask(mask: np.ndarray, width: int) -> np.ndarray:
+    """Maioria numa janela deslizante: remove quadros isolados"""
+    if len(mask) == 0 or width <= 1:
+        return mask
+    votes = np.convolve(mask.astype(np.float32), np.ones(width, dtype=np.float32), mode="same")
+    return votes > width / 2
+
+def compute_features(samples: np.ndarray, sample_rate: int, on_progress=None) -> dict[str, np.ndarray]:
+    """Calcula todas as features em blocos de quadros, vetorizado por bloco"""
+    hop = sample_rate // FEATURE_RATE
+    num_frames = int(np.ceil(len(samples) / hop))
+
+    freqs = np.fft.rfftfreq(FFT_SIZE, 1.0 / sample_rate)
+    k_weights = k_weighting_power(freqs)
+    speech_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    window = np.hanning(hop).astype(np.float32)
+    # Parseval (espectro de um lado): a soma da potência escalada é o quadrado médio do quadro
+    spectrum_scale = 2.0 / (FFT_SIZE * np.sum(window ** 2))
+
+    rms_db = np.empty(num_frames, dtype=np.float32)
+    k_power = np.empty(num_frames, dtype=np.float64)
+    flux = np.empty(num_frames, dtype=np.float32)
+    band_ratio = np.empty(num_frames, dtype=np.float32)
+    previous_log_magnitude = None
+
+    for first in range(0, num_frames, FRAMES_PER_BLOCK):
+        last = min(first + FRAMES_PER_BLOCK, num_frames)
+        block = np.asarray(samples[first * hop:last * hop], dtype=np.float32)
+        if len(block) < (last - first) * hop:
+            block = np.pad(block, (0, (last - first) * hop - len(block)))
+        frames = block.reshape(-1, hop)
+
+        rms_db[first:last] = 10 * np.log10(np.mean(frames ** 2, axis=1) + _EPS)
+
+        power = np.abs(np.fft.rfft(frames * window, n=FFT_SIZE, axis=1)) ** 2 * spectrum_scale
+        k_power[first:last] = np.sum(power * k_weights, axis=1)
+        band_ratio[first:last] = np.sum(power[:, speech_band], axis=1) / (np.sum(power, axis=1) + _EPS)
+
+        log_magnitude = np.log1p(np.sqrt(power))
+        if previous_log_magnitude is None:
+            previous = np.vstack([log_magnitude[:1], log_magnitude[:-1]])
+        else:
+            previous = np.vstack([previous_log_magnitude, log_magnitude[:-1]])
+        flux[first:last] = np.sum(np.maximum(log_magnitude - previous, 0), axis=1) / log_magnitude.shape[1]
+        previous_log_magnitude = log_magnitude[-1:]
+
+        if on_progress:
+            on_progress(last / num_frames * 100)
+
+    # Loudness momentânea: média da potência ponderada nos últimos 400 ms
+    cumulative = np.concatenate([[0.0], np.cumsum(k_power)])
+    starts = np.maximum(np.arange(1, num_frames + 1) - MOMENTARY_FRAMES, 0)
+    counts = np.arange(1, num_frames + 1) - starts
+    momentary = (cumulative[1:] - cumulative[starts]) / np.maximum(counts, 1)
+    loudness = (-0.691 + 10 * np.log10(momentary + _EPS)).astype(np.float32)
+
+    # Piso de ruído pelo percentil baixo da energia; fala = acima do piso e concentrada na banda de voz
+    noise_floor = np.percentile(rms_db, 10) if num_frames else 0.0
+    speech = (rms_db > noise_floor + SPEECH_MARGIN_DB) & (band_ratio > SPEECH_BAND_RATIO)
+    speech = _smooth_mask(speech, SPEECH_SMOOTH_FRAMES)
+
+    return {
+        "rms_db": rms_db,
+        "loudness_lufs": loudness,
+        "spectral_flux": flux,
+        "speech": speech.astype(np.uint8),
+    }
+
+def build_features(pcm_path: str, features_path: str, on_progress=None) -> dict[str, np.ndarray]:
+    """Calcula as features do PCM e grava o .npz"""
+    pcm = open_pcm(pcm_path)
+    features = compute_features(pcm.samples, pcm.sample_rate, on_progress)
+
+    tmp_path = f"{features_path}.part.npz"
+    np.savez(tmp_path, frame_rate=np.int32(FEATURE_RATE), **features)
+    os.replace(tmp_path, features_path)
+    return features
+
+def load_features(features_path: str) -> dict[str, np.ndarray]:
+    with np.load(features_path) as data:
+        return {name: data[name] for name in FEATURE_NAMES}
+
+def feature_window(features: dict[str, np.ndarray], start: float = 0.0, end: Optional[float] = None) -> tuple[int, dict[str, np.ndarray]]:
+    """Recorta a janela [start, end) em segundos. Retorna (primeiro quadro, arrays)"""
+    num_frames = len(features["rms_db"])
+    first = min(int(start * FEATURE_RATE), num_frames)
+    last = num_frames if end is None else min(int(np.ceil(end * FEATURE_RATE)), num_frames)
+    return first, {name: values[first:max(first, last)] for name, values in features.items()}
+
+def compute_features_task(video_id: int):
+    """
+    Task em background que calcula as features de sinal do vídeo.
+    Etapa auxiliar: falhas ficam em stage_runs e não mudam o status do vídeo.
+    """
+    db = SessionLocal()
+    run = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.pcm_path or not os.path.exists(video.pcm_path):
+            logger.warning(f"Features ignoradas: vídeo {video_id} sem PCM decodificado")
+            return
+
+        logger.info(f"Calculando features de sinal: {video.id} - {video.title}")
+        run = start_stage_run(db, video, PipelineStage.features)
+
+        features_path = f"{os.path.splitext(video.pcm_path)[0]}.features.npz"
+        features = build_features(
+            video.pcm_path,
+            features_path,
+            on_progress=lambda progress: update_stage_progress(db, run, min(progress, 99), min_delta=5.0)
+        )
+
+        video.features_path = features_path
+        finish_stage_run(db, run)
+
+        speech_ratio = float(features["speech"].mean()) if len(features["speech"]) else 0.0
+        logger.info(f"Features calculadas: {video.id} - {len(features['rms_db'])} quadros, {speech_ratio:.0%} fala")
+
+    except Exception as e:
+        logger.error(f"Erro ao calcular features do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        db.close()
@@ -0,0 +1,352 @@
+"""
+Fingerprint de áudio por picos espectrais (estilo constelação) para achar
+vídeos que são cópias cortadas/re-encodadas de outros já processados.
+
+- Picos: máximos locais do espectrograma (log) numa vizinhança tempo x
+  frequência, com densidade limitada por segundo. Tudo vetorizado por bloco.
+- Hashes: cada pico âncora é pareado com os próximos FAN_OUT picos;
+  hash = (freq âncora, freq alvo, distância em quadros), 24 bits.
+- Índice: tabela `audio_fingerprints` (hash -> vídeo, quadro) para achar
+  candidatos, só com uma amostra determinística dos valores de hash (a mesma
+  na indexação e na busca) e sem hashes repetidos demais; o alinhamento fino
+  usa o arquivo .fp.npz completo de cada vídeo.
+- Alinhamento: o offset (quadro na origem - quadro aqui) mais votado entre os
+  hashes em comum, e o trecho contínuo onde esse offset se repete.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import insert, func
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.audio_fingerprint import AudioFingerprint, AudioMatch
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.pcm import open_pcm, PCM_SAMPLE_RATE
+from loguru import logger
+
+FFT_SIZE = 1024
+HOP = 512  # 31.25 quadros/s a 16 kHz
+FREQ_BINS = 512  # bins 1..512 (sem DC): 9 bits
+BLOCK_FRAMES = 4096
+
+PEAK_FREQ_RADIUS = 12
+PEAK_TIME_RADIUS = 8
+PEAK_MIN_DB = 10.0  # acima da mediana do bloco
+PEAK_BUCKET_FRAMES = 32  # ~1 s; divide BLOCK_FRAMES
+PEAKS_PER_BUCKET = 10
+
+FAN_OUT = 5
+MAX_DT = 63  # 6 bits
+
+# Só 1 em cada INDEX_HASH_MODULUS valores de hash vai para a tabela (~4x menos linhas)
+INDEX_HASH_MODULUS = 4
+
+# Busca no índice e alinhamento
+MAX_LOOKUP_HASHES = 2000
+LOOKUP_CHUNK = 500
+MAX_HASH_OCCURRENCES = 50  # hashes muito comuns (silêncio, ruído) não discriminam
+MIN_CANDIDATE_VOTES = 5
+MAX_CANDIDATES = 3
+MIN_MATCH_VOTES = 20
+MIN_OVERLAP_SECONDS = 10.0
+REGION_BIN_FRAMES = 64  # ~2 s
+MAX_REGION_GAP_BINS = 5
+
+def frames_to_seconds(frames, sample_rate: int = PCM_SAMPLE_RATE):
+    return frames * HOP / sample_rate
+
+@dataclass
+class Alignment:
+    offset_frames: int  # quadro na origem = quadro aqui + offset
+    votes: int
+    start_frame: int
+    end_frame: int
+
+def _local_max(spectrum: np.ndarray) -> np.ndarray:
+    """Máximo na vizinhança (2R+1) em frequência e tempo, filtro separável"""
+    padded = np.pad(spectrum, ((0, 0), (PEAK_FREQ_RADIUS, PEAK_FREQ_RADIUS)), constant_values=-np.inf)
+    maxima = sliding_window_view(padded, 2 * PEAK_FREQ_RADIUS + 1, axis=1).max(axis=2)
+    padded = np.pad(maxima, ((PEAK_TIME_RADIUS, PEAK_TIME_RADIUS), (0, 0)), constant_values=-np.inf)
+    return sliding_window_view(padded, 2 * PEAK_TIME_RADIUS + 1, axis=0).max(axis=2)
+
+def find_peaks(samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Picos do espectrograma: (quadros, bins de frequência 0..511), ordenados por tempo"""
+    num_frames = max((len(samples) - FFT_SIZE) // HOP + 1, 0)
+    window = np.hanning(FFT_SIZE).astype(np.float32)
+    times, freqs = [], []
+
+    for first in range(0, num_frames, BLOCK_FRAMES):
+        last = min(first + BLOCK_FRAMES, num_frames)
+        # Contexto dos dois lados para o máximo local não depender do corte do bloco
+        context_first = max(first - PEAK_TIME_RADIUS, 0)
+        context_last = min(last + PEAK_TIME_RADIUS, num_frames)
+        chunk = np.asarray(samples[context_first * HOP:(context_last - 1) * HOP + FFT_SIZE], dtype=np.float32)
+        frames = sliding_window_view(chunk, FFT_SIZE)[::HOP]
+
+        magnitude = np.abs(np.fft.rfft(frames * window, axis=1))[:, 1:FREQ_BINS + 1]
+        spectrum = 20 * np.log10(magnitude + 1e-6)
+        is_peak = (spectrum == _local_max(spectrum)) & (spectrum > np.median(spectrum) + PEAK_MIN_DB)
+
+        own = slice(first - context_first, last - context_first)
+        t, f = np.nonzero(is_peak[own])
+        if not len(t):
+            continue
+        amplitude = spectrum[own][t, f]
+        t = t + first
+
+        # Densidade limitada: os PEAKS_PER_BUCKET mais fortes de cada ~1 s
+        bucket = t // PEAK_BUCKET_FRAMES
+        order = np.lexsort((-amplitude, bucket))
+        bucket_sorted = bucket[order]
+        bucket_start = np.searchsorted(bucket_sorted, bucket_sorted, side="left")
+        keep = order[np.arange(len(order)) - bucket_start < PEAKS_PER_BUCKET]
+
+        times.append(t[keep])
+        freqs.append(f[keep])
+
+    if not times:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    times, freqs = np.concatenate(times).astype(np.int32), np.concatenate(freqs).astype(np.int32)
+    order = np.lexsort((freqs, times))
+    return times[order], freqs[order]
+
+def peak_hashes(times: np.ndarray, freqs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pares âncora -> próximos picos. Retorna (hashes, quadro da âncora), ordenados por hash"""
+    hashes, offsets = [], []
+    for k in range(1, FAN_OUT + 1):
+        if len(times) <= k:
+            break
+        dt = times[k:] - times[:-k]
+        valid = (dt >= 1) & (dt <= MAX_DT)
+        hashes.append((freqs[:-k][valid] << 15) | (freqs[k:][valid] << 6) | dt[valid])
+        offsets.append(times[:-k][valid])
+
+    if not hashes:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    hashes, offsets = np.concatenate(hashes).astype(np.int32), np.concatenate(offsets).astype(np.int32)
+    order = np.argsort(hashes, kind="stable")
+    return hashes[order], offsets[order]
+
+def compute_fingerprint(samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return peak_hashes(*find_peaks(samples))
+
+def save_fingerprint(path: str, hashes: np.ndarray, offsets: np.ndarray) -> None:
+    tmp_path = f"{path}.part.npz"
+    np.savez(tmp_path, hashes=hashes, offsets=offsets)
+    os.replace(tmp_path, path)
+
+def load_fingerprint(path: str) -> tuple[np.ndarray, np.ndarray]:
+    with np.load(path) as data:
+        return data["hashes"], data["offsets"]
+
+def index_mask(hashes: np.ndarray) -> np.ndarray:
+    """
+    Hashes que entram no índice. A escolha depende só do valor (embaralhado,
+    para não favorecer nenhuma distância), então a busca consulta exatamente
+    os valores que a indexação guardou.
+    """
+    mixed = (hashes.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return (mixed >> np.uint64(16)) % np.uint64(INDEX_HASH_MODULUS) == 0
+
+def _expand_matches(query_hashes, source_hashes):
+    """Índices (query, source) de todos os pares com o mesmo hash; source ordenado por hash"""
+    left = np.searchsorted(source_hashes, query_hashes, side="left")
+    counts = np.searchsorted(source_hashes, query_hashes, side="right") - left
+    counts[counts > MAX_HASH_OCCURRENCES] = 0
+    total = int(counts.sum())
+    query_index = np.repeat(np.arange(len(query_hashes)), counts)
+    first_of_group = np.repeat(np.cumsum(counts) - counts, counts)
+    source_index = np.repeat(left, counts) + (np.arange(total) - first_of_group)
+    return query_index, source_index
+
+def align(query_hashes, query_offsets, source_hashes, source_offsets) -> Optional[Alignment]:
+    """Offset mais votado e o trecho contínuo (no tempo da query) que o sustenta"""
+    query_index, source_index = _expand_matches(query_hashes, source_hashes)
+    if not len(query_index):
+        return None
+
+    diffs = source_offsets[source_index] - query_offsets[query_index]
+    values, counts = np.unique(diffs, return_counts=True)
+    best = int(values[np.argmax(counts)])
+    # Tolerância de 1 quadro (re-encode desloca levemente os picos)
+    matched = np.abs(diffs - best) <= 1
+    matched_times = np.sort(query_offsets[query_index][matched])
+
+    # Maior sequência de blocos de ~2 s com votos, tolerando lacunas curtas
+    bins = matched_times // REGION_BIN_FRAMES
+    breaks = np.flatnonzero(np.diff(bins) > MAX_REGION_GAP_BINS) + 1
+    runs = np.split(matched_times, breaks)
+    run = max(runs, key=len)
+
+    return Alignment(offset_frames=best, votes=len(run), start_frame=int(run[0]), end_frame=int(run[-1]) + 1)
+
+def _lookup_candidates(db, video_id: int, hashes: np.ndarray, offsets: np.ndarray) -> list[int]:
+    """Vídeos com mais votos num offset consistente, usando uma amostra dos hashes no índice"""
+    indexed = index_mask(hashes)
+    hashes, offsets = hashes[indexed], offsets[indexed]
+    if not len(hashes):
+        return []
+    step = max(len(hashes) // MAX_LOOKUP_HASHES, 1)
+    sample_order = np.argsort(offsets, kind="stable")[::step][:MAX_LOOKUP_HASHES]
+    sample_hashes = hashes[sample_order]
+    sample_offsets = offsets[sample_order]
+    by_hash = np.argsort(sample_hashes, kind="stable")
+    sample_hashes, sample_offsets = sample_hashes[by_hash], sample_offsets[by_hash]
+
+    rows = []
+    unique_hashes = np.unique(sample_hashes).tolist()
+    for start in range(0, len(unique_hashes), LOOKUP_CHUNK):
+        # Hashes comuns na biblioteca (silêncio, vinhetas) são descartados no próprio banco
+        rare = (
+            db.query(AudioFingerprint.hash)
+            .filter(AudioFingerprint.hash.in_(unique_hashes[start:start + LOOKUP_CHUNK]))
+            .group_by(AudioFingerprint.hash)
+            .having(func.count() <= MAX_HASH_OCCURRENCES)
+        )
+        rows.extend(
+            db.query(AudioFingerprint.video_id, AudioFingerprint.hash, AudioFingerprint.offset)
+            .join(Video, Video.id == AudioFingerprint.video_id)
+            .filter(
+                AudioFingerprint.hash.in_(rare),
+                AudioFingerprint.video_id != video_id,
+                Video.deleted_at.is_(None)
+            )
+            .all()
+        )
+    if not rows:
+        return []
+
+    row_videos, row_hashes, row_offsets = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    left = np.searchsorted(sample_hashes, row_hashes, side="left")
+    counts = np.searchsorted(sample_hashes, row_hashes, side="right") - left
+    row_index = np.repeat(np.arange(len(row_hashes)), counts)
+    sample_index = np.repeat(left, counts) + (np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    diffs = row_offsets[row_index] - sample_offsets[sample_index]
+    pairs, votes = np.unique(np.stack([row_videos[row_index], diffs], axis=1), axis=0, return_counts=True)
+
+    best_votes = {}
+    for (candidate, _), count in zip(pairs.tolist(), votes.tolist()):
+        best_votes[candidate] = max(best_votes.get(candidate, 0), count)
+    ranked = sorted((v for v, count in best_votes.items() if count >= MIN_CANDIDATE_VOTES), key=lambda v: -best_votes[v])
+    return ranked[:MAX_CANDIDATES]
+
+def video_fingerprint(db, video: Video) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fingerprint do vídeo: do arquivo, ou reconstruído do índice se o arquivo
+    sumiu (só a amostra indexada, então alinha com menos votos)
+    """
+    if video.fingerprint_path and os.path.exists(video.fingerprint_path):
+        return load_fingerprint(video.fingerprint_path)
+    rows = db.query(AudioFingerprint.hash, AudioFingerprint.offset).filter(AudioFingerprint.video_id == video.id).all()
+    hashes = np.array([row[0] for row in rows], dtype=np.int32)
+    offsets = np.array([row[1] for row in rows], dtype=np.int32)
+    order = np.argsort(hashes, kind="stable")
+    return hashes[order], offsets[order]
+
+def find_overlap(db, video: Video, hashes: np.ndarray, offsets: np.ndarray) -> Optional[tuple[Video, Alignment]]:
+    """Melhor vídeo já indexado que contém parte deste áudio"""
+    best = None
+    for candidate_id in _lookup_candidates(db, video.id, hashes, offsets):
+        candidate = db.query(Video).filter(Video.id == candidate_id).first()
+        alignment = align(hashes, offsets, *video_fingerprint(db, candidate))
+        if alignment and (best is None or alignment.votes > best[1].votes):
+            best = (candidate, alignment)
+
+    if not best:
+        return None
+    source, alignment = best
+    overlap = frames_to_seconds(alignment.end_frame - alignment.start_frame)
+    if alignment.votes < MIN_MATCH_VOTES or overlap < MIN_OVERLAP_SECONDS:
+        return None
+    return best
+
+def index_fingerprint(db, video: Video, hashes: np.ndarray, offsets: np.ndarray) -> int:
+    """
+    Substitui as linhas do vídeo na tabela hash pela amostra indexada, sem os
+    hashes que se repetem demais no próprio vídeo. Retorna as linhas gravadas.
+    """
+    db.query(AudioFingerprint).filter(AudioFingerprint.video_id == video.id).delete(synchronize_session=False)
+    _, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    keep = index_mask(hashes) & (counts[inverse] <= MAX_HASH_OCCURRENCES)
+    hashes, offsets = hashes[keep], offsets[keep]
+    if len(hashes):
+        db.execute(
+            insert(AudioFingerprint),
+            [{"hash": h, "video_id": video.id, "offset": o} for h, o in zip(hashes.tolist(), offsets.tolist())]
+        )
+    return len(hashes)
+
+def get_overlap(db, video: Video) -> Optional[AudioMatch]:
+    """Sobreposição registrada para o vídeo (se a origem ainda estiver ativa)"""
+    match = db.query(AudioMatch).filter(AudioMatch.video_id == video.id).first()
+    if not match:
+        return None
+    source = db.query(Video).filter(Video.id == match.source_video_id, Video.deleted_at.is_(None)).first()
+    return match if source else None
+
+def fingerprint_task(video_id: int):
+    """
+    Task em background que calcula e indexa o fingerprint do áudio e procura
+    um vídeo de origem com trecho em comum.
+    """
+    db = SessionLocal()
+    run = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.pcm_path or not os.path.exists(video.pcm_path):
+            logger.warning(f"Fingerprint ignorado: vídeo {video_id} sem PCM decodificado")
+            return
+
+        logger.info(f"Calculando fingerprint de áudio: {video.id} - {video.title}")
+        run = start_stage_run(db, video, PipelineStage.fingerprint)
+
+        pcm = open_pcm(video.pcm_path)
+        hashes, offsets = compute_fingerprint(pcm.samples)
+        update_stage_progress(db, run, 60.0)
+
+        fingerprint_path = f"{os.path.splitext(video.pcm_path)[0]}.fp.npz"
+        save_fingerprint(fingerprint_path, hashes, offsets)
+        video.fingerprint_path = fingerprint_path
+
+        found = find_overlap(db, video, hashes, offsets)
+        update_stage_progress(db, run, 90.0)
+
+        indexed = index_fingerprint(db, video, hashes, offsets)
+        db.query(AudioMatch).filter(AudioMatch.video_id == video.id).delete(synchronize_session=False)
+        if found:
+            source, alignment = found
+            db.add(AudioMatch(
+                video_id=video.id,
+                source_video_id=source.id,
+                offset_seconds=frames_to_seconds(alignment.offset_frames, pcm.sample_rate),
+                start_seconds=frames_to_seconds(alignment.start_frame, pcm.sample_rate),
+                end_seconds=min(frames_to_seconds(alignment.end_frame, pcm.sample_rate), pcm.duration),
+                votes=alignment.votes
+            ))
+            logger.info(
+                f"Vídeo {video.id} contém trecho do vídeo {source.id}: "
+                f"{frames_to_seconds(alignment.start_frame):.0f}s-{frames_to_seconds(alignment.end_frame):.0f}s "
+                f"({alignment.votes} votos)"
+            )
+
+        finish_stage_run(db, run)
+        logger.info(f"Fingerprint indexado: {video.id} - {len(hashes)} hashes, {indexed} no índice")
+
+    except Exception as e:
+        logger.error(f"Erro no fingerprint do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        db.close()
@@ -0,0 +1,180 @@
+"""Empacotamento HLS (fMP4) dos vídeos baixados para seek instantâneo no player"""
+import os
+import re
+import secrets
+import shutil
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.media import run_ffmpeg_with_progress
+from app.services.probe import get_probe, get_media_duration
+from app.services.keyframes import get_keyframe_index
+from app.config.settings import settings
+from loguru import logger
+
+PLAYLIST_NAME = "index.m3u8"
+INIT_NAME = "init.mp4"
+
+# Únicos nomes servidos de dentro do diretório HLS (evita path traversal)
+SEGMENT_NAME_RE = re.compile(r"^(init\.mp4|seg_\d{5}\.m4s)$")
+
+MAP_URI_RE = re.compile(r'(#EXT-X-MAP:.*URI=")([^"]+)(")')
+
+# Codecs que vão para segmentos fMP4 por stream copy e tocam no navegador
+STREAM_COPY_VIDEO_CODECS = ("h264", "hevc")
+STREAM_COPY_AUDIO_CODECS = ("aac", "mp3", None)
+
+def build_hls_command(source_path: str, output_dir: str, stream_copy: bool = True) -> list:
+    """
+    Comando ffmpeg que gera playlist VOD + segmentos fMP4.
+
+    Com stream copy os segmentos são cortados nos keyframes existentes (sem
+    re-encode); no modo transcode forçamos um keyframe por segmento.
+    """
+    segment_seconds = settings.HLS_SEGMENT_SECONDS
+
+    if stream_copy:
+        codec_args = ['-c', 'copy']
+    else:
+        codec_args = [
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+            '-c:a', 'aac',
+            '-b:a', '128k'
+        ]
+
+    return [
+        'ffmpeg',
+        '-v', 'error',
+        '-i', source_path,
+        '-map', '0:v:0',
+        '-map', '0:a:0?',
+        *codec_args,
+        '-f', 'hls',
+        '-hls_time', str(segment_seconds),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_type', 'fmp4',
+        '-hls_fmp4_init_filename', INIT_NAME,
+        '-hls_segment_filename', os.path.join(output_dir, 'seg_%05d.m4s'),
+        '-y',
+        '-progress', 'pipe:1',
+        os.path.join(output_dir, PLAYLIST_NAME)
+    ]
+
+def rewrite_playlist(playlist: str, prefix: str) -> str:
+    """
+    Prefixa as URIs de segmentos e do init com a chave do empacotamento.
+    Como a chave muda a cada empacotamento, as URLs dos segmentos podem ser
+    cacheadas como imutáveis; só a playlist precisa ser revalidada.
+    """
+    lines = []
+    for line in playlist.splitlines():
+        if line.startswith("#EXT-X-MAP:"):
+            line = MAP_URI_RE.sub(lambda m: f"{m.group(1)}{prefix}/{m.group(2)}{m.group(3)}", line)
+        elif line and not line.startswith("#"):
+            line = f"{prefix}/{line}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def hls_segment_path(video: Video, key: str, segment: str):
+    """
+    Resolve o arquivo de um segmento. Retorna None se a chave não for a do
+    empacotamento atual ou se o nome não for um segmento válido.
+    """
+    if not video.hls_path or not SEGMENT_NAME_RE.match(segment):
+        return None
+    if key != os.path.basename(video.hls_path):
+        return None
+    path = os.path.join(video.hls_path, segment)
+    return path if os.path.exists(path) else None
+
+def can_stream_copy(probe, keyframe_index=None) -> bool:
+    """
+    Pelo probe, decide se dá para empacotar sem re-encode (sem probe, tenta).
+    Com stream copy os segmentos só quebram em keyframes: GOPs muito longos
+    gerariam segmentos grandes e seek lento, então nesse caso re-encodamos.
+    """
+    if probe is None:
+        return True
+    if probe.video_codec not in STREAM_COPY_VIDEO_CODECS or probe.audio_codec not in STREAM_COPY_AUDIO_CODECS:
+        return False
+    if keyframe_index is not None and keyframe_index.max_gap() > 2 * settings.HLS_SEGMENT_SECONDS:
+        return False
+    return True
+
+def _package(source_path: str, output_dir: str, duration: float, on_progress, stream_copy: bool = True) -> bool:
+    """Empacota por stream copy; se o codec não permitir, re-encoda. Retorna True se foi copy."""
+    if stream_copy:
+        try:
+            run_ffmpeg_with_progress(build_hls_command(source_path, output_dir, stream_copy=True), duration, on_progress)
+            return True
+        except Exception as e:
+            logger.warning(f"Stream copy para HLS falhou, re-encodando: {e}")
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+
+    run_ffmpeg_with_progress(build_hls_command(source_path, output_dir, stream_copy=False), duration, on_progress)
+    return False
+
+def package_hls_task(video_id: int):
+    """
+    Task em background que gera a versão HLS do vídeo baixado.
+    Etapa opcional: falhas ficam em stage_runs e não mudam o status do vídeo.
+    """
+    db = SessionLocal()
+    run = None
+    tmp_dir = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.video_path or not os.path.exists(video.video_path):
+            logger.warning(f"HLS ignorado: vídeo {video_id} sem arquivo baixado")
+            return
+
+        logger.info(f"Empacotando HLS: {video.id} - {video.title}")
+        run = start_stage_run(db, video, PipelineStage.hls)
+
+        # Cada empacotamento ganha um diretório novo (URLs endereçadas pela chave)
+        hls_root = os.path.join(settings.DOWNLOADS_PATH, "hls")
+        output_dir = os.path.join(hls_root, f"{video.youtube_id}-{secrets.token_hex(4)}")
+        tmp_dir = f"{output_dir}.part"
+        os.makedirs(tmp_dir)
+
+        probe = get_probe(db, video)
+        stream_copy = _package(
+            video.video_path,
+            tmp_dir,
+            duration=get_media_duration(db, video),
+            on_progress=lambda progress: update_stage_progress(db, run, progress, min_delta=1.0),
+            stream_copy=can_stream_copy(probe, get_keyframe_index(db, video))
+        )
+        os.replace(tmp_dir, output_dir)
+        tmp_dir = None
+
+        previous_dir = video.hls_path
+        video.hls_path = output_dir
+        finish_stage_run(db, run)
+
+        if previous_dir and previous_dir != output_dir:
+            shutil.rmtree(previous_dir, ignore_errors=True)
+
+        logger.info(f"HLS gerado ({'stream copy' if stream_copy else 'transcode'}): {video.id} - {output_dir}")
+
+    except Exception as e:
+        logger.error(f"Erro ao empacotar HLS do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        db.close()
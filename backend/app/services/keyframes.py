@@ -0,0 +1,83 @@
+"""Índice de keyframes para seek preciso e planejamento de cortes por stream copy"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.video import Video
+from app.services.probe import get_probe, unpack_keyframes
+
+class KeyframeIndex:
+    """
+    Timestamps (s) ordenados dos keyframes da trilha de vídeo.
+    Todas as consultas são O(log n) por busca binária no array compacto.
+    """
+
+    def __init__(self, timestamps: array):
+        self.timestamps = timestamps
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def before(self, t: float) -> Optional[float]:
+        """Último keyframe em ou antes de t (onde um corte por copy pode começar)"""
+        i = bisect_right(self.timestamps, t)
+        return self.timestamps[i - 1] if i else None
+
+    def after(self, t: float) -> Optional[float]:
+        """Primeiro keyframe em ou depois de t"""
+        i = bisect_left(self.timestamps, t)
+        return self.timestamps[i] if i < len(self.timestamps) else None
+
+    def nearest(self, t: float) -> Optional[float]:
+        """Keyframe mais próximo de t (snap do seek no player)"""
+        before, after = self.before(t), self.after(t)
+        if before is None:
+            return after
+        if after is None:
+            return before
+        return before if t - before <= after - t else after
+
+    def between(self, start: float, end: float) -> array:
+        """Keyframes no intervalo [start, end]"""
+        return self.timestamps[bisect_left(self.timestamps, start):bisect_right(self.timestamps, end)]
+
+    def max_gap(self) -> float:
+        """Maior distância entre keyframes consecutivos (GOP mais longo)"""
+        ts = self.timestamps
+        return max((ts[i + 1] - ts[i] for i in range(len(ts) - 1)), default=0.0)
+
+    def copy_cut(self, start: float, end: float) -> tuple[float, float]:
+        """
+        Intervalo de um corte por stream copy que contém [start, end]: o início
+        recua até o keyframe anterior (o fim pode ser qualquer ponto).
+        """
+        snapped = self.before(start)
+        return (snapped if snapped is not None else 0.0), end
+
+# Índices desserializados ficam em memória; a chave inclui a identidade do
+# arquivo probado, então um novo probe invalida a entrada automaticamente
+_CACHE_SIZE = 32
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[tuple, KeyframeIndex]" = OrderedDict()
+
+def get_keyframe_index(db: Session, video: Video) -> Optional[KeyframeIndex]:
+    """Índice de keyframes do arquivo atual do vídeo (None se não houver probe)"""
+    probe = get_probe(db, video)
+    if probe is None or not probe.keyframe_count:
+        return None
+
+    key = (video.id, probe.file_size, probe.file_mtime)
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+            return index
+
+    index = KeyframeIndex(unpack_keyframes(probe.keyframes))
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
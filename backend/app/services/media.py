@@ -0,0 +1,123 @@
+"""Operações sobre os arquivos de mídia baixados (ffmpeg)"""
+import os
+import struct
+import subprocess
+import threading
+from loguru import logger
+
+FASTSTART_EXTENSIONS = (".mp4", ".m4v", ".mov")
+
+def mp4_has_faststart(path: str) -> bool:
+    """
+    Verifica se o átomo `moov` vem antes do `mdat` percorrendo apenas os
+    cabeçalhos dos boxes de nível superior (sem ler os dados de mídia).
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        position = 0
+        while position + 8 <= file_size:
+            f.seek(position)
+            size, box_type = struct.unpack(">I4s", f.read(8))
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+            elif size == 0:
+                size = file_size - position
+
+            if box_type == b"moov":
+                return True
+            if box_type == b"mdat":
+                return False
+            if size < 8:
+                break
+            position += size
+    return False
+
+def remux_faststart(path: str, timeout: int = 1800) -> None:
+    """
+    Remuxa o arquivo com `-movflags +faststart` (stream copy, sem re-encode)
+    e substitui o original de forma atômica.
+    """
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.faststart{ext}"
+
+    command = [
+        'ffmpeg',
+        '-v', 'error',
+        '-i', path,
+        '-map', '0',
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-y',
+        tmp_path
+    ]
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise Exception(f"Erro no ffmpeg (código {result.returncode}): {result.stderr[-500:]}")
+        if not os.path.exists(tmp_path):
+            raise Exception("Arquivo remuxado não foi criado")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def ensure_faststart(path: str) -> bool:
+    """
+    Garante que o MP4 comece pelo `moov`, para o player iniciar sem buscar o
+    fim do arquivo. Retorna True se o arquivo ficou (ou já estava) fast-start.
+    Falhas não são fatais: o vídeo continua reproduzível, só mais lento.
+    """
+    if not path or not path.lower().endswith(FASTSTART_EXTENSIONS) or not os.path.exists(path):
+        return False
+
+    try:
+        if mp4_has_faststart(path):
+            logger.info(f"Arquivo já é fast-start: {path}")
+            return True
+
+        logger.info(f"Remuxando com +faststart: {path}")
+        remux_faststart(path)
+        logger.info(f"Remux fast-start concluído: {path}")
+        return True
+    except Exception as e:
+        logger.warning(f"Não foi possível aplicar fast-start em {path}: {e}")
+        return False
+
+def run_ffmpeg_with_progress(command: list, duration: float, on_progress=None, timeout: int = 3600) -> None:
+    """
+    Executa um comando ffmpeg que inclui `-progress pipe:1`, repassando o
+    progresso (0-99) para `on_progress`. Lança Exception se o ffmpeg falhar.
+    """
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        bufsize=1
+    )
+
+    # Consome stderr em paralelo para o pipe não encher e travar o processo
+    stderr_lines = []
+    stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+    stderr_thread.start()
+
+    for line in process.stdout:
+        line = line.strip()
+        if on_progress and duration > 0 and line.startswith('out_time_ms='):
+            try:
+                current_time = int(line.split('=')[1]) / 1000000.0
+                on_progress(min(current_time / duration * 100, 99))
+            except ValueError:
+                pass
+
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        raise Exception(f"FFmpeg não terminou em {timeout}s")
+
+    stderr_thread.join(timeout=10)
+    if returncode != 0:
+        stderr = ''.join(stderr_lines)
+        raise Exception(f"Erro no ffmpeg (código {returncode}): {stderr[-500:]}")
@@ -0,0 +1,131 @@
+"""
+Cache de áudio decodificado: PCM float32 mono 16 kHz com cabeçalho fixo.
+
+Um arquivo por vídeo, gerado na extração de áudio. Transcrição, waveform e
+análise de sinal abrem o mesmo arquivo via `numpy.memmap` e fatiam trechos
+por tempo sem decodificar o MP3 de novo nem carregar a trilha inteira na RAM.
+
+Layout (little-endian):
+    0   8s  magic b"AHPCM\\0\\1\\0"
+    8   I   sample_rate
+    12  H   canais
+    14  H   bytes por amostra (4 = float32)
+    16  Q   número de amostras
+    24  -   zeros até HEADER_SIZE
+    64  f4  amostras
+"""
+import hashlib
+import os
+import struct
+from typing import Optional
+import numpy as np
+
+PCM_MAGIC = b"AHPCM\x00\x01\x00"
+PCM_SAMPLE_RATE = 16000
+PCM_CHANNELS = 1
+PCM_DTYPE = np.dtype("<f4")
+HEADER_FORMAT = "<8sIHHQ"
+HEADER_SIZE = 64  # múltiplo de 4: amostras alinhadas para o memmap
+
+class PcmFormatError(Exception):
+    """Arquivo não é um PCM do cache (magic/cabeçalho inválido)"""
+
+def _pack_header(num_samples: int, sample_rate: int = PCM_SAMPLE_RATE) -> bytes:
+    header = struct.pack(HEADER_FORMAT, PCM_MAGIC, sample_rate, PCM_CHANNELS, PCM_DTYPE.itemsize, num_samples)
+    return header.ljust(HEADER_SIZE, b"\0")
+
+def read_pcm_header(path: str) -> tuple[int, int]:
+    """Retorna (sample_rate, num_samples) do arquivo"""
+    with open(path, "rb") as f:
+        data = f.read(struct.calcsize(HEADER_FORMAT))
+    if len(data) < struct.calcsize(HEADER_FORMAT):
+        raise PcmFormatError(f"Cabeçalho PCM truncado: {path}")
+    magic, sample_rate, channels, sample_size, num_samples = struct.unpack(HEADER_FORMAT, data)
+    if magic != PCM_MAGIC or channels != PCM_CHANNELS or sample_size != PCM_DTYPE.itemsize:
+        raise PcmFormatError(f"Arquivo não é PCM do cache: {path}")
+    return sample_rate, num_samples
+
+class PcmWriter:
+    """
+    Grava o PCM em streaming (chunks vindos do ffmpeg) num arquivo temporário,
+    calculando o SHA-256 das amostras no caminho. `close()` completa o
+    cabeçalho e publica o arquivo de forma atômica.
+    """
+
+    def __init__(self, path: str, sample_rate: int = PCM_SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.tmp_path = f"{path}.part"
+        self.num_bytes = 0
+        self._hash = hashlib.sha256()
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(_pack_header(0, sample_rate))
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.num_bytes += len(chunk)
+
+    @property
+    def num_samples(self) -> int:
+        return self.num_bytes // PCM_DTYPE.itemsize
+
+    @property
+    def sha256(self) -> str:
+        """Hash das amostras decodificadas (identidade do conteúdo de áudio)"""
+        return self._hash.hexdigest()
+
+    def close(self) -> None:
+        self._file.seek(0)
+        self._file.write(_pack_header(self.num_samples, self.sample_rate))
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class PcmAudio:
+    """Áudio decodificado mapeado em memória (somente leitura)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sample_rate, self.num_samples = read_pcm_header(path)
+        if self.num_samples:
+            self.samples = np.memmap(path, dtype=PCM_DTYPE, mode="r", offset=HEADER_SIZE, shape=(self.num_samples,))
+        else:
+            # mmap não aceita região vazia
+            self.samples = np.zeros(0, dtype=PCM_DTYPE)
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sample_rate
+
+    def sample_index(self, t: float) -> int:
+        """Índice da amostra no instante t (s), limitado ao arquivo"""
+        return min(max(int(round(t * self.sample_rate)), 0), self.num_samples)
+
+    def slice(self, start: float, end: Optional[float] = None) -> np.ndarray:
+        """Trecho [start, end) em segundos, como view (sem cópia)"""
+        stop = self.num_samples if end is None else self.sample_index(end)
+        return self.samples[self.sample_index(start):stop]
+
+def open_pcm(path: str) -> PcmAudio:
+    return PcmAudio(path)
+
+def write_pcm(path: str, samples: np.ndarray, sample_rate: int = PCM_SAMPLE_RATE) -> str:
+    """Grava amostras já decodificadas (testes/ferramentas). Retorna o SHA-256"""
+    writer = PcmWriter(path, sample_rate)
+    writer.write(np.asarray(samples, dtype=PCM_DTYPE).tobytes())
+    writer.close()
+    return writer.sha256
+
+def pcm_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Recalcula o SHA-256 das amostras de um PCM existente (mesmo valor do PcmWriter)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(HEADER_SIZE)
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
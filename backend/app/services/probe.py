@@ -0,0 +1,172 @@
+"""Probe dos arquivos de mídia (ffprobe) com cache em media_probes"""
+import json
+import os
+import subprocess
+import sys
+from array import array
+from fractions import Fraction
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.video import Video
+from app.models.media_probe import MediaProbe
+from loguru import logger
+
+# Campos mantidos de cada trilha no streams_json (o JSON completo é bem maior)
+STREAM_FIELDS = (
+    "index", "codec_type", "codec_name", "profile", "width", "height", "pix_fmt",
+    "avg_frame_rate", "sample_rate", "channels", "channel_layout", "bit_rate", "duration"
+)
+
+def pack_keyframes(timestamps) -> bytes:
+    """Serializa timestamps como float64 little-endian"""
+    values = array("d", timestamps)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+def unpack_keyframes(data: Optional[bytes]) -> array:
+    """Inverso de pack_keyframes"""
+    values = array("d")
+    if data:
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+    return values
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _frame_rate(value) -> Optional[float]:
+    """Converte '30000/1001' em 29.97 (None para '0/0')"""
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return round(float(rate), 3) if rate else None
+
+def run_ffprobe(path: str, timeout: int = 120) -> dict:
+    """Formato e trilhas do arquivo (JSON do ffprobe)"""
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_format',
+        '-show_streams',
+        '-of', 'json',
+        path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise Exception(f"Erro no ffprobe (código {result.returncode}): {result.stderr[-500:]}")
+    return json.loads(result.stdout or "{}")
+
+def probe_keyframes(path: str, timeout: int = 600) -> list[float]:
+    """
+    Timestamps dos keyframes da primeira trilha de vídeo. Lê só os pacotes
+    (flag K), sem decodificar frames.
+    """
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise Exception(f"Erro no ffprobe (código {result.returncode}): {result.stderr[-500:]}")
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags:
+            timestamp = _float(pts_time)
+            if timestamp is not None:
+                keyframes.append(timestamp)
+    keyframes.sort()
+    return keyframes
+
+def probe_media(db: Session, video: Video) -> MediaProbe:
+    """Roda o ffprobe no arquivo do vídeo e grava (ou substitui) o registro"""
+    path = video.video_path
+    stat_result = os.stat(path)
+
+    info = run_ffprobe(path)
+    streams = info.get("streams", [])
+    container = info.get("format", {})
+    video_stream = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio_stream = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    keyframes = probe_keyframes(path) if video_stream else []
+
+    probe = db.query(MediaProbe).filter(MediaProbe.video_id == video.id).first()
+    if probe is None:
+        probe = MediaProbe(video_id=video.id)
+        db.add(probe)
+
+    probe.file_size = stat_result.st_size
+    probe.file_mtime = stat_result.st_mtime
+    probe.format_name = container.get("format_name")
+    probe.duration_seconds = _float(container.get("duration"))
+    probe.bit_rate = _int(container.get("bit_rate"))
+    probe.video_codec = video_stream.get("codec_name")
+    probe.width = _int(video_stream.get("width"))
+    probe.height = _int(video_stream.get("height"))
+    probe.fps = _frame_rate(video_stream.get("avg_frame_rate"))
+    probe.video_bit_rate = _int(video_stream.get("bit_rate"))
+    probe.audio_codec = audio_stream.get("codec_name")
+    probe.audio_sample_rate = _int(audio_stream.get("sample_rate"))
+    probe.audio_channels = _int(audio_stream.get("channels"))
+    probe.audio_bit_rate = _int(audio_stream.get("bit_rate"))
+    probe.streams_json = json.dumps(
+        [{k: s[k] for k in STREAM_FIELDS if k in s} for s in streams],
+        separators=(",", ":")
+    )
+    probe.keyframes = pack_keyframes(keyframes)
+    probe.keyframe_count = len(keyframes)
+    db.commit()
+
+    logger.info(
+        f"Probe do vídeo {video.id}: {probe.video_codec}/{probe.audio_codec} "
+        f"{probe.width}x{probe.height} {probe.duration_seconds}s, {probe.keyframe_count} keyframes"
+    )
+    return probe
+
+def _is_current(probe: MediaProbe, path: str) -> bool:
+    stat_result = os.stat(path)
+    return probe.file_size == stat_result.st_size and probe.file_mtime == stat_result.st_mtime
+
+def get_probe(db: Session, video: Video) -> Optional[MediaProbe]:
+    """
+    Probe do arquivo atual do vídeo, refazendo-o só se o arquivo mudou.
+    Retorna None (com aviso) se não houver arquivo ou o ffprobe falhar:
+    quem chama usa os metadados do YouTube como fallback.
+    """
+    if not video.video_path or not os.path.exists(video.video_path):
+        return None
+
+    probe = db.query(MediaProbe).filter(MediaProbe.video_id == video.id).first()
+    if probe is not None and _is_current(probe, video.video_path):
+        return probe
+
+    try:
+        return probe_media(db, video)
+    except Exception as e:
+        logger.warning(f"Não foi possível fazer o probe do vídeo {video.id}: {e}")
+        db.rollback()
+        return None
+
+def get_media_duration(db: Session, video: Video) -> float:
+    """Duração do arquivo pelo probe, ou a do YouTube se o probe não estiver disponível"""
+    probe = get_probe(db, video)
+    if probe and probe.duration_seconds:
+        return probe.duration_seconds
+    return float(video.duration_seconds or 0)
@@ -0,0 +1,88 @@
+import os
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.media import run_ffmpeg_with_progress
+from app.services.probe import get_media_duration
+from app.config.settings import settings
+from loguru import logger
+
+def build_proxy_command(source_path: str, output_path: str) -> list:
+    """
+    Comando ffmpeg da versão leve para revisão: baixa resolução, bitrate
+    baixo, preset rápido e keyframe a cada 2s (seek preciso e barato).
+    """
+    return [
+        'ffmpeg',
+        '-v', 'error',
+        '-i', source_path,
+        '-map', '0:v:0',
+        '-map', '0:a:0?',
+        '-vf', f'scale=-2:{settings.PROXY_HEIGHT}',
+        '-c:v', 'libx264',
+        '-preset', 'veryfast',
+        '-b:v', settings.PROXY_VIDEO_BITRATE,
+        '-maxrate', settings.PROXY_VIDEO_BITRATE,
+        '-bufsize', '2M',
+        '-force_key_frames', 'expr:gte(t,n_forced*2)',
+        '-c:a', 'aac',
+        '-b:a', '64k',
+        '-movflags', '+faststart',
+        '-y',
+        '-progress', 'pipe:1',
+        output_path
+    ]
+
+def generate_proxy_task(video_id: int):
+    """
+    Task em background que gera a rendição proxy (ex.: 360p) usada pelo
+    player de revisão. O arquivo original continua sendo a fonte dos cortes.
+    """
+    db = SessionLocal()
+    run = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.video_path or not os.path.exists(video.video_path):
+            logger.warning(f"Proxy ignorado: vídeo {video_id} sem arquivo baixado")
+            return
+
+        logger.info(f"Gerando proxy {settings.PROXY_HEIGHT}p: {video.id} - {video.title}")
+        run = start_stage_run(db, video, PipelineStage.proxy)
+
+        proxy_dir = os.path.join(settings.DOWNLOADS_PATH, "proxy")
+        os.makedirs(proxy_dir, exist_ok=True)
+        proxy_path = os.path.join(proxy_dir, f"{video.youtube_id}_{settings.PROXY_HEIGHT}p.mp4")
+        tmp_path = f"{proxy_path}.part.mp4"
+
+        try:
+            run_ffmpeg_with_progress(
+                build_proxy_command(video.video_path, tmp_path),
+                duration=get_media_duration(db, video),
+                on_progress=lambda progress: update_stage_progress(db, run, progress, min_delta=1.0)
+            )
+            os.replace(tmp_path, proxy_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        video.proxy_path = proxy_path
+        finish_stage_run(db, run)
+
+        logger.info(f"Proxy gerado: {video.id} - {proxy_path} ({os.path.getsize(proxy_path) / 1024 / 1024:.1f}MB)")
+
+    except Exception as e:
+        # Etapa opcional: a falha fica registrada em stage_runs e o status do vídeo não muda
+        logger.error(f"Erro ao gerar proxy do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        db.close()
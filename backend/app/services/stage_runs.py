@@ -0,0 +1,99 @@
+"""Registro de execuções das etapas (tabela stage_runs)"""
+import os
+import socket
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.video import Video
+from app.models.stage_run import StageRun, StageRunStatus, PipelineStage
+from loguru import logger
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Campo legado em VideoResponse que espelha o progresso de cada etapa
+PROGRESS_FIELDS = {
+    PipelineStage.download: "download_progress",
+    PipelineStage.audio_extraction: "audio_extraction_progress",
+    PipelineStage.transcription: "transcription_progress",
+}
+
+def start_stage_run(db: Session, video: Video, stage: PipelineStage) -> StageRun:
+    """
+    Abre uma nova tentativa da etapa. Só as etapas do pipeline principal
+    apontam o vídeo para ela: etapas auxiliares (proxy, hls, features...)
+    rodam em paralelo e não podem tirar o progresso do download/transcrição.
+    """
+    last_attempt = db.query(func.max(StageRun.attempt)).filter(
+        StageRun.video_id == video.id,
+        StageRun.stage == stage
+    ).scalar()
+
+    run = StageRun(
+        video_id=video.id,
+        stage=stage,
+        attempt=(last_attempt or 0) + 1,
+        status=StageRunStatus.running,
+        progress=0.0,
+        started_at=datetime.now(),
+        worker=WORKER_ID
+    )
+    db.add(run)
+    db.flush()
+
+    if stage in PROGRESS_FIELDS:
+        video.current_stage_run_id = run.id
+    db.commit()
+
+    logger.info(f"Etapa {stage.value} iniciada para vídeo {video.id} (tentativa {run.attempt})")
+    return run
+
+def update_stage_progress(db: Session, run: StageRun, progress: float, min_delta: float = 0.1) -> bool:
+    """
+    Atualiza o progresso apenas na linha estreita de stage_runs.
+
+    Ignora variações menores que `min_delta` para não gerar um commit por tick.
+    Retorna True se gravou.
+    """
+    progress = round(min(max(progress, 0.0), 100.0), 2)
+    if progress - (run.progress or 0.0) < min_delta:
+        return False
+
+    run.progress = progress
+    db.commit()
+    return True
+
+def finish_stage_run(db: Session, run: StageRun, error: Optional[str] = None, result: Optional[str] = None):
+    """Fecha a tentativa como sucesso ou falha, registrando a duração e o resumo"""
+    run.finished_at = datetime.now()
+    if run.started_at:
+        run.duration_seconds = (run.finished_at - run.started_at).total_seconds()
+
+    if error is None:
+        run.status = StageRunStatus.succeeded
+        run.progress = 100.0
+        run.result = result
+    else:
+        run.status = StageRunStatus.failed
+        run.error = error
+
+    db.commit()
+
+def get_current_stage_run(db: Session, video: Video) -> Optional[StageRun]:
+    """Retorna a execução apontada pelo vídeo, se houver"""
+    if not video.current_stage_run_id:
+        return None
+    return db.query(StageRun).filter(StageRun.id == video.current_stage_run_id).first()
+
+def get_live_progress(db: Session, video: Video, stage: PipelineStage, fallback: float) -> float:
+    """Progresso da etapa em andamento; fora dela usa o valor gravado no vídeo"""
+    run = get_current_stage_run(db, video)
+    if run and run.stage == stage and run.status == StageRunStatus.running:
+        return run.progress
+    return fallback or 0.0
+
+def list_stage_runs(db: Session, video_id: int) -> list[StageRun]:
+    """Histórico completo de execuções de um vídeo, em ordem cronológica"""
+    return db.query(StageRun).filter(
+        StageRun.video_id == video_id
+    ).order_by(StageRun.started_at, StageRun.id).all()
@@ -0,0 +1,71 @@
+"""Resumo do dashboard (contagem por status e duração média das etapas)"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.video import Video, VideoStatus, IN_FLIGHT_STATUSES, FAILED_STATUSES
+from app.models.stage_run import StageRun, StageRunStatus
+from app.config.settings import settings
+
+# Cache em memória com TTL curto: o dashboard faz polling e várias abas
+# compartilham o mesmo resultado sem voltar ao banco
+_cache_lock = threading.Lock()
+_cache = {"expires_at": 0.0, "data": None}
+
+def _compute_video_stats(db: Session) -> dict:
+    # GROUP BY coberto pelo índice parcial (status, created_at) das linhas ativas
+    rows = db.query(Video.status, func.count(Video.id)).filter(
+        Video.deleted_at.is_(None)
+    ).group_by(Video.status).all()
+
+    counts = {status.value: 0 for status in VideoStatus}
+    for status, count in rows:
+        counts[status.value] = count
+
+    stage_rows = db.query(
+        StageRun.stage,
+        StageRun.status,
+        func.count(StageRun.id),
+        func.avg(StageRun.duration_seconds)
+    ).filter(
+        StageRun.status != StageRunStatus.running
+    ).group_by(StageRun.stage, StageRun.status).all()
+
+    stages = {}
+    for stage, status, count, avg_duration in stage_rows:
+        entry = stages.setdefault(stage.value, {"runs": 0, "failed_runs": 0, "avg_duration_seconds": None})
+        entry["runs"] += count
+        if status == StageRunStatus.failed:
+            entry["failed_runs"] += count
+        else:
+            entry["avg_duration_seconds"] = round(avg_duration, 2) if avg_duration is not None else None
+
+    return {
+        "total": sum(counts.values()),
+        "in_flight": sum(counts[status.value] for status in IN_FLIGHT_STATUSES),
+        "failed": sum(counts[status.value] for status in FAILED_STATUSES),
+        "counts": counts,
+        "stages": stages,
+        "generated_at": datetime.now()
+    }
+
+def get_video_stats(db: Session) -> dict:
+    """Retorna o resumo, recalculando no máximo uma vez por STATS_CACHE_TTL_SECONDS"""
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache["data"] is not None and now < _cache["expires_at"]:
+            return _cache["data"]
+
+    data = _compute_video_stats(db)
+
+    with _cache_lock:
+        _cache["data"] = data
+        _cache["expires_at"] = time.monotonic() + settings.STATS_CACHE_TTL_SECONDS
+    return data
+
+def invalidate_video_stats():
+    """Descarta o resumo em cache (ex.: após criar ou deletar vídeos)"""
+    with _cache_lock:
+        _cache["data"] = None
+        _cache["expires_at"] = 0.0
@@ -0,0 +1,64 @@
+"""
+Modo de transcrição comprimida no tempo.
+
+O áudio de entrada do Whisper é acelerado com o filtro `atempo` do ffmpeg
+(muda a velocidade sem mudar o tom) e os timestamps resultantes são
+multiplicados pelo fator para voltar ao tempo do vídeo. Troca um pouco de
+precisão por throughput em backlogs grandes.
+"""
+import subprocess
+from typing import Union
+import numpy as np
+from app.services.pcm import PCM_SAMPLE_RATE
+
+MIN_SPEED = 1.0
+MAX_SPEED = 2.0  # limite de um único atempo nas versões antigas do ffmpeg
+
+def build_atempo_command(speed: float, source: str = None, sample_rate: int = PCM_SAMPLE_RATE) -> list:
+    """
+    Comando que acelera o áudio e devolve float32 mono em `pipe:1`. Sem
+    `source`, lê amostras float32 de `pipe:0`.
+    """
+    if source:
+        input_args = ['-i', source, '-vn']
+    else:
+        input_args = ['-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0']
+
+    return [
+        'ffmpeg',
+        '-v', 'error',
+        *input_args,
+        '-af', f'atempo={speed:g}',
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-f', 'f32le',
+        'pipe:1'
+    ]
+
+def time_compress(audio: Union[np.ndarray, str], speed: float, sample_rate: int = PCM_SAMPLE_RATE, timeout: int = 1800) -> np.ndarray:
+    """Acelera o áudio (amostras float32 ou caminho de arquivo) pelo fator `speed`"""
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"Velocidade deve estar entre {MIN_SPEED} e {MAX_SPEED}: {speed}")
+
+    if isinstance(audio, str):
+        command, stdin = build_atempo_command(speed, audio, sample_rate), None
+    else:
+        # Visão em bytes das próprias amostras (memmap do PCM inclusive): o pipe lê
+        # direto delas, sem uma cópia do áudio inteiro em `bytes`
+        samples = np.ascontiguousarray(audio, dtype='<f4')
+        command, stdin = build_atempo_command(speed, sample_rate=sample_rate), memoryview(samples).cast('B')
+
+    result = subprocess.run(command, input=stdin, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise Exception(f"Erro no ffmpeg (código {result.returncode}): {result.stderr.decode(errors='replace')[-500:]}")
+    return np.frombuffer(result.stdout, dtype='<f4')
+
+def rescale_segments(segments: list[dict], factor: float) -> list[dict]:
+    """Multiplica os tempos dos segmentos (e das palavras, se houver) pelo fator"""
+    for segment in segments:
+        segment["start"] *= factor
+        segment["end"] *= factor
+        for word in segment.get("words") or []:
+            word["start"] *= factor
+            word["end"] *= factor
+    return segments
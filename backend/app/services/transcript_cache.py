@@ -0,0 +1,94 @@
+"""
+Cache de transcrições endereçado por conteúdo.
+
+A chave é o hash das amostras decodificadas (`Video.audio_sha256`) somado ao
+perfil de transcrição (modelo, modo, velocidade, VAD). O mesmo áudio sob outro
+`youtube_id` (re-upload, corte das nossas lives) ou um retry reaproveitam o
+resultado do Whisper sem rodar o modelo de novo.
+
+Entradas são imutáveis: cada vídeo recebe uma cópia própria da transcrição,
+então edições pelo PUT /transcript não alteram o cache.
+"""
+import os
+import json
+import hashlib
+from typing import Optional
+from datetime import datetime
+from app.config.settings import settings
+from app.models.video import Video
+from app.services.pcm import pcm_sha256
+from app.services.words import write_words, open_words, words_path_for, WordsFormatError
+from loguru import logger
+
+# Incrementar quando a saída do Whisper mudar de formato/semântica
+PROFILE_VERSION = 1
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def transcription_profile(video: Video) -> dict:
+    """Tudo que muda a saída do Whisper para o mesmo áudio"""
+    tiered = settings.TRANSCRIPTION_MODE == "tiered"
+    vad = video.vad_path if video.vad_path and os.path.exists(video.vad_path) else None
+    return {
+        "version": PROFILE_VERSION,
+        "model": settings.WHISPER_MODEL,
+        "mode": settings.TRANSCRIPTION_MODE,
+        "fast_model": settings.WHISPER_FAST_MODEL if tiered else None,
+        "speed": settings.TRANSCRIPTION_SPEED,
+        # Intervalos de fala mudam o que o modelo ouve
+        "vad": _file_sha256(vad) if vad else None,
+    }
+
+def audio_identity(video: Video) -> Optional[str]:
+    """Hash do áudio do vídeo; calcula a partir do PCM em vídeos extraídos antes do hash existir"""
+    if not video.audio_sha256 and video.pcm_path and os.path.exists(video.pcm_path):
+        video.audio_sha256 = pcm_sha256(video.pcm_path)
+    return video.audio_sha256
+
+def cache_key(audio_sha256: str, profile: dict) -> str:
+    payload = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{audio_sha256}:{payload}".encode("utf-8")).hexdigest()
+
+def cache_path(key: str) -> str:
+    return os.path.join(settings.TRANSCRIPTS_PATH, "cache", key[:2], f"{key}.json")
+
+def load_cached(key: str) -> Optional[dict]:
+    """Resultado do Whisper em cache para a chave (com as palavras), ou None"""
+    path = cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)["result"]
+        words = words_path_for(path)
+        if os.path.exists(words):
+            result["words"] = open_words(words).words()
+        return result
+    except (OSError, ValueError, KeyError, WordsFormatError) as e:
+        logger.warning(f"Entrada de cache de transcrição inválida ({key}): {e}")
+        return None
+
+def store_cached(key: str, audio_sha256: str, profile: dict, result: dict) -> None:
+    """Grava a entrada de forma atômica; uma entrada existente nunca é sobrescrita"""
+    path = cache_path(key)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Palavras no mesmo formato colunar da transcrição; gravadas antes do JSON que as publica
+    words = result.get("words") or []
+    if words:
+        write_words(words_path_for(path), words, result["segments"])
+    result = {name: value for name, value in result.items() if name != "words"}
+
+    tmp_path = f"{path}.{os.getpid()}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "audio_sha256": audio_sha256,
+            "profile": profile,
+            "cached_at": datetime.now().isoformat(),
+            "result": result,
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,158 @@
+"""
+Busca textual em todas as transcrições da biblioteca.
+
+No PostgreSQL usa o índice GIN de `to_tsvector('portuguese', text)` sobre
+`transcript_segments` (stemming: "gols" acha "gol"), com ranking por
+`ts_rank` e trecho destacado por `ts_headline`. O índice acompanha as
+transcrições sozinho: as linhas são reescritas na transcrição e nas edições.
+No SQLite (dev/testes) cai para LIKE por termo, sem ranking.
+
+O trecho vai para o front como HTML: o texto é escapado e só as marcas
+`<mark>` ficam cruas.
+"""
+import re
+import html
+from sqlalchemy import func, literal_column, select, exists
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.transcript_segment import TranscriptSegment, SEARCH_CONFIG
+from app.services.transcript_store import ensure_segments
+from loguru import logger
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# O ts_headline marca com caracteres de controle (não aparecem em transcrição),
+# trocados pelas tags depois de escapar o texto
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+HEADLINE_OPTIONS = f'StartSel="{HEADLINE_START}", StopSel="{HEADLINE_STOP}", MinWords=10, MaxWords=30, MaxFragments=1'
+
+def _config():
+    return literal_column(f"'{SEARCH_CONFIG}'")
+
+def search_vector():
+    """Mesma expressão do índice GIN, para o planner usá-lo"""
+    return func.to_tsvector(_config(), TranscriptSegment.text)
+
+def postgres_search_query(q: str, limit: int, offset: int):
+    """
+    Hits ordenados por relevância. O `ts_headline` (caro) só roda nas linhas
+    da página, fora da subconsulta que ranqueia.
+    """
+    tsquery = func.websearch_to_tsquery(_config(), q)
+    rank = func.ts_rank(search_vector(), tsquery).label("rank")
+    page = (
+        select(
+            TranscriptSegment.video_id, TranscriptSegment.idx, TranscriptSegment.start,
+            TranscriptSegment.end, TranscriptSegment.text, rank,
+        )
+        .join(Video, Video.id == TranscriptSegment.video_id)
+        .where(Video.deleted_at.is_(None), search_vector().op("@@")(tsquery))
+        .order_by(rank.desc(), TranscriptSegment.video_id, TranscriptSegment.start)
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    return (
+        select(
+            page.c.video_id, Video.youtube_id, Video.title, page.c.idx, page.c.start, page.c.end, page.c.rank,
+            func.ts_headline(_config(), page.c.text, tsquery, HEADLINE_OPTIONS).label("snippet"),
+        )
+        .join(Video, Video.id == page.c.video_id)
+        .order_by(page.c.rank.desc(), page.c.video_id, page.c.start)
+    )
+
+def query_terms(q: str) -> list[str]:
+    return [term for term in re.findall(r"\w+", q.lower()) if term]
+
+def headline_html(headline: str) -> str:
+    """Escapa o trecho do ts_headline e troca os marcadores pelas tags"""
+    return html.escape(headline).replace(HEADLINE_START, HIGHLIGHT_START).replace(HEADLINE_STOP, HIGHLIGHT_STOP)
+
+def highlight(text: str, terms: list[str]) -> str:
+    """Marca as ocorrências dos termos como o ts_headline faz, com o texto escapado"""
+    if not terms:
+        return html.escape(text)
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f"{HIGHLIGHT_START}{html.escape(match.group(0))}{HIGHLIGHT_STOP}")
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return "".join(parts)
+
+def fallback_search_query(terms: list[str], limit: int, offset: int):
+    """Todos os termos como substring (sem índice nem ranking)"""
+    query = (
+        select(
+            TranscriptSegment.video_id, Video.youtube_id, Video.title, TranscriptSegment.idx,
+            TranscriptSegment.start, TranscriptSegment.end, TranscriptSegment.text,
+        )
+        .join(Video, Video.id == TranscriptSegment.video_id)
+        .where(Video.deleted_at.is_(None))
+    )
+    for term in terms:
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(func.lower(TranscriptSegment.text).like(f"%{escaped}%", escape="\\"))
+    return query.order_by(TranscriptSegment.video_id, TranscriptSegment.start).offset(offset).limit(limit)
+
+def search_transcripts(db: Session, q: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    """Segmentos de qualquer vídeo ativo que mencionam `q`, com trecho destacado"""
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(postgres_search_query(q, limit, offset)).all()
+        return [
+            {"video_id": row.video_id, "youtube_id": row.youtube_id, "title": row.title, "idx": row.idx,
+             "start": row.start, "end": row.end, "rank": round(float(row.rank), 4),
+             "snippet": headline_html(row.snippet)}
+            for row in rows
+        ]
+
+    terms = query_terms(q)
+    if not terms:
+        return []
+    rows = db.execute(fallback_search_query(terms, limit, offset)).all()
+    return [
+        {"video_id": row.video_id, "youtube_id": row.youtube_id, "title": row.title, "idx": row.idx,
+         "start": row.start, "end": row.end, "rank": None, "snippet": highlight(row.text, terms)}
+        for row in rows
+    ]
+
+def unindexed_videos(db: Session) -> list[Video]:
+    """Vídeos com transcrição que ainda não têm segmentos no banco (anteriores à tabela)"""
+    return (
+        db.query(Video)
+        .filter(
+            Video.deleted_at.is_(None),
+            Video.transcript_path.isnot(None),
+            ~exists().where(TranscriptSegment.video_id == Video.id),
+        )
+        .order_by(Video.id)
+        .all()
+    )
+
+def index_transcripts_task():
+    """Task em background que carrega no índice as transcrições que ainda não estão lá"""
+    db = SessionLocal()
+
+    try:
+        videos = unindexed_videos(db)
+        logger.info(f"Indexando {len(videos)} transcrições para busca")
+        indexed = 0
+        for video in videos:
+            try:
+                if ensure_segments(db, video):
+                    indexed += 1
+            except (OSError, ValueError) as e:
+                db.rollback()
+                logger.warning(f"Transcrição do vídeo {video.id} não indexada: {e}")
+        logger.info(f"Indexação da busca concluída: {indexed} transcrições")
+
+    except Exception as e:
+        logger.error(f"Erro na indexação da busca: {e}")
+        db.rollback()
+
+    finally:
+        db.close()
@@ -0,0 +1,325 @@
+"""
+Segmentos da transcrição espelhados na tabela `transcript_segments`.
+
+O player busca só a janela visível e "qual segmento está no tempo t" vira uma
+busca no índice (video_id, start), sem abrir o JSON inteiro. Quem grava o JSON
+chama `sync_segments`; transcrições anteriores à tabela são carregadas na
+primeira consulta (`ensure_segments`).
+
+Edições do editor (PATCH) alteram só as linhas afetadas, que passam a ser a
+referência; o JSON é regravado depois, fora da requisição, por
+`flush_transcript_task` (ou na hora, por `read_transcript`, se alguém pede a
+transcrição inteira antes disso). Gravações do JSON e do arquivo de palavras
+de um mesmo vídeo passam por `transcript_lock`.
+"""
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from datetime import datetime
+import numpy as np
+import orjson
+from sqlalchemy import insert
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.transcript_segment import TranscriptSegment
+from app.services.words import open_words, write_words, segment_indexes
+from loguru import logger
+
+_locks: dict[int, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+# Vídeos com uma gravação do JSON em andamento neste processo -> se outra
+# gravação foi pedida enquanto ela rodava
+_flushing: dict[int, bool] = {}
+
+class TranscriptEditError(ValueError):
+    pass
+
+def write_transcript_json(path: str, data: dict) -> None:
+    """Grava o JSON num temporário ao lado e renomeia: um crash nunca deixa o arquivo pela metade"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def transcript_lock(video_id: int):
+    """
+    Serializa (no processo) quem lê e regrava o JSON ou o arquivo de palavras
+    do vídeo, para uma gravação não desfazer a outra.
+    """
+    with _locks_guard:
+        lock = _locks.setdefault(video_id, threading.Lock())
+    with lock:
+        yield
+
+def sync_segments(db, video_id: int, segments: list[dict], edit: bool = False) -> int:
+    """
+    Substitui as linhas do vídeo pelos segmentos do JSON (sem commit).
+
+    Com `edit` (edição pelo editor), segmentos que já existiam com o mesmo
+    (start, end, text) mantêm as marcas de edição e alinhamento; os que
+    mudaram ficam marcados como editados (pendentes de realinhamento).
+    """
+    flags = {}
+    if edit:
+        flags = {
+            (start, end, text): (edited_at, aligned_at)
+            for start, end, text, edited_at, aligned_at in db.query(
+                TranscriptSegment.start, TranscriptSegment.end, TranscriptSegment.text,
+                TranscriptSegment.edited_at, TranscriptSegment.aligned_at,
+            ).filter(TranscriptSegment.video_id == video_id)
+        }
+    
+    db.query(TranscriptSegment).filter(TranscriptSegment.video_id == video_id).delete(synchronize_session=False)
+    if segments:
+        now = datetime.now()
+        rows = []
+        for i, segment in enumerate(segments):
+            text = segment.get("text", "")
+            edited_at, aligned_at = flags.get((segment["start"], segment["end"], text), (now if edit else None, None))
+            rows.append({"video_id": video_id, "idx": i, "start": segment["start"], "end": segment["end"],
+                         "text": text, "edited_at": edited_at, "aligned_at": aligned_at})
+        db.execute(insert(TranscriptSegment), rows)
+    return len(segments)
+
+def ensure_segments(db, video: Video) -> bool:
+    """
+    Garante que a tabela tem a transcrição do vídeo, carregando do JSON se
+    ainda não tiver. Retorna False se o vídeo não tem transcrição.
+    """
+    if not video.transcript_path or not os.path.exists(video.transcript_path):
+        return False
+
+    exists = db.query(TranscriptSegment.id).filter(TranscriptSegment.video_id == video.id).first()
+    if exists:
+        return True
+
+    with open(video.transcript_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f).get("segments", [])
+    count = sync_segments(db, video.id, segments)
+    db.commit()
+    logger.info(f"Transcrição do vídeo {video.id} carregada no banco: {count} segmentos")
+    return True
+
+def segment_at(db, video_id: int, t: float) -> Optional[TranscriptSegment]:
+    """Segmento que está tocando no tempo t (None se t cai numa pausa)"""
+    segment = (
+        db.query(TranscriptSegment)
+        .filter(TranscriptSegment.video_id == video_id, TranscriptSegment.start <= t)
+        .order_by(TranscriptSegment.start.desc(), TranscriptSegment.idx.desc())
+        .first()
+    )
+    return segment if segment and segment.end > t else None
+
+def segments_in_range(db, video_id: int, start: Optional[float] = None, end: Optional[float] = None):
+    """
+    Query dos segmentos que se sobrepõem a [start, end), em ordem.
+
+    O limite inferior é o início do segmento que contém `start`, então as duas
+    pontas são faixas no índice (video_id, start) e não um filtro em `end`.
+    """
+    query = db.query(TranscriptSegment).filter(TranscriptSegment.video_id == video_id)
+    if start is not None:
+        current = segment_at(db, video_id, start)
+        lower = current.start if current else start
+        query = query.filter(TranscriptSegment.start >= lower)
+    if end is not None:
+        query = query.filter(TranscriptSegment.start < end)
+    return query.order_by(TranscriptSegment.start, TranscriptSegment.idx)
+
+def segment_payload(segment: TranscriptSegment) -> dict:
+    return {"idx": segment.idx, "start": segment.start, "end": segment.end, "text": segment.text}
+
+def _row(db, video_id: int, idx: int) -> TranscriptSegment:
+    row = db.query(TranscriptSegment).filter(
+        TranscriptSegment.video_id == video_id, TranscriptSegment.idx == idx
+    ).first()
+    if not row:
+        raise TranscriptEditError(f"Segmento {idx} não existe")
+    return row
+
+def _shift(db, video_id: int, after: int, delta: int) -> None:
+    """
+    Soma `delta` ao idx dos segmentos depois de `after`. Em duas passadas (via
+    negativos) para nenhuma linha intermediária violar a unicidade (video_id, idx).
+    """
+    db.query(TranscriptSegment).filter(
+        TranscriptSegment.video_id == video_id, TranscriptSegment.idx > after
+    ).update({TranscriptSegment.idx: -TranscriptSegment.idx - 1})
+    db.query(TranscriptSegment).filter(
+        TranscriptSegment.video_id == video_id, TranscriptSegment.idx < 0
+    ).update({TranscriptSegment.idx: -TranscriptSegment.idx - 1 + delta})
+
+def _split_position(text: str, ratio: float) -> int:
+    """Espaço mais próximo da posição proporcional ao tempo do corte"""
+    target = round(len(text) * ratio)
+    spaces = [i for i, char in enumerate(text) if char == " "]
+    return min(spaces, key=lambda i: abs(i - target)) if spaces else target
+
+def apply_ops(db, video_id: int, ops: list) -> list[TranscriptSegment]:
+    """
+    Aplica as operações em ordem, alterando só as linhas afetadas (sem commit).
+    Retorna os segmentos alterados ou criados.
+    """
+    touched = []
+    now = datetime.now()
+    for op in ops:
+        row = _row(db, video_id, op.idx)
+        
+        if op.op == "edit":
+            if op.text is None:
+                raise TranscriptEditError("edit exige `text`")
+            row.text = op.text.strip()
+        
+        elif op.op == "retime":
+            if op.start is None or op.end is None or op.start >= op.end:
+                raise TranscriptEditError("retime exige `start` < `end`")
+            row.start, row.end = op.start, op.end
+        
+        elif op.op == "split":
+            if op.at is None or not row.start < op.at < row.end:
+                raise TranscriptEditError(f"split exige `at` dentro do segmento ({row.start}-{row.end}s)")
+            position = op.position
+            if position is None:
+                position = _split_position(row.text, (op.at - row.start) / (row.end - row.start))
+            if not 0 <= position <= len(row.text):
+                raise TranscriptEditError("split com `position` fora do texto")
+            
+            _shift(db, video_id, op.idx, 1)
+            tail = TranscriptSegment(video_id=video_id, idx=op.idx + 1, start=op.at, end=row.end,
+                                     text=row.text[position:].strip())
+            row.end, row.text = op.at, row.text[:position].strip()
+            db.add(tail)
+            db.flush()
+            touched.append(tail)
+        
+        elif op.op == "merge":
+            following = _row(db, video_id, op.idx + 1)
+            row.start, row.end = min(row.start, following.start), max(row.end, following.end)
+            row.text = f"{row.text.strip()} {following.text.strip()}".strip()
+            db.delete(following)
+            if following in touched:
+                touched.remove(following)
+            db.flush()
+            _shift(db, video_id, op.idx + 1, -1)
+        
+        if row not in touched:
+            touched.append(row)
+    
+    # Texto/tempo mudaram: as palavras desses segmentos precisam ser realinhadas
+    for segment in touched:
+        segment.edited_at = now
+    db.flush()
+    return sorted(touched, key=lambda segment: segment.idx)
+
+def flush_transcript(db, video: Video) -> None:
+    """
+    Regrava o JSON a partir das linhas; o arquivo de palavras só quando muda a
+    que segmento cada palavra pertence (split, merge, retime). Chamar com
+    `transcript_lock` do vídeo.
+    """
+    rows = (
+        db.query(TranscriptSegment)
+        .filter(TranscriptSegment.video_id == video.id)
+        .order_by(TranscriptSegment.idx)
+        .all()
+    )
+    with open(video.transcript_path, 'r', encoding='utf-8') as f:
+        transcript_data = json.load(f)
+    
+    # Campos extras do Whisper (confiança etc.) ficam nos segmentos que não mudaram de tempo
+    previous = {(segment["start"], segment["end"]): segment for segment in transcript_data.get("segments", [])}
+    segments = [
+        {**previous.get((row.start, row.end), {}), "start": row.start, "end": row.end, "text": row.text}
+        for row in rows
+    ]
+    transcript_data["segments"] = segments
+    transcript_data["version"] = video.transcript_version
+    transcript_data["updated_at"] = datetime.now().isoformat()
+    write_transcript_json(video.transcript_path, transcript_data)
+    
+    if video.words_path and os.path.exists(video.words_path):
+        index = open_words(video.words_path)
+        if not np.array_equal(index.segments, segment_indexes(index.starts, segments)):
+            write_words(video.words_path, index.words(), segments)
+
+def _load_transcript(path: str) -> tuple[dict, os.stat_result]:
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read()), os.fstat(f.fileno())
+
+def read_transcript(db, video: Video) -> tuple[dict, os.stat_result]:
+    """
+    Conteúdo atual do JSON e o stat do arquivo lido. Se as linhas já têm
+    edições que o JSON ainda não tem (flush pendente), grava antes de ler.
+    """
+    transcript_data, stat_result = _load_transcript(video.transcript_path)
+    if transcript_data.get("version", 0) == video.transcript_version:
+        return transcript_data, stat_result
+    
+    ensure_segments(db, video)
+    with transcript_lock(video.id):
+        db.expire_all()
+        db.refresh(video)
+        flush_transcript(db, video)
+        logger.info(f"Transcrição do vídeo {video.id} gravada na leitura (versão {video.transcript_version})")
+    return _load_transcript(video.transcript_path)
+
+def _current_version(db, video_id: int) -> Optional[int]:
+    return db.query(Video.transcript_version).filter(Video.id == video_id).scalar()
+
+def flush_transcript_task(video_id: int, version: int):
+    """
+    Task em background que persiste as edições no JSON. Se outra edição já
+    passou desta versão, não faz nada: a task dela grava o estado mais novo.
+
+    Edições em sequência são agrupadas: enquanto uma gravação do vídeo está em
+    andamento, as tasks seguintes só deixam o pedido registrado e retornam; a
+    gravação em curso repete até alcançar a versão mais nova. Consultas ao
+    banco ficam fora de `_locks_guard`, que é de todos os vídeos.
+    """
+    db = SessionLocal()
+    
+    try:
+        if _current_version(db, video_id) != version:
+            return
+        with _locks_guard:
+            if video_id in _flushing:
+                _flushing[video_id] = True
+                return
+            _flushing[video_id] = False
+        
+        try:
+            while True:
+                with transcript_lock(video_id):
+                    # Linhas e versão como estão agora, não como a sessão as carregou antes
+                    db.expire_all()
+                    video = db.query(Video).filter(Video.id == video_id).first()
+                    if not video:
+                        return
+                    written = video.transcript_version
+                    flush_transcript(db, video)
+                logger.info(f"Transcrição do vídeo {video_id} gravada na versão {written}")
+                
+                # Pedido feito depois desta leitura fica registrado em `_flushing`
+                current = _current_version(db, video_id)
+                with _locks_guard:
+                    if current == written and not _flushing[video_id]:
+                        del _flushing[video_id]
+                        return
+                    _flushing[video_id] = False
+        finally:
+            with _locks_guard:
+                _flushing.pop(video_id, None)
+    except Exception as e:
+        logger.error(f"Erro ao gravar transcrição editada do vídeo {video_id}: {e}")
+    finally:
+        db.close()
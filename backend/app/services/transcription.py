@@ -1,15 +1,277 @@
 import os
+import copy
 import json
 from pathlib import Path
+from typing import Optional
 from app.db.database import SessionLocal
 from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.pcm import open_pcm, PCM_SAMPLE_RATE
+from app.services.vad import SpeechTimeline, load_intervals, intersect_intervals
+from app.services.captions import fetch_captions
+from app.services.whisper_tiers import transcribe_segments, tiered_transcribe, merge_tier_stats, shift_segment
+from app.services.words import flatten_words, write_words, open_words, words_path_for
+from app.services.time_compression import time_compress, rescale_segments
+from app.services.transcript_cache import audio_identity, transcription_profile, cache_key, load_cached, store_cached
+from app.services.fingerprint import get_overlap
+from app.services.transcript_store import sync_segments, write_transcript_json, transcript_lock
 from app.config.settings import settings
 from datetime import datetime
 from loguru import logger
 
-def transcribe_audio_task(video_id: int):
-    """Task em background para transcrever áudio usando Whisper local"""
+def load_whisper_model(model_size: str):
+    """Carrega um modelo do faster-whisper para CPU"""
+    from faster_whisper import WhisperModel
+    
+    logger.info(f"Carregando modelo Whisper '{model_size}'...")
+    # device="cpu" para rodar sem GPU (offline)
+    # compute_type="int8" para usar menos memória
+    return WhisperModel(
+        model_size,
+        device="cpu",
+        compute_type="int8",
+        download_root=os.path.join(settings.STORAGE_PATH, "whisper_models")
+    )
+
+def whisper_transcript(db, run, video: Video, regions: Optional[list] = None) -> dict:
+    """
+    Transcreve o áudio do vídeo com o Whisper local. Com
+    TRANSCRIPTION_MODE="tiered", um modelo rápido faz o primeiro passe e o
+    modelo principal só re-decodifica os trechos de baixa confiança.
+    `regions` restringe a transcrição a esses trechos (s) do vídeo.
+    """
+    # Importa Whisper
+    try:
+        import faster_whisper
+    except ImportError:
+        logger.error("faster-whisper não está instalado. Instale com: pip install faster-whisper")
+        raise Exception("faster-whisper não instalado")
+    
+    # Modelo small: ~460MB, melhor precisão para PT-BR
+    model_size = settings.WHISPER_MODEL
+    tiered = settings.TRANSCRIPTION_MODE == "tiered"
+    update_stage_progress(db, run, 5.0)
+    
+    # PCM 16 kHz da extração já está no formato do Whisper: evita decodificar o MP3
+    audio_input = video.audio_path
+    timeline = None
+    if video.pcm_path and os.path.exists(video.pcm_path):
+        pcm = open_pcm(video.pcm_path)
+        audio_input = pcm.samples
+        
+        # Com o pré-passe de VAD, o modelo recebe só os trechos de fala
+        intervals = None
+        if video.vad_path and os.path.exists(video.vad_path):
+            intervals = load_intervals(video.vad_path)
+        if regions is not None:
+            intervals = intersect_intervals(intervals if intervals is not None else [[0.0, pcm.duration]], regions)
+        if intervals is not None:
+            timeline = SpeechTimeline(intervals, pcm.sample_rate)
+            if not timeline.intervals:
+                # Nada para ouvir: o Whisper não recebe um áudio vazio
+                logger.info(f"Nenhum trecho de fala para transcrever no vídeo {video.id}")
+                return {
+                    "duration": pcm.duration,
+                    "speech_seconds": 0.0,
+                    "language": "pt",
+                    "language_probability": None,
+                    "segments": [],
+                    "words": [],
+                    "source": "whisper",
+                    "model": model_size,
+                    "speed": settings.TRANSCRIPTION_SPEED,
+                    "tiering": None,
+                }
+            logger.info(f"Transcrevendo {timeline.duration:.0f}s de {pcm.duration:.0f}s de áudio")
+    
+    speed = settings.TRANSCRIPTION_SPEED
+    
+    # Cada modelo é carregado uma vez, mesmo transcrevendo vários lotes
+    models = {}
+    
+    def model_for(name):
+        if name not in models:
+            models[name] = load_whisper_model(name)
+        return models[name]
+    
+    def transcribe_audio(audio, on_progress):
+        """Um passe (ou os dois, em níveis) sobre `audio`; tempos no relógio de `audio`"""
+        # Modo comprimido: o modelo ouve o áudio acelerado; os tempos são reescalados depois
+        if speed != 1.0:
+            audio = time_compress(audio, speed)
+            logger.info(f"Áudio acelerado {speed:g}x para a transcrição")
+        
+        tiering = None
+        if tiered:
+            if isinstance(audio, str):
+                # Os passes trabalham sobre amostras; sem PCM, decodifica o MP3 uma vez
+                audio = faster_whisper.decode_audio(audio, sampling_rate=PCM_SAMPLE_RATE)
+            fast_model = model_for(settings.WHISPER_FAST_MODEL)
+            update_stage_progress(db, run, 10.0)
+            
+            raw_segments, info, tiering = tiered_transcribe(
+                fast_model,
+                lambda: model_for(model_size),
+                audio,
+                fast_name=settings.WHISPER_FAST_MODEL,
+                accurate_name=model_size,
+                on_progress=on_progress,
+                vad_filter=timeline is None
+            )
+        else:
+            model = model_for(model_size)
+            logger.info("Modelo carregado, iniciando transcrição...")
+            update_stage_progress(db, run, 10.0)
+            
+            # Transcreve o áudio
+            # beam_size=5: melhor qualidade
+            # language="pt": força português brasileiro
+            raw_segments, info = transcribe_segments(
+                model,
+                audio,
+                on_progress=on_progress,
+                beam_size=5,
+                word_timestamps=True,
+                vad_filter=timeline is None,  # Remove silêncios (já removidos se houver pré-passe)
+                vad_parameters=dict(min_silence_duration_ms=500)
+            )
+        return rescale_segments(raw_segments, speed), info, tiering
+    
+    def progress_between(done, size, total):
+        # 10% a 95%; atualiza DB a cada 0.5% de mudança
+        return lambda fraction: update_stage_progress(
+            db, run, 10.0 + (done + fraction * size) / total * 85.0, min_delta=0.5
+        )
+    
+    if timeline is None:
+        segments, info, tiering = transcribe_audio(audio_input, progress_between(0.0, 1.0, 1.0))
+    else:
+        # Lotes de trechos de fala: só um lote por vez fica em memória
+        segments, tierings, durations = [], [], []
+        info = None
+        done = 0.0
+        for first, last in timeline.batches():
+            audio = timeline.build_audio(pcm.samples, first, last)
+            seconds = len(audio) / pcm.sample_rate
+            part, batch_info, batch_tiering = transcribe_audio(audio, progress_between(done, seconds, timeline.duration))
+            info = info or batch_info
+            if batch_tiering:
+                tierings.append(batch_tiering)
+                durations.append(seconds)
+            
+            # Tempo no lote -> tempo no áudio concatenado -> tempo no vídeo
+            offset = timeline.offsets[first]
+            for segment in part:
+                for item in [segment, *(segment.get("words") or [])]:
+                    item["start"] = timeline.to_original(item["start"] + offset)
+                    item["end"] = timeline.to_original(item["end"] + offset, is_end=True)
+            segments.extend(part)
+            done += seconds
+        tiering = merge_tier_stats(tierings, durations) if tierings else None
+    
+    if tiering:
+        logger.info(
+            f"Transcrição em níveis: {tiering['redecoded_seconds']:.0f}s re-decodificados "
+            f"({tiering['redecoded_ratio']:.0%}), speedup estimado {tiering['speedup']}"
+        )
+    logger.info(f"Idioma detectado: {info.language} (probabilidade: {info.language_probability:.2f})")
+    if timeline is None:
+        logger.info(f"Duração do áudio: {info.duration:.2f}s")
+    
+    logger.info(f"Transcrição completa: {len(segments)} segmentos")
+    
+    # Palavras saem dos segmentos: vão para o arquivo colunar, não para o JSON
+    words = flatten_words(segments)
+    
+    return {
+        "duration": pcm.duration if timeline else info.duration * speed,
+        "speech_seconds": timeline.duration if timeline else None,
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "segments": segments,
+        "words": words,
+        "source": "whisper",
+        "model": model_size,
+        "speed": speed,
+        "tiering": tiering,
+    }
+
+# Trechos novos menores que isso não valem uma passada do Whisper
+MIN_NEW_REGION_SECONDS = 0.5
+
+def overlap_reuse(db, video: Video) -> Optional[dict]:
+    """
+    Segmentos já transcritos do vídeo de origem que cobrem o trecho em comum
+    (encontrado pelo fingerprint), levados para o tempo deste vídeo.
+    """
+    match = get_overlap(db, video)
+    if not match:
+        return None
+    
+    source = db.query(Video).filter(Video.id == match.source_video_id).first()
+    if not source.transcript_path or not os.path.exists(source.transcript_path):
+        return None
+    
+    with open(source.transcript_path, 'r', encoding='utf-8') as f:
+        source_transcript = json.load(f)
+    
+    # Só segmentos inteiros dentro do trecho em comum; as bordas são retranscritas
+    offset = match.offset_seconds
+    first, last = match.start_seconds + offset, match.end_seconds + offset
+    indexed = [
+        (i, copy.deepcopy(segment)) for i, segment in enumerate(source_transcript.get("segments", []))
+        if segment["start"] >= first and segment["end"] <= last
+    ]
+    if not indexed:
+        return None
+    
+    # Palavras da origem no trecho, agrupadas pelo segmento a que pertencem
+    words = []
+    if source.words_path and os.path.exists(source.words_path):
+        columns = open_words(source.words_path).window(first, last)
+        kept = {i for i, _ in indexed}
+        words = [
+            shift_segment({"start": s, "end": e, "word": w, "probability": p}, -offset)
+            for s, e, w, p, i in zip(columns["start"], columns["end"], columns["word"], columns["probability"], columns["segment"])
+            if i in kept
+        ]
+    
+    segments = [shift_segment(segment, -offset) for _, segment in indexed]
+    return {
+        "source_video_id": source.id,
+        "offset_seconds": offset,
+        "covered": (segments[0]["start"], segments[-1]["end"]),
+        "segments": segments,
+        "words": words,
+        "source_transcript": source_transcript,
+    }
+
+def caption_transcript(video: Video) -> Optional[dict]:
+    """Transcrição a partir das legendas do YouTube, se houver legenda utilizável"""
+    captions = fetch_captions(video.youtube_id)
+    if not captions:
+        return None
+    
+    logger.info(f"Usando legenda do YouTube ({captions['source']}, {captions['language']}): {len(captions['segments'])} segmentos")
+    return {
+        "duration": video.duration_seconds,
+        "language": "pt",
+        "language_probability": None,
+        "segments": captions["segments"],
+        "source": captions["source"],
+        "caption_language": captions["language"],
+        "model": None,
+    }
+
+def transcribe_audio_task(video_id: int, prefer_captions: bool = True):
+    """
+    Task em background para transcrever o vídeo. Ordem: cache por conteúdo
+    do áudio, legendas do YouTube (segundos em vez de minutos) e por fim o
+    Whisper local. `prefer_captions=False` (qualidade explícita) pula as legendas.
+    """
     db = SessionLocal()
+    run = None
     
     try:
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -20,6 +282,8 @@ def transcribe_audio_task(video_id: int):
         
         logger.info(f"Iniciando transcrição: {video.id} - {video.title}")
         
+        run = start_stage_run(db, video, PipelineStage.transcription)
+        
         if not video.audio_path or not os.path.exists(video.audio_path):
             raise Exception("Arquivo de áudio não encontrado")
         
@@ -31,105 +295,121 @@ def transcribe_audio_task(video_id: int):
         transcript_filename = f"{video.youtube_id}.json"
         transcript_path = os.path.join(transcript_dir, transcript_filename)
         
-        logger.info(f"Transcrevendo áudio de {video.audio_path} para {transcript_path}")
-        
-        # Importa Whisper
-        try:
-            from faster_whisper import WhisperModel
-        except ImportError:
-            logger.error("faster-whisper não está instalado. Instale com: pip install faster-whisper")
-            raise Exception("faster-whisper não instalado")
-        
-        # Carrega modelo Whisper
-        # Modelo small: ~460MB, melhor precisão para PT-BR
-        model_size = "small"
-        
-        logger.info(f"Carregando modelo Whisper '{model_size}'...")
-        video.transcription_progress = 5.0
-        db.commit()
-        
-        # device="cpu" para rodar sem GPU (offline)
-        # compute_type="int8" para usar menos memória
-        model = WhisperModel(
-            model_size,
-            device="cpu",
-            compute_type="int8",
-            download_root=os.path.join(settings.STORAGE_PATH, "whisper_models")
-        )
+        # Mesmo áudio + mesmo perfil já transcrito (re-upload, retry): reaproveita na hora
+        key = None
+        audio_sha256 = audio_identity(video)
+        if audio_sha256:
+            profile = transcription_profile(video)
+            key = cache_key(audio_sha256, profile)
+        result = load_cached(key) if key else None
+        if result is not None:
+            logger.info(f"Transcrição encontrada no cache ({key[:12]}): {video.id}")
+            result["cache_key"] = key
         
-        logger.info("Modelo carregado, iniciando transcrição...")
-        video.transcription_progress = 10.0
-        db.commit()
-        
-        # Transcreve o áudio
-        # beam_size=5: melhor qualidade
-        # language="pt": força português brasileiro
-        segments_generator, info = model.transcribe(
-            video.audio_path,
-            beam_size=5,
-            language="pt",
-            vad_filter=True,  # Remove silêncios
-            vad_parameters=dict(min_silence_duration_ms=500)
-        )
+        if result is None and prefer_captions and settings.YOUTUBE_CAPTIONS_ENABLED:
+            update_stage_progress(db, run, 2.0)
+            result = caption_transcript(video)
         
-        logger.info(f"Idioma detectado: {info.language} (probabilidade: {info.language_probability:.2f})")
-        logger.info(f"Duração do áudio: {info.duration:.2f}s")
+        # Trecho em comum com outro vídeo já transcrito: o Whisper só roda no que é novo
+        reuse = None
+        if result is None and video.pcm_path and os.path.exists(video.pcm_path):
+            reuse = overlap_reuse(db, video)
+        
+        if reuse:
+            duration = open_pcm(video.pcm_path).duration
+            covered_start, covered_end = reuse["covered"]
+            regions = [
+                (start, end) for start, end in ((0.0, covered_start), (covered_end, duration))
+                if end - start >= MIN_NEW_REGION_SECONDS
+            ]
+            logger.info(
+                f"Reaproveitando {len(reuse['segments'])} segmentos do vídeo {reuse['source_video_id']} "
+                f"({covered_start:.0f}s-{covered_end:.0f}s)"
+            )
+            
+            if regions:
+                result = whisper_transcript(db, run, video, regions=regions)
+            else:
+                source_transcript = reuse["source_transcript"]
+                result = {
+                    "duration": duration,
+                    "language": source_transcript.get("language"),
+                    "language_probability": source_transcript.get("language_probability"),
+                    "segments": [],
+                    "source": source_transcript.get("source", "whisper"),
+                    "model": source_transcript.get("model"),
+                }
+            result["segments"] = sorted(result["segments"] + reuse["segments"], key=lambda s: s["start"])
+            result["words"] = sorted(result.get("words", []) + reuse["words"], key=lambda w: w["start"])
+            result["reused"] = {
+                "source_video_id": reuse["source_video_id"],
+                "offset_seconds": round(reuse["offset_seconds"], 3),
+                "start": round(covered_start, 3),
+                "end": round(covered_end, 3),
+                "segments": len(reuse["segments"]),
+            }
         
-        # Processa segmentos
-        segments = []
-        total_duration = info.duration
-        last_progress = 10.0
-        
-        for segment in segments_generator:
-            segments.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text.strip()
-            })
+        if result is None:
+            logger.info(f"Transcrevendo áudio de {video.audio_path} para {transcript_path}")
+            result = whisper_transcript(db, run, video)
+            if key:
+                try:
+                    store_cached(key, audio_sha256, profile, result)
+                    result["cache_key"] = key
+                except OSError as e:
+                    logger.warning(f"Não foi possível gravar a transcrição no cache: {e}")
+        
+        segments = result["segments"]
+        words = result.pop("words", None) or []
+        
+        # JSON, palavras e linhas trocam juntos, sob a trava que as gravações das
+        # edições (flush, realinhamento) também usam; a versão sai confirmada
+        with transcript_lock(video_id):
+            # Nova transcrição invalida edições abertas sobre a anterior (incremento
+            # no próprio UPDATE: uma edição feita durante a transcrição conta)
+            video.transcript_version = Video.transcript_version + 1
+            db.flush()
             
-            # Atualiza progresso baseado no tempo processado
-            progress = 10.0 + (segment.end / total_duration) * 85.0  # 10% a 95%
+            # Prepara dados da transcrição
+            transcript_data = {
+                "video_id": video_id,
+                "youtube_id": video.youtube_id,
+                **result,
+                "version": video.transcript_version,
+                "created_at": datetime.now().isoformat()
+            }
             
-            # Atualiza DB a cada 0.5% de mudança (mais frequente)
-            if progress - last_progress >= 0.5:
-                video.transcription_progress = min(progress, 95.0)
-                db.commit()
-                db.refresh(video)
-                last_progress = progress
-                logger.debug(f"Progresso: {progress:.1f}% (tempo: {segment.end:.1f}s/{total_duration:.1f}s)")
-        
-        logger.info(f"Transcrição completa: {len(segments)} segmentos")
-        
-        # Prepara dados da transcrição
-        transcript_data = {
-            "video_id": video_id,
-            "youtube_id": video.youtube_id,
-            "duration": total_duration,
-            "language": info.language,
-            "language_probability": info.language_probability,
-            "segments": segments,
-            "model": model_size,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Salva transcrição
-        logger.info(f"Salvando transcrição em {transcript_path}...")
-        with open(transcript_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Transcrição salva: {transcript_path}")
-        
-        # Atualiza vídeo com sucesso
-        video.transcript_path = transcript_path
-        video.status = VideoStatus.transcribed
-        video.transcription_progress = 100.0
-        video.transcribed_at = datetime.now()
-        db.commit()
+            # Salva transcrição
+            logger.info(f"Salvando transcrição em {transcript_path}...")
+            write_transcript_json(transcript_path, transcript_data)
+            
+            logger.info(f"Transcrição salva: {transcript_path}")
+            
+            # Timestamps por palavra no arquivo colunar ao lado (legendas não têm)
+            words_path = words_path_for(transcript_path)
+            if words:
+                write_words(words_path, words, segments)
+                video.words_path = words_path
+            else:
+                if os.path.exists(words_path):
+                    os.remove(words_path)
+                video.words_path = None
+            
+            # Espelha os segmentos no banco para consultas por janela de tempo
+            sync_segments(db, video.id, segments)
+            
+            # Atualiza vídeo com sucesso
+            video.transcript_path = transcript_path
+            video.status = VideoStatus.transcribed
+            video.transcription_progress = 100.0
+            video.transcribed_at = datetime.now()
+            finish_stage_run(db, run)
         
         logger.info(f"Transcrição concluída: {video.id} - {len(segments)} segmentos")
         
     except Exception as e:
         logger.error(f"Erro na transcrição do vídeo {video_id}: {e}", exc_info=True)
+        db.rollback()
         
         # Atualiza com erro
         video = db.query(Video).filter(Video.id == video_id).first()
@@ -137,7 +417,10 @@ def transcribe_audio_task(video_id: int):
             video.status = VideoStatus.transcription_failed
             video.transcription_error = str(e)
             video.transcription_progress = 0.0
-            db.commit()
+            if run:
+                finish_stage_run(db, run, error=str(e))
+            else:
+                db.commit()
             logger.info(f"Status atualizado para transcription_failed")
     
     finally:
@@ -0,0 +1,213 @@
+"""
+Pré-passe de detecção de fala (VAD) antes do Whisper.
+
+Gera os intervalos de fala de cada vídeo uma vez, em CPU, e os persiste. A
+transcrição passa ao modelo só esses trechos, concatenados em lotes de tamanho
+limitado, e depois devolve os timestamps para o tempo original do vídeo
+(`SpeechTimeline`).
+"""
+import os
+from bisect import bisect_right
+from typing import Optional
+import numpy as np
+from app.db.database import SessionLocal
+from app.models.video import Video
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, update_stage_progress, finish_stage_run
+from app.services.pcm import open_pcm
+from app.services.features import FEATURE_RATE, compute_features, load_features
+from loguru import logger
+
+SPEECH_PAD_SECONDS = 0.2  # margem antes/depois de cada trecho (não cortar sílabas)
+MERGE_GAP_SECONDS = 0.5  # pausas menores que isso não separam trechos
+MIN_SPEECH_SECONDS = 0.25  # trechos menores (estalos, ruídos) são ignorados
+
+# Silêncio inserido entre trechos concatenados: o modelo não emenda frases de trechos distintos
+JOIN_GAP_SECONDS = 0.3
+
+# Áudio entregue ao Whisper por vez (~38 MB em float32): a memória não cresce com o total de fala
+BATCH_SECONDS = 600.0
+
+def normalize_intervals(intervals, duration: float) -> np.ndarray:
+    """Descarta trechos muito curtos, aplica margem e junta trechos próximos"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end - start < MIN_SPEECH_SECONDS:
+            continue
+        start = max(0.0, start - SPEECH_PAD_SECONDS)
+        end = min(duration, end + SPEECH_PAD_SECONDS)
+        if merged and start - merged[-1][1] < MERGE_GAP_SECONDS:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.array(merged, dtype=np.float64).reshape(-1, 2)
+
+def mask_to_intervals(mask: np.ndarray, frame_rate: int = FEATURE_RATE) -> list[tuple[float, float]]:
+    """Quadros consecutivos marcados como fala viram intervalos em segundos"""
+    padded = np.concatenate([[0], mask.astype(np.int8), [0]])
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(s / frame_rate, e / frame_rate) for s, e in zip(starts, ends)]
+
+def silero_intervals(samples: np.ndarray, sample_rate: int) -> list[tuple[float, float]]:
+    """VAD Silero (ONNX) que acompanha o faster-whisper. Lança ImportError se indisponível"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    chunks = get_speech_timestamps(samples, VadOptions(min_silence_duration_ms=500))
+    return [(chunk["start"] / sample_rate, chunk["end"] / sample_rate) for chunk in chunks]
+
+def energy_intervals(video: Video, pcm) -> list[tuple[float, float]]:
+    """Fallback: máscara de fala por energia (features já calculadas ou calculadas agora)"""
+    if video.features_path and os.path.exists(video.features_path):
+        mask = load_features(video.features_path)["speech"]
+    else:
+        mask = compute_features(pcm.samples, pcm.sample_rate)["speech"]
+    return mask_to_intervals(mask)
+
+def detect_speech(video: Video) -> tuple[np.ndarray, str]:
+    """Retorna (intervalos N x 2 em segundos, método usado)"""
+    pcm = open_pcm(video.pcm_path)
+    try:
+        raw, method = silero_intervals(pcm.samples, pcm.sample_rate), "silero"
+    except ImportError:
+        logger.info("faster-whisper indisponível: VAD por energia")
+        raw, method = energy_intervals(video, pcm), "energy"
+    return normalize_intervals(raw, pcm.duration), method
+
+def intersect_intervals(a, b) -> np.ndarray:
+    """Interseção de duas listas ordenadas de intervalos (s)"""
+    a, b = np.asarray(a, dtype=np.float64).reshape(-1, 2), np.asarray(b, dtype=np.float64).reshape(-1, 2)
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < end:
+            result.append([start, end])
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return np.array(result, dtype=np.float64).reshape(-1, 2)
+
+def save_intervals(path: str, intervals: np.ndarray) -> None:
+    tmp_path = f"{path}.part.npy"
+    np.save(tmp_path, intervals.astype(np.float64))
+    os.replace(tmp_path, path)
+
+def load_intervals(path: str) -> np.ndarray:
+    return np.load(path).reshape(-1, 2)
+
+class SpeechTimeline:
+    """
+    Junta só os trechos de fala do PCM (em lotes) e converte tempos do áudio
+    concatenado de volta para o tempo original do vídeo.
+    """
+
+    def __init__(self, intervals: np.ndarray, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.intervals = [(float(start), float(end)) for start, end in intervals]
+        self.offsets = []  # início de cada trecho no áudio concatenado (s)
+        position = 0.0
+        for start, end in self.intervals:
+            self.offsets.append(position)
+            position += (end - start) + JOIN_GAP_SECONDS
+        self.duration = max(position - JOIN_GAP_SECONDS, 0.0)
+
+    def _span(self, first: int, last: int) -> float:
+        """Duração (s) dos trechos [first, last) no áudio concatenado"""
+        start, end = self.intervals[last - 1]
+        return self.offsets[last - 1] + (end - start) - self.offsets[first]
+
+    def batches(self, max_seconds: float = BATCH_SECONDS) -> list[tuple[int, int]]:
+        """
+        Trechos consecutivos [first, last) agrupados em lotes de até
+        `max_seconds`. Um trecho maior que isso forma um lote sozinho.
+        """
+        batches = []
+        first = 0
+        for i in range(1, len(self.intervals)):
+            if self._span(first, i + 1) > max_seconds:
+                batches.append((first, i))
+                first = i
+        if self.intervals:
+            batches.append((first, len(self.intervals)))
+        return batches
+
+    def build_audio(self, samples: np.ndarray, first: int = 0, last: Optional[int] = None) -> np.ndarray:
+        """
+        Áudio dos trechos [first, last) com o silêncio de junção entre eles.
+        Um trecho único é uma fatia do PCM (sem cópia).
+        """
+        last = len(self.intervals) if last is None else last
+        # Mesmo arredondamento dos offsets: o trecho ocupa exatamente (end - start) no concatenado
+        spans = [
+            (int(round(start * self.sample_rate)), int(round((end - start) * self.sample_rate)))
+            for start, end in self.intervals[first:last]
+        ]
+        if len(spans) == 1:
+            first_sample, length = spans[0]
+            return np.asarray(samples[first_sample:first_sample + length], dtype=np.float32)
+
+        gap = int(JOIN_GAP_SECONDS * self.sample_rate)
+        audio = np.zeros(sum(length for _, length in spans) + gap * max(len(spans) - 1, 0), dtype=np.float32)
+        position = 0
+        for first_sample, length in spans:
+            chunk = samples[first_sample:first_sample + length]
+            audio[position:position + len(chunk)] = chunk
+            position += length + gap
+        return audio
+
+    def to_original(self, t: float, is_end: bool = False) -> float:
+        """
+        Tempo no áudio concatenado -> tempo no vídeo. Tempos que caem no
+        silêncio de junção são presos ao trecho vizinho.
+        """
+        if not self.intervals:
+            return t
+        # Fim de segmento exatamente no início de um trecho pertence ao trecho anterior
+        i = max(bisect_right(self.offsets, t - (1e-6 if is_end else 0.0)) - 1, 0)
+        start, end = self.intervals[i]
+        return min(start + max(t - self.offsets[i], 0.0), end)
+
+def detect_speech_task(video_id: int):
+    """
+    Task em background que detecta e salva os intervalos de fala do vídeo.
+    Etapa auxiliar: sem ela a transcrição usa o VAD interno do Whisper.
+    """
+    db = SessionLocal()
+    run = None
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+
+        if not video:
+            logger.error(f"Vídeo {video_id} não encontrado")
+            return
+
+        if not video.pcm_path or not os.path.exists(video.pcm_path):
+            logger.warning(f"VAD ignorado: vídeo {video_id} sem PCM decodificado")
+            return
+
+        logger.info(f"Detectando fala: {video.id} - {video.title}")
+        run = start_stage_run(db, video, PipelineStage.vad)
+        update_stage_progress(db, run, 10.0)
+
+        intervals, method = detect_speech(video)
+
+        vad_path = f"{os.path.splitext(video.pcm_path)[0]}.speech.npy"
+        save_intervals(vad_path, intervals)
+        video.vad_path = vad_path
+        finish_stage_run(db, run)
+
+        speech_seconds = float(np.sum(intervals[:, 1] - intervals[:, 0])) if len(intervals) else 0.0
+        logger.info(f"VAD ({method}) concluído: {video.id} - {len(intervals)} trechos, {speech_seconds:.0f}s de fala")
+
+    except Exception as e:
+        logger.error(f"Erro no VAD do vídeo {video_id}: {e}")
+        db.rollback()
+        if run:
+            finish_stage_run(db, run, error=str(e))
+
+    finally:
+        db.close()
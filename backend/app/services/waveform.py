@@ -0,0 +1,106 @@
+"""Picos (min/max) multirresolução para desenhar a waveform sem baixar o áudio"""
+import os
+from typing import Optional
+import numpy as np
+from app.services.pcm import open_pcm
+
+# Amostras por pixel de cada nível; cada nível é múltiplo do anterior.
+# O último é a visão geral (~0,25 px/s a 16 kHz): 3 h cabem em ~2.600 pixels
+WAVEFORM_LEVELS = (256, 1024, 4096, 65536)
+OVERVIEW_LEVEL = WAVEFORM_LEVELS[-1]
+
+# Pixels por resposta; níveis finos exigem uma janela start/end
+MAX_WAVEFORM_PIXELS = 16384
+
+# Blocos lidos do memmap por vez (múltiplo do maior nível)
+BLOCK_SAMPLES = WAVEFORM_LEVELS[-1] * 16
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    """float [-1, 1] -> int8 (formato 8 bits do audiowaveform)"""
+    return np.clip(np.round(values * 127), -128, 127).astype(np.int8)
+
+def _reduce(peaks: np.ndarray, factor: int) -> np.ndarray:
+    """Agrupa `factor` pixels consecutivos (min dos mínimos, max dos máximos)"""
+    full = len(peaks) // factor * factor
+    grouped = peaks[:full].reshape(-1, factor, 2)
+    reduced = np.stack([grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)], axis=1)
+    if full < len(peaks):
+        tail = peaks[full:]
+        reduced = np.vstack([reduced, [[tail[:, 0].min(), tail[:, 1].max()]]])
+    return reduced
+
+def compute_peaks(samples: np.ndarray) -> dict[int, np.ndarray]:
+    """
+    Calcula os picos de todos os níveis em uma passada vetorizada. Só o nível
+    mais fino lê as amostras (em blocos, sem carregar a trilha inteira); os
+    demais são derivados dele.
+    """
+    finest = WAVEFORM_LEVELS[0]
+    parts = []
+    for start in range(0, len(samples), BLOCK_SAMPLES):
+        block = np.asarray(samples[start:start + BLOCK_SAMPLES], dtype=np.float32)
+        full = len(block) // finest * finest
+        if full:
+            pixels = block[:full].reshape(-1, finest)
+            parts.append(np.stack([pixels.min(axis=1), pixels.max(axis=1)], axis=1))
+        if full < len(block):
+            tail = block[full:]
+            parts.append(np.array([[tail.min(), tail.max()]], dtype=np.float32))
+
+    base = _quantize(np.vstack(parts)) if parts else np.zeros((0, 2), dtype=np.int8)
+
+    peaks = {finest: base}
+    for previous, level in zip(WAVEFORM_LEVELS, WAVEFORM_LEVELS[1:]):
+        peaks[level] = _reduce(peaks[previous], level // previous)
+    return peaks
+
+def build_waveform(pcm_path: str, waveform_path: str) -> dict[int, np.ndarray]:
+    """Gera o arquivo de picos a partir do PCM decodificado"""
+    pcm = open_pcm(pcm_path)
+    peaks = compute_peaks(pcm.samples)
+
+    tmp_path = f"{waveform_path}.part.npz"
+    np.savez(tmp_path, sample_rate=np.int32(pcm.sample_rate), **{f"peaks_{level}": data for level, data in peaks.items()})
+    os.replace(tmp_path, waveform_path)
+    return peaks
+
+def load_waveform(waveform_path: str) -> tuple[int, dict[int, np.ndarray]]:
+    """
+    Retorna (sample_rate, picos por nível). Arquivos gerados antes de um nível
+    existir o derivam do nível anterior.
+    """
+    with np.load(waveform_path) as data:
+        sample_rate = int(data["sample_rate"])
+        peaks = {level: data[f"peaks_{level}"] for level in WAVEFORM_LEVELS if f"peaks_{level}" in data}
+    for previous, level in zip(WAVEFORM_LEVELS, WAVEFORM_LEVELS[1:]):
+        if level not in peaks:
+            peaks[level] = _reduce(peaks[previous], level // previous)
+    return sample_rate, peaks
+
+def waveform_payload(
+    peaks: np.ndarray,
+    samples_per_pixel: int,
+    sample_rate: int,
+    start: float = 0.0,
+    end: Optional[float] = None
+) -> dict:
+    """
+    Monta o JSON no formato do audiowaveform (versão 2, 8 bits, 1 canal),
+    aceito diretamente por players como o peaks.js. `start`/`end` recortam
+    uma janela em segundos.
+    """
+    seconds_per_pixel = samples_per_pixel / sample_rate
+    first = min(int(start / seconds_per_pixel), len(peaks))
+    last = len(peaks) if end is None else min(int(np.ceil(end / seconds_per_pixel)), len(peaks))
+    window = peaks[first:max(first, last)]
+
+    return {
+        "version": 2,
+        "channels": 1,
+        "sample_rate": sample_rate,
+        "samples_per_pixel": samples_per_pixel,
+        "bits": 8,
+        "start": first * seconds_per_pixel,
+        "length": len(window),
+        "data": window.reshape(-1).tolist(),
+    }
@@ -0,0 +1,194 @@
+"""
+Transcrição em dois níveis com o Whisper.
+
+Um modelo rápido (base, greedy) transcreve tudo e registra a confiança de cada
+segmento. Só os trechos de baixa confiança são decodificados de novo com o
+modelo maior (small, beam 5) e emendados de volta nos segmentos.
+"""
+import time
+from typing import Callable, Optional
+import numpy as np
+from app.services.pcm import PCM_SAMPLE_RATE
+
+# Limiares de confiança do primeiro passe (mesmos critérios de fallback do Whisper)
+MIN_AVG_LOGPROB = -0.7
+MAX_COMPRESSION_RATIO = 2.4  # texto repetitivo: alucinação
+# Segmento provavelmente sem fala: re-decodificar não ajuda
+NO_SPEECH_PROB = 0.6
+NO_SPEECH_LOGPROB = -1.0
+
+REDECODE_PAD_SECONDS = 0.3
+REDECODE_MERGE_GAP_SECONDS = 1.0
+
+FAST_OPTIONS = dict(beam_size=1, best_of=1, temperature=0.0, word_timestamps=True)
+ACCURATE_OPTIONS = dict(beam_size=5, word_timestamps=True)
+
+def segment_dict(segment, model: Optional[str] = None) -> dict:
+    """Segmento do faster-whisper -> dict da transcrição (com as métricas de confiança)"""
+    data = {
+        "start": segment.start,
+        "end": segment.end,
+        "text": segment.text.strip(),
+        "avg_logprob": round(segment.avg_logprob, 4),
+        "no_speech_prob": round(segment.no_speech_prob, 4),
+        "compression_ratio": round(segment.compression_ratio, 3),
+    }
+    if model:
+        data["model"] = model
+    if getattr(segment, "words", None):
+        data["words"] = [
+            {"start": word.start, "end": word.end, "word": word.word.strip(), "probability": round(word.probability, 3)}
+            for word in segment.words
+        ]
+    return data
+
+def shift_segment(segment: dict, offset: float, limit: Optional[float] = None) -> dict:
+    """Desloca o segmento e suas palavras; `limit` prende os tempos ao fim da janela"""
+    for item in [segment, *(segment.get("words") or [])]:
+        item["start"] += offset
+        item["end"] += offset
+        if limit is not None:
+            item["start"], item["end"] = min(item["start"], limit), min(item["end"], limit)
+    return segment
+
+def transcribe_segments(model, audio, on_progress: Optional[Callable[[float], None]] = None, model_name=None, **options):
+    """Roda o modelo e consome o gerador de segmentos. Retorna (segmentos, info)"""
+    segments_generator, info = model.transcribe(audio, language="pt", **options)
+    segments = []
+    for segment in segments_generator:
+        segments.append(segment_dict(segment, model_name))
+        if on_progress and info.duration:
+            on_progress(min(segment.end / info.duration, 1.0))
+    return segments, info
+
+def is_low_confidence(segment: dict) -> bool:
+    if segment["no_speech_prob"] > NO_SPEECH_PROB and segment["avg_logprob"] < NO_SPEECH_LOGPROB:
+        return False
+    return segment["avg_logprob"] < MIN_AVG_LOGPROB or segment["compression_ratio"] > MAX_COMPRESSION_RATIO
+
+def redecode_windows(segments: list[dict], duration: float) -> list[tuple[float, float]]:
+    """
+    Janelas (s) a re-decodificar: segmentos de baixa confiança com margem,
+    sem invadir os segmentos vizinhos mantidos, e unidas quando próximas.
+    """
+    windows = []
+    for i, segment in enumerate(segments):
+        if not is_low_confidence(segment):
+            continue
+        floor = segments[i - 1]["end"] if i > 0 and not is_low_confidence(segments[i - 1]) else 0.0
+        ceiling = segments[i + 1]["start"] if i + 1 < len(segments) and not is_low_confidence(segments[i + 1]) else duration
+        start = max(segment["start"] - REDECODE_PAD_SECONDS, floor, 0.0)
+        end = min(segment["end"] + REDECODE_PAD_SECONDS, ceiling, duration)
+        if windows and start - windows[-1][1] < REDECODE_MERGE_GAP_SECONDS:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+def splice_segments(segments: list[dict], window: tuple[float, float], replacement: list[dict]) -> list[dict]:
+    """Troca os segmentos cujo centro cai na janela pelos re-decodificados"""
+    start, end = window
+    kept = [s for s in segments if not start <= (s["start"] + s["end"]) / 2 < end]
+    return sorted(kept + replacement, key=lambda s: s["start"])
+
+def tiered_transcribe(
+    fast_model,
+    load_accurate_model: Callable[[], object],
+    audio: np.ndarray,
+    fast_name: str,
+    accurate_name: str,
+    on_progress: Optional[Callable[[float], None]] = None,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    vad_filter: bool = False
+):
+    """
+    Dois passes sobre `audio` (float32 16 kHz). O modelo maior só é carregado
+    se houver trecho a re-decodificar. Retorna (segmentos, info, estatísticas).
+    """
+    progress = on_progress or (lambda value: None)
+
+    started = time.monotonic()
+    segments, info = transcribe_segments(
+        fast_model, audio, lambda fraction: progress(fraction * 0.5), model_name=fast_name,
+        vad_filter=vad_filter, **FAST_OPTIONS
+    )
+    fast_seconds = time.monotonic() - started
+
+    duration = len(audio) / sample_rate
+    windows = redecode_windows(segments, duration)
+    redecoded_seconds = sum(end - start for start, end in windows)
+    low_confidence = sum(1 for segment in segments if is_low_confidence(segment))
+
+    load_seconds = accurate_seconds = 0.0
+    if windows:
+        started = time.monotonic()
+        accurate_model = load_accurate_model()
+        load_seconds = time.monotonic() - started
+        started = time.monotonic()
+        done = 0.0
+        for start, end in windows:
+            chunk = audio[int(start * sample_rate):int(end * sample_rate)]
+            replacement, _ = transcribe_segments(
+                accurate_model, chunk, model_name=accurate_name,
+                vad_filter=False, condition_on_previous_text=False, **ACCURATE_OPTIONS
+            )
+            for segment in replacement:
+                shift_segment(segment, start, limit=end)
+            segments = splice_segments(segments, (start, end), replacement)
+            done += end - start
+            progress(0.5 + 0.5 * done / redecoded_seconds)
+        accurate_seconds = time.monotonic() - started
+    progress(1.0)
+
+    # Linha de base (tudo no modelo maior) estimada pela velocidade medida no segundo passe
+    baseline_seconds = load_seconds + accurate_seconds / redecoded_seconds * duration if redecoded_seconds else None
+    elapsed = fast_seconds + load_seconds + accurate_seconds
+    stats = {
+        "fast_model": fast_name,
+        "model": accurate_name,
+        "low_confidence_segments": low_confidence,
+        "redecoded_windows": len(windows),
+        "redecoded_seconds": round(redecoded_seconds, 2),
+        "redecoded_ratio": round(redecoded_seconds / duration, 4) if duration else 0.0,
+        "fast_pass_seconds": round(fast_seconds, 2),
+        "model_load_seconds": round(load_seconds, 2),
+        "accurate_pass_seconds": round(accurate_seconds, 2),
+        "baseline_estimate_seconds": round(baseline_seconds, 2) if baseline_seconds is not None else None,
+        "speedup": round(baseline_seconds / elapsed, 2) if baseline_seconds and elapsed else None,
+        "elapsed_seconds": round(elapsed, 2),
+    }
+    return segments, info, stats
+
+def merge_tier_stats(parts: list[dict], durations: list[float]) -> dict:
+    """
+    Estatísticas de vários `tiered_transcribe` (lotes de `durations` s) como uma
+    só execução. A linha de base cobre todos os lotes, inclusive os que não
+    re-decodificaram nada, pela velocidade do modelo maior somada nos lotes.
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    def total(key):
+        return round(sum(part[key] for part in parts), 2)
+
+    duration = sum(durations)
+    elapsed = total("elapsed_seconds")
+    redecoded_seconds = total("redecoded_seconds")
+    accurate_seconds = total("accurate_pass_seconds")
+    baseline_seconds = None
+    if redecoded_seconds:
+        baseline_seconds = total("model_load_seconds") + accurate_seconds / redecoded_seconds * duration
+    return {
+        "fast_model": parts[0]["fast_model"],
+        "model": parts[0]["model"],
+        "low_confidence_segments": sum(part["low_confidence_segments"] for part in parts),
+        "redecoded_windows": sum(part["redecoded_windows"] for part in parts),
+        "redecoded_seconds": redecoded_seconds,
+        "redecoded_ratio": round(redecoded_seconds / duration, 4) if duration else 0.0,
+        "fast_pass_seconds": total("fast_pass_seconds"),
+        "model_load_seconds": total("model_load_seconds"),
+        "accurate_pass_seconds": accurate_seconds,
+        "baseline_estimate_seconds": round(baseline_seconds, 2) if baseline_seconds is not None else None,
+        "speedup": round(baseline_seconds / elapsed, 2) if baseline_seconds and elapsed else None,
+        "elapsed_seconds": elapsed,
+    }
@@ -0,0 +1,134 @@
+"""
+Timestamps por palavra num arquivo binário colunar ao lado da transcrição.
+
+Palavras como objetos aninhados no JSON multiplicariam o tamanho do arquivo;
+aqui ficam em colunas paralelas mapeadas em memória:
+
+    cabeçalho (32 bytes): magic, n, tamanho do blob
+    start      float32[n]   (s, ordenado)
+    end        float32[n]
+    probability float32[n]
+    segment    uint32[n]    (índice do segmento na transcrição)
+    offsets    uint32[n+1]  (posição de cada palavra no blob)
+    blob       utf-8
+
+Uma janela de tempo é achada por busca binária nas colunas e só o pedaço
+correspondente do blob é decodificado.
+"""
+import os
+import struct
+from typing import Optional
+import numpy as np
+
+MAGIC = b"AHWORD\x00\x01"
+HEADER_FORMAT = "<8sIIQ"
+HEADER_SIZE = 32
+
+class WordsFormatError(Exception):
+    pass
+
+def flatten_words(segments: list[dict]) -> list[dict]:
+    """Remove as palavras aninhadas dos segmentos e devolve a lista plana"""
+    words = []
+    for segment in segments:
+        words.extend(segment.pop("words", None) or [])
+    return words
+
+def segment_indexes(starts: np.ndarray, segments: list[dict]) -> np.ndarray:
+    """Índice do segmento de cada palavra, pelo início da palavra"""
+    segment_starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+    return np.clip(np.searchsorted(segment_starts, starts + 1e-3, side="right") - 1, 0, None).astype("<u4")
+
+def write_words(path: str, words: list[dict], segments: list[dict]) -> int:
+    """Grava o arquivo de palavras de forma atômica. Retorna o número de palavras"""
+    words = sorted(words, key=lambda word: word["start"])
+    count = len(words)
+
+    starts = np.array([word["start"] for word in words], dtype="<f4")
+    ends = np.array([word["end"] for word in words], dtype="<f4")
+    probabilities = np.array([word.get("probability") or 0.0 for word in words], dtype="<f4")
+    segment_index = segment_indexes(starts, segments)
+
+    encoded = [word["word"].encode("utf-8") for word in words]
+    offsets = np.zeros(count + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    blob = b"".join(encoded)
+
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, count, 0, len(blob)).ljust(HEADER_SIZE, b"\x00"))
+        for column in (starts, ends, probabilities, segment_index, offsets):
+            f.write(column.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return count
+
+class WordIndex:
+    """Arquivo de palavras mapeado em memória (somente leitura)"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            magic, count, _, blob_size = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+        if magic != MAGIC:
+            raise WordsFormatError(f"Arquivo de palavras inválido: {path}")
+
+        self.path = path
+        self.count = count
+        position = HEADER_SIZE
+
+        def column(dtype, length):
+            nonlocal position
+            if length == 0:
+                return np.zeros(0, dtype=dtype)
+            array = np.memmap(path, dtype=dtype, mode="r", offset=position, shape=(length,))
+            position += length * np.dtype(dtype).itemsize
+            return array
+
+        self.starts = column("<f4", count)
+        self.ends = column("<f4", count)
+        self.probabilities = column("<f4", count)
+        self.segments = column("<u4", count)
+        self.offsets = column("<u4", count + 1) if count else np.zeros(1, dtype="<u4")
+        self._blob_offset = position
+        self._blob_size = blob_size
+
+    def _texts(self, first: int, last: int) -> list[str]:
+        if first >= last:
+            return []
+        begin, end = int(self.offsets[first]), int(self.offsets[last])
+        with open(self.path, "rb") as f:
+            f.seek(self._blob_offset + begin)
+            chunk = f.read(end - begin)
+        local = np.asarray(self.offsets[first:last + 1], dtype=np.int64) - begin
+        return [chunk[a:b].decode("utf-8") for a, b in zip(local[:-1], local[1:])]
+
+    def range(self, start: float = 0.0, end: Optional[float] = None) -> tuple[int, int]:
+        """Índices [first, last) das palavras que se sobrepõem a [start, end)"""
+        first = int(np.searchsorted(self.ends, start, side="right"))
+        last = self.count if end is None else int(np.searchsorted(self.starts, end, side="left"))
+        return first, max(first, last)
+
+    def window(self, start: float = 0.0, end: Optional[float] = None) -> dict:
+        """Colunas das palavras na janela [start, end) em segundos"""
+        first, last = self.range(start, end)
+        return {
+            "start": np.asarray(self.starts[first:last], dtype=np.float64).round(3).tolist(),
+            "end": np.asarray(self.ends[first:last], dtype=np.float64).round(3).tolist(),
+            "probability": np.asarray(self.probabilities[first:last], dtype=np.float64).round(3).tolist(),
+            "segment": np.asarray(self.segments[first:last]).tolist(),
+            "word": self._texts(first, last),
+        }
+
+    def words(self, start: float = 0.0, end: Optional[float] = None) -> list[dict]:
+        """Mesma janela como lista de dicts (uso interno: reaproveitamento, realinhamento)"""
+        columns = self.window(start, end)
+        return [
+            {"start": s, "end": e, "word": w, "probability": p}
+            for s, e, w, p in zip(columns["start"], columns["end"], columns["word"], columns["probability"])
+        ]
+
+def open_words(path: str) -> WordIndex:
+    return WordIndex(path)
+
+def words_path_for(transcript_path: str) -> str:
+    return f"{os.path.splitext(transcript_path)[0]}.words"
@@ -0,0 +1 @@
+"""Benchmarks de performance (executar a partir de backend/: python -m benchmarks.<nome>)"""
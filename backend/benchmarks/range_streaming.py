@@ -0,0 +1,99 @@
+"""
+CPU por GB transmitido nos endpoints de mídia.
+
+Compara o gerador antigo (chunks de 8 KB via StreamingResponse) com o
+RangeFileResponse atual, chamando as respostas ASGI diretamente e
+descartando os bytes. O cenário "zerocopysend" simula um servidor que
+oferece a extensão ASGI e faz os.sendfile para /dev/null.
+
+Uso: python -m benchmarks.range_streaming [tamanho_em_MB]
+"""
+import os
+import sys
+import tempfile
+import time
+import anyio
+from starlette.responses import StreamingResponse
+from app.api.responses import RangeFileResponse
+
+def legacy_response(file_path: str, start: int, end: int) -> StreamingResponse:
+    content_length = end - start + 1
+
+    def iterfile():
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            remaining = content_length
+            while remaining > 0:
+                chunk_size = min(8192, remaining)
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    return StreamingResponse(iterfile(), status_code=206, media_type="video/mp4")
+
+async def drive(response, extensions=None) -> int:
+    sent = 0
+    devnull = os.open(os.devnull, os.O_WRONLY)
+
+    async def receive():
+        await anyio.sleep_forever()
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+        elif message["type"] == "http.response.zerocopysend":
+            offset, count = message["offset"], message["count"]
+            while count > 0:
+                written = os.sendfile(devnull, message["file"].fileno(), offset, count)
+                offset += written
+                count -= written
+                sent += written
+
+    scope = {"type": "http", "method": "GET", "extensions": extensions or {}}
+    try:
+        await response(scope, receive, send)
+    finally:
+        os.close(devnull)
+    return sent
+
+def measure(name: str, make_response, size: int, extensions=None):
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    sent = anyio.run(drive, make_response(), extensions)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    gb = sent / 1024 ** 3
+    print(f"{name:<34}{cpu / gb:>14.2f}{wall / gb:>14.2f}")
+    assert sent == size
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    size = size_mb * 1024 * 1024
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+        tmp.write(os.urandom(1024 * 1024) * size_mb)
+        path = tmp.name
+
+    try:
+        # Aquece o page cache para medir só o custo de CPU do envio
+        with open(path, "rb") as f:
+            while f.read(8 * 1024 * 1024):
+                pass
+
+        end = size - 1
+        print(f"Arquivo: {size_mb} MB (range bytes=0-{end})")
+        print(f"{'caminho':<34}{'CPU s/GB':>14}{'wall s/GB':>14}")
+        measure("antes: gerador 8 KB", lambda: legacy_response(path, 0, end), size)
+        measure("depois: chunks adaptativos", lambda: RangeFileResponse(path, [(0, end)], "video/mp4"), size)
+        measure(
+            "depois: zerocopysend (sendfile)",
+            lambda: RangeFileResponse(path, [(0, end)], "video/mp4"),
+            size,
+            extensions={"http.response.zerocopysend": {}}
+        )
+    finally:
+        os.unlink(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Transcrição comprimida no tempo (atempo) contra o caminho normal.
+
+Para cada velocidade, transcreve o mesmo áudio, mede o fator de tempo real
+(RTF = tempo de transcrição / duração do áudio) e a deriva de palavras (WER da
+saída acelerada tomando a normal como referência), além do erro médio dos
+inícios de segmento após reescalar os timestamps.
+
+Requer ffmpeg e faster-whisper. Use um trecho de fala real em português
+(alguns minutos do áudio de um vídeo já extraído servem):
+
+Uso: python -m benchmarks.time_compression caminho/do/audio.mp3 [--speeds 1.25 1.5] [--model small]
+"""
+import argparse
+import re
+import time
+import unicodedata
+import numpy as np
+from app.services.pcm import PCM_SAMPLE_RATE
+from app.services.time_compression import time_compress, rescale_segments
+
+def normalize_words(text: str) -> list[str]:
+    """Minúsculas, sem acentos nem pontuação"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"[a-z0-9]+", text)
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Distância de edição em palavras / palavras da referência"""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+def start_drift(reference: list[dict], hypothesis: list[dict]) -> float:
+    """Erro médio (s) entre cada início de segmento e o início de referência mais próximo"""
+    if not reference or not hypothesis:
+        return 0.0
+    starts = np.array([segment["start"] for segment in reference])
+    return float(np.mean([np.min(np.abs(starts - segment["start"])) for segment in hypothesis]))
+
+def transcribe(model, audio: np.ndarray, speed: float) -> tuple[list[dict], float]:
+    started = time.perf_counter()
+    audio_input = time_compress(audio, speed) if speed != 1.0 else audio
+    segments_generator, _ = model.transcribe(audio_input, language="pt", beam_size=5, vad_filter=True)
+    segments = [{"start": s.start, "end": s.end, "text": s.text.strip()} for s in segments_generator]
+    return rescale_segments(segments, speed), time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("audio")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[1.25, 1.5])
+    parser.add_argument("--model", default="small")
+    args = parser.parse_args()
+
+    from faster_whisper import WhisperModel, decode_audio
+
+    audio = decode_audio(args.audio, sampling_rate=PCM_SAMPLE_RATE)
+    duration = len(audio) / PCM_SAMPLE_RATE
+    model = WhisperModel(args.model, device="cpu", compute_type="int8")
+
+    reference, reference_time = transcribe(model, audio, 1.0)
+    reference_text = " ".join(segment["text"] for segment in reference)
+
+    print(f"Áudio: {duration:.0f}s | modelo: {args.model}")
+    print(f"{'velocidade':<12}{'tempo (s)':>11}{'RTF':>8}{'speedup':>9}{'WER vs 1x':>11}{'deriva (s)':>12}")
+    print(f"{'1x':<12}{reference_time:>11.1f}{reference_time / duration:>8.3f}{1.0:>9.2f}{0.0:>11.1%}{0.0:>12.2f}")
+
+    for speed in args.speeds:
+        segments, elapsed = transcribe(model, audio, speed)
+        wer = word_error_rate(reference_text, " ".join(segment["text"] for segment in segments))
+        print(
+            f"{f'{speed:g}x':<12}{elapsed:>11.1f}{elapsed / duration:>8.3f}"
+            f"{reference_time / elapsed:>9.2f}{wer:>11.1%}{start_drift(reference, segments):>12.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
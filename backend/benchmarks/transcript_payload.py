@@ -0,0 +1,85 @@
+"""
+Serialização e bytes trafegados de uma transcrição de 3 horas.
+
+Compara o caminho antigo (json.load + jsonable_encoder + JSONResponse, sem
+compressão) com o atual (orjson + ORJSONResponse + gzip/brotli).
+
+Uso: python -m benchmarks.transcript_payload
+"""
+import gzip
+import json
+import random
+import time
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DURATION_SECONDS = 3 * 60 * 60
+WORDS = (
+    "então a gente vai falar hoje sobre o jogo de ontem que foi muito bom "
+    "olha só isso aqui pessoal não acredito que ele fez aquela jogada incrível"
+).split()
+
+def build_transcript(duration: float = DURATION_SECONDS, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    while t < duration:
+        length = rng.uniform(1.5, 6.0)
+        text = " ".join(rng.choice(WORDS) for _ in range(int(length * 2.5)))
+        segments.append({"start": round(t, 3), "end": round(t + length, 3), "text": text})
+        t += length + rng.uniform(0.0, 0.8)
+    return {
+        "video_id": 1,
+        "youtube_id": "bench",
+        "duration": duration,
+        "language": "pt",
+        "language_probability": 0.99,
+        "segments": segments,
+        "model": "small",
+        "created_at": "2026-01-01T00:00:00",
+    }
+
+def timeit(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    transcript = build_transcript()
+    file_bytes = json.dumps(transcript, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def before():
+        data = json.loads(file_bytes)
+        return JSONResponse(jsonable_encoder(data)).body
+
+    def after():
+        return ORJSONResponse(orjson.loads(file_bytes)).body
+
+    before_body = before()
+    after_body = after()
+
+    print(f"Segmentos: {len(transcript['segments'])} | arquivo em disco: {len(file_bytes) / 1024:.0f} KB")
+    print(f"{'caminho':<34}{'tempo (ms)':>12}{'bytes':>12}")
+    print(f"{'antes: json + jsonable_encoder':<34}{timeit(before) * 1000:>12.1f}{len(before_body):>12}")
+    print(f"{'depois: orjson':<34}{timeit(after) * 1000:>12.1f}{len(after_body):>12}")
+
+    gz_time = timeit(lambda: gzip.compress(after_body, compresslevel=6))
+    gz_size = len(gzip.compress(after_body, compresslevel=6))
+    print(f"{'depois: orjson + gzip(6)':<34}{(timeit(after) + gz_time) * 1000:>12.1f}{gz_size:>12}")
+
+    if brotli is not None:
+        br_time = timeit(lambda: brotli.compress(after_body, quality=4))
+        br_size = len(brotli.compress(after_body, quality=4))
+        print(f"{'depois: orjson + brotli(4)':<34}{(timeit(after) + br_time) * 1000:>12.1f}{br_size:>12}")
+
+if __name__ == "__main__":
+    main()
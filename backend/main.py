@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config.settings import settings
 from app.db.database import init_db
-from app.api import videos_clean as videos, metadata, download, audio, transcription
+from app.api import videos_clean as videos, metadata, download, audio, transcription, hls
+from app.api.middleware import CompressionMiddleware
 from loguru import logger
 import sys
 
@@ -14,7 +16,15 @@ logger.add("logs/app.log", rotation="500 MB", retention="10 days")
 # Criar aplicação
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    # orjson serializa listas e transcrições grandes bem mais rápido que o json padrão
+    default_response_class=ORJSONResponse
+)
+
+# Compressão (brotli/gzip) de payloads JSON grandes
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE
 )
 
 # CORS
@@ -57,6 +67,12 @@ app.include_router(
     tags=["transcription"]
 )
 
+app.include_router(
+    hls.router,
+    prefix=f"{settings.API_V1_STR}/videos",
+    tags=["hls"]
+)
+
 @app.on_event("startup")
 async def startup_event():
     """Executado ao iniciar a aplicação"""
@@ -0,0 +1,223 @@
+import json
+import sys
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.models.transcript_segment import TranscriptSegment
+from app.models.stage_run import StageRun, PipelineStage, StageRunStatus
+from app.services.pcm import write_pcm, open_pcm
+from app.services.words import write_words, open_words, words_path_for
+from app.services.transcript_store import sync_segments
+from app.services.alignment import pending_segments, align_segment, force_align, realign_transcript_task
+
+SAMPLE_RATE = 16000
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.0, "text": "bom dia"},
+    {"start": 3.0, "end": 5.0, "text": "o gol foi anulado"},
+    {"start": 6.0, "end": 8.0, "text": "até logo"},
+]
+WORDS = [
+    {"start": 0.0, "end": 0.9, "word": "bom", "probability": 0.9},
+    {"start": 1.0, "end": 2.0, "word": "dia", "probability": 0.9},
+    {"start": 3.0, "end": 3.5, "word": "o", "probability": 0.9},
+    {"start": 3.5, "end": 4.0, "word": "gou", "probability": 0.4},
+    {"start": 4.0, "end": 5.0, "word": "anulado", "probability": 0.9},
+    {"start": 6.0, "end": 7.0, "word": "até", "probability": 0.9},
+    {"start": 7.0, "end": 8.0, "word": "logo", "probability": 0.9},
+]
+
+def _relative_words(model, audio, text, language="pt"):
+    """Alinhamento falso: palavras igualmente espaçadas no trecho recebido"""
+    duration = len(audio) / SAMPLE_RATE
+    tokens = text.split()
+    step = duration / len(tokens)
+    return [{"start": i * step, "end": (i + 1) * step, "word": token, "probability": 0.8}
+            for i, token in enumerate(tokens)]
+
+class TestAlignment:
+    """Testes para o realinhamento forçado dos segmentos editados"""
+
+    def _video(self, db_session, tmp_path):
+        transcript_path = tmp_path / "align123.json"
+        transcript_path.write_text(json.dumps({"language": "pt", "segments": SEGMENTS}), encoding="utf-8")
+        words_path = words_path_for(str(transcript_path))
+        write_words(words_path, WORDS, SEGMENTS)
+        pcm_path = str(tmp_path / "align123.f32")
+        write_pcm(pcm_path, np.zeros(10 * SAMPLE_RATE, dtype=np.float32))
+        video = Video(youtube_id="align123", title="Alinhamento", duration_seconds=10, status=VideoStatus.transcribed,
+                      transcript_path=str(transcript_path), words_path=words_path, pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+        sync_segments(db_session, video.id, SEGMENTS)
+        db_session.commit()
+        return video
+
+    def _realign(self, db_session, force_align_mock):
+        with patch('app.services.alignment.force_align', side_effect=force_align_mock) as aligner, \
+             patch('app.services.alignment.load_whisper_model', return_value=MagicMock()), \
+             patch('app.services.alignment.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            realign_transcript_task(self.video_id)
+        return aligner
+
+    @pytest.fixture(autouse=True)
+    def _flush_session(self, db_session):
+        with patch('app.services.transcript_store.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            yield
+
+    def test_patch_marks_segments_pending(self, client, db_session, tmp_path):
+        """Só o segmento editado fica pendente"""
+        video = self._video(db_session, tmp_path)
+        assert pending_segments(db_session, video.id) == []
+
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 0, "ops": [{"op": "edit", "idx": 1, "text": "o gol foi anulado mesmo"}]})
+        assert [segment.idx for segment in pending_segments(db_session, video.id)] == [1]
+
+    def test_put_marks_changed_segments(self, client, db_session, tmp_path):
+        """PUT marca só os segmentos que mudaram"""
+        video = self._video(db_session, tmp_path)
+        segments = [dict(s) for s in SEGMENTS]
+        segments[2]["text"] = "até amanhã"
+
+        client.put(f"/api/videos/{video.id}/transcript", json={"version": 0, "segments": segments})
+        assert [segment.idx for segment in pending_segments(db_session, video.id)] == [2]
+
+    def test_put_keeps_pending_and_aligned_flags(self, client, db_session, tmp_path):
+        """PUT não apaga a pendência de um PATCH nem o alinhamento de segmentos intactos"""
+        video = self._video(db_session, tmp_path)
+        self.video_id = video.id
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 0, "ops": [{"op": "edit", "idx": 0, "text": "bom dia a todos"}]})
+        self._realign(db_session, _relative_words)
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 1, "ops": [{"op": "edit", "idx": 1, "text": "o gol foi anulado"}]})
+
+        segments = [{"start": s.start, "end": s.end, "text": s.text} for s in
+                    db_session.query(TranscriptSegment).filter(TranscriptSegment.video_id == video.id)
+                    .order_by(TranscriptSegment.idx)]
+        segments[2]["text"] = "até amanhã"
+        assert client.put(f"/api/videos/{video.id}/transcript",
+                          json={"version": 2, "segments": segments}).status_code == 200
+
+        assert [segment.idx for segment in pending_segments(db_session, video.id)] == [1, 2]
+        first = db_session.query(TranscriptSegment).filter(
+            TranscriptSegment.video_id == video.id, TranscriptSegment.idx == 0
+        ).one()
+        assert first.aligned_at is not None and first.aligned_at >= first.edited_at
+
+    def test_align_segment_offsets_and_clips(self, db_session, tmp_path):
+        """Tempos relativos ao trecho com margem viram tempo do vídeo, dentro do segmento"""
+        video = self._video(db_session, tmp_path)
+        segment = SimpleNamespace(start=3.0, end=5.0, text="o gol foi anulado")
+
+        with patch('app.services.alignment.force_align', side_effect=_relative_words) as aligner:
+            words = align_segment(MagicMock(), open_pcm(video.pcm_path), segment)
+
+        audio = aligner.call_args.args[1]
+        assert len(audio) == pytest.approx(2.6 * SAMPLE_RATE, abs=1)
+        assert [w["word"] for w in words] == ["o", "gol", "foi", "anulado"]
+        assert words[0]["start"] == 3.0
+        assert words[-1]["end"] == 5.0
+        assert all(3.0 <= w["start"] <= w["end"] <= 5.0 for w in words)
+
+    def test_task_realigns_only_edited(self, client, db_session, tmp_path):
+        """Palavras do segmento editado são trocadas; as demais ficam intactas"""
+        video = self._video(db_session, tmp_path)
+        self.video_id = video.id
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 0, "ops": [{"op": "edit", "idx": 1, "text": "o gol foi anulado"}]})
+
+        aligner = self._realign(db_session, _relative_words)
+
+        assert aligner.call_count == 1
+        assert aligner.call_args.args[2] == "o gol foi anulado"
+        words = open_words(video.words_path).window()
+        assert words["word"] == ["bom", "dia", "o", "gol", "foi", "anulado", "até", "logo"]
+        assert words["segment"] == [0, 0, 1, 1, 1, 1, 2, 2]
+        assert pending_segments(db_session, video.id) == []
+
+        # Sem novas edições nada é realinhado
+        assert self._realign(db_session, _relative_words).call_count == 0
+
+    def test_edit_during_alignment_stays_pending(self, client, db_session, tmp_path):
+        """Segmento editado de novo durante o alinhamento continua pendente, com as palavras antigas"""
+        video = self._video(db_session, tmp_path)
+        self.video_id = video.id
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 0, "ops": [{"op": "edit", "idx": 1, "text": "o gol foi anulado"}]})
+
+        def edit_meanwhile(model, audio, text, language="pt"):
+            client.patch(f"/api/videos/{video.id}/transcript",
+                         json={"version": 1, "ops": [{"op": "edit", "idx": 1, "text": "o gol não foi anulado"}]})
+            return _relative_words(model, audio, text)
+
+        self._realign(db_session, edit_meanwhile)
+        assert [segment.idx for segment in pending_segments(db_session, video.id)] == [1]
+        # Palavras do texto antigo não entram no arquivo
+        assert open_words(video.words_path).window()["word"] == [w["word"] for w in WORDS]
+
+    def test_too_long_segment_stays_pending(self, client, db_session, tmp_path):
+        """Segmento maior que a janela do encoder não é marcado como alinhado e aparece no resultado"""
+        video = self._video(db_session, tmp_path)
+        self.video_id = video.id
+        client.patch(f"/api/videos/{video.id}/transcript", json={"version": 0, "ops": [
+            {"op": "edit", "idx": 1, "text": "o gol foi anulado"},
+            {"op": "retime", "idx": 2, "start": 6.0, "end": 9.5},
+        ]})
+
+        with patch('app.services.alignment.MAX_ALIGN_SECONDS', 4.0):
+            aligner = self._realign(db_session, _relative_words)
+
+        assert aligner.call_count == 1
+        assert [segment.idx for segment in pending_segments(db_session, video.id)] == [2]
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id,
+                                                StageRun.stage == PipelineStage.alignment).one()
+        assert run.status == StageRunStatus.succeeded
+        assert run.result == "Segmentos acima de 3.4s não realinhados: 2"
+
+    def test_realign_endpoint(self, client, db_session, tmp_path):
+        """Endpoint só agenda a task quando há segmentos pendentes"""
+        video = self._video(db_session, tmp_path)
+
+        with patch('app.api.transcription.realign_transcript_task') as task:
+            response = client.post(f"/api/videos/{video.id}/realign")
+            assert response.json()["pending"] == 0
+            task.assert_not_called()
+
+            client.patch(f"/api/videos/{video.id}/transcript",
+                         json={"version": 0, "ops": [{"op": "retime", "idx": 0, "start": 0.2, "end": 2.0}]})
+            response = client.post(f"/api/videos/{video.id}/realign")
+            assert response.json()["pending"] == 1
+            task.assert_called_once_with(video.id)
+
+    def test_force_align_uses_find_alignment(self):
+        """Tokens e retorno no formato do find_alignment do faster-whisper 1.0.3 (fixado no requirements)"""
+        tokenizer = MagicMock()
+        tokenizer.encode.return_value = [1, 2]
+        model = MagicMock()
+        model.feature_extractor.return_value = np.zeros((80, 150))
+        model.feature_extractor.nb_max_frames = 3000
+
+        def find_alignment(tokenizer, text_tokens, encoder_output, num_frames, median_filter_width=7):
+            assert all(isinstance(token, int) for token in text_tokens)
+            return [
+                {"word": " gol", "tokens": [1, 2], "start": 0.1, "end": 0.4, "probability": 0.91234},
+                {"word": "", "tokens": [], "start": 0.4, "end": 0.4, "probability": 0.0},
+            ]
+
+        model.find_alignment.side_effect = find_alignment
+        fake_audio = SimpleNamespace(pad_or_trim=lambda features: features)
+        fake_tokenizer = SimpleNamespace(Tokenizer=MagicMock(return_value=tokenizer))
+
+        with patch.dict(sys.modules, {"faster_whisper": SimpleNamespace(), "faster_whisper.audio": fake_audio,
+                                      "faster_whisper.tokenizer": fake_tokenizer}):
+            words = force_align(model, np.zeros(SAMPLE_RATE, dtype=np.float32), " gol ")
+
+        assert words == [{"start": 0.1, "end": 0.4, "word": "gol", "probability": 0.912}]
+        tokenizer.encode.assert_called_once_with(" gol")
+        assert model.find_alignment.call_args.args[3] == 150
@@ -0,0 +1,155 @@
+import json
+import pytest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.captions import parse_json3, select_caption_track, fetch_captions
+from app.services.transcription import transcribe_audio_task
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+def _fixture(name):
+    with open(FIXTURES / name, encoding="utf-8") as f:
+        return json.load(f)
+
+def _info(subtitles=None, automatic=None, language=None):
+    return {"subtitles": subtitles or {}, "automatic_captions": automatic or {}, "language": language}
+
+def _tracks(language):
+    return [
+        {"ext": "vtt", "url": f"https://captions/{language}.vtt"},
+        {"ext": "json3", "url": f"https://captions/{language}.json3"},
+    ]
+
+class TestCaptionParsing:
+    """Testes para a conversão do json3 do YouTube em segmentos"""
+
+    def test_manual_captions(self):
+        """Quebras de linha viram espaço; eventos vazios e anotações são ignorados"""
+        segments = parse_json3(_fixture("captions_manual.pt-BR.json3"))
+
+        assert segments == [
+            {"start": 1.2, "end": 4.0, "text": "Fala, pessoal! Tudo bem com vocês?"},
+            {"start": 4.0, "end": 7.1, "text": "Hoje a gente vai jogar a final do campeonato."},
+            {"start": 9.0, "end": 11.0, "text": "Bora lá!"},
+        ]
+
+    def test_auto_captions_do_not_overlap(self):
+        """Palavras do ASR são unidas e o fim é limitado ao próximo segmento"""
+        segments = parse_json3(_fixture("captions_auto.pt-orig.json3"))
+
+        assert [s["text"] for s in segments] == ["olha só esse lance", "que golaço meu Deus", "inacreditável"]
+        assert [(s["start"], s["end"]) for s in segments] == [
+            pytest.approx((0.32, 2.48)), pytest.approx((2.48, 7.6)), pytest.approx((7.6, 12.34))
+        ]
+
+class TestCaptionSelection:
+    """Testes para a escolha da faixa de legenda"""
+
+    def test_prefers_manual_track(self):
+        """Legenda manual em pt-BR vence a automática"""
+        source, language, track = select_caption_track(
+            _info(subtitles={"pt-BR": _tracks("pt-BR")}, automatic={"pt-orig": _tracks("pt-orig")})
+        )
+
+        assert (source, language) == ("youtube_manual", "pt-BR")
+        assert track["ext"] == "json3"
+
+    def test_auto_caption_in_original_language(self):
+        """Automática só é usada no idioma original do áudio"""
+        source, language, _ = select_caption_track(_info(automatic={"pt-orig": _tracks("pt-orig"), "pt": _tracks("pt")}))
+        assert (source, language) == ("youtube_auto", "pt-orig")
+
+    def test_ignores_auto_translation(self):
+        """'pt' automático de vídeo em outro idioma é tradução: ignorado"""
+        info = _info(automatic={"en-orig": _tracks("en-orig"), "pt": _tracks("pt")}, language="en")
+        assert select_caption_track(info) is None
+
+        info["language"] = "pt"
+        assert select_caption_track(info)[1] == "pt"
+
+    @patch('app.services.captions.yt_dlp.YoutubeDL')
+    def test_fetch_captions(self, mock_yt_dlp):
+        """Busca a faixa escolhida pelo yt-dlp e converte"""
+        ydl = MagicMock()
+        mock_yt_dlp.return_value.__enter__.return_value = ydl
+        ydl.extract_info.return_value = _info(subtitles={"pt-BR": _tracks("pt-BR")})
+        ydl.urlopen.return_value.read.return_value = (FIXTURES / "captions_manual.pt-BR.json3").read_bytes()
+
+        captions = fetch_captions("cap123")
+
+        assert captions["source"] == "youtube_manual"
+        assert len(captions["segments"]) == 3
+        ydl.urlopen.assert_called_once_with("https://captions/pt-BR.json3")
+        assert mock_yt_dlp.call_args.args[0]["writeautomaticsub"] is True
+
+    @patch('app.services.captions.yt_dlp.YoutubeDL')
+    def test_fetch_failure_returns_none(self, mock_yt_dlp):
+        """Erro de rede não derruba a transcrição: cai no Whisper"""
+        mock_yt_dlp.return_value.__enter__.return_value.extract_info.side_effect = Exception("HTTP 429")
+        assert fetch_captions("cap123") is None
+
+class TestCaptionTranscription:
+    """Testes para o atalho de legendas na task de transcrição"""
+
+    def _video(self, db_session, tmp_path):
+        audio_path = tmp_path / "cap123.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id="cap123", title="Legendas", duration_seconds=12,
+                      status=VideoStatus.transcribing, audio_path=str(audio_path))
+        db_session.add(video)
+        db_session.commit()
+        return video
+
+    def test_uses_captions_without_whisper(self, db_session, tmp_path):
+        """Com legenda disponível o Whisper nem é carregado"""
+        video = self._video(db_session, tmp_path)
+        captions = {"source": "youtube_auto", "language": "pt-orig",
+                    "segments": parse_json3(_fixture("captions_auto.pt-orig.json3"))}
+
+        with patch('app.services.transcription.fetch_captions', return_value=captions), \
+             patch('app.services.transcription.whisper_transcript') as whisper, \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        whisper.assert_not_called()
+        db_session.refresh(video)
+        assert video.status == VideoStatus.transcribed
+        with open(video.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert transcript["source"] == "youtube_auto"
+        assert transcript["caption_language"] == "pt-orig"
+        assert transcript["duration"] == 12
+        assert len(transcript["segments"]) == 3
+
+    def test_quality_skips_captions(self, db_session, tmp_path):
+        """prefer_captions=False vai direto para o Whisper"""
+        video = self._video(db_session, tmp_path)
+        result = {"duration": 12.0, "language": "pt", "language_probability": 0.9,
+                  "segments": [{"start": 0.0, "end": 1.0, "text": "oi"}], "source": "whisper", "model": "small"}
+
+        with patch('app.services.transcription.fetch_captions') as fetch, \
+             patch('app.services.transcription.whisper_transcript', return_value=result), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id, prefer_captions=False)
+
+        fetch.assert_not_called()
+        db_session.refresh(video)
+        with open(video.transcript_path, encoding="utf-8") as f:
+            assert json.load(f)["source"] == "whisper"
+
+    def test_endpoint_quality_flag(self, client, db_session, tmp_path):
+        """?quality=true agenda a task sem o atalho de legendas"""
+        video = self._video(db_session, tmp_path)
+        video.status = VideoStatus.transcription_failed
+        db_session.commit()
+
+        with patch('app.services.transcription.transcribe_audio_task') as task:
+            response = client.post(f"/api/videos/{video.id}/transcribe?quality=true")
+
+        assert response.status_code == 200
+        task.assert_called_once_with(video.id, prefer_captions=False)
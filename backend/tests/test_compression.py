@@ -0,0 +1,88 @@
+import json
+import pytest
+from app.api.middleware import choose_encoding
+from app.models.video import Video, VideoStatus
+
+def _create_transcribed_video(db_session, tmp_path, segments=500):
+    transcript_path = tmp_path / "comp123.json"
+    transcript = {
+        "video_id": 1,
+        "youtube_id": "comp123",
+        "language": "pt",
+        "segments": [
+            {"start": i * 3.0, "end": i * 3.0 + 2.5, "text": f"segmento número {i} da transcrição"}
+            for i in range(segments)
+        ]
+    }
+    transcript_path.write_text(json.dumps(transcript, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    video = Video(
+        youtube_id="comp123",
+        title="Compression Test",
+        duration_seconds=1500,
+        status=VideoStatus.transcribed,
+        transcript_path=str(transcript_path)
+    )
+    db_session.add(video)
+    db_session.commit()
+    return video, transcript
+
+class TestCompression:
+    """Testes para serialização orjson e compressão das respostas"""
+
+    def test_choose_encoding_prefers_brotli(self):
+        """Deve preferir br, cair para gzip e respeitar q=0"""
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("gzip;q=1.0, br;q=0") == "gzip"
+        assert choose_encoding("identity") is None
+        assert choose_encoding("") is None
+
+    def test_large_transcript_is_gzipped(self, client, db_session, tmp_path):
+        """Transcrição grande deve sair comprimida e com conteúdo idêntico"""
+        video, transcript = _create_transcribed_video(db_session, tmp_path)
+
+        response = client.get(
+            f"/api/videos/{video.id}/transcript",
+            headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(json.dumps(transcript))
+        assert response.json() == transcript
+
+    def test_large_transcript_uses_brotli_when_accepted(self, client, db_session, tmp_path):
+        """Com brotli instalado, br deve ser negociado"""
+        pytest.importorskip("brotli")
+        video, transcript = _create_transcribed_video(db_session, tmp_path)
+
+        response = client.get(
+            f"/api/videos/{video.id}/transcript",
+            headers={"Accept-Encoding": "br, gzip"}
+        )
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.json() == transcript
+
+    def test_small_response_is_not_compressed(self, client):
+        """Respostas abaixo do limite passam sem compressão"""
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.json() == {"status": "healthy"}
+
+    def test_compressed_response_has_own_etag(self, client, db_session, tmp_path):
+        """Representação gzip tem ETag próprio, aceito na revalidação"""
+        video, _ = _create_transcribed_video(db_session, tmp_path)
+        plain = client.get(f"/api/videos/{video.id}/transcript", headers={"Accept-Encoding": "identity"})
+        compressed = client.get(f"/api/videos/{video.id}/transcript", headers={"Accept-Encoding": "gzip"})
+
+        assert compressed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+
+        response = client.get(
+            f"/api/videos/{video.id}/transcript",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+        )
+        assert response.status_code == 304
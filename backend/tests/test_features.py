@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRun, StageRunStatus, PipelineStage
+from app.services.pcm import write_pcm
+from app.services.features import compute_features, feature_window, compute_features_task, FEATURE_RATE
+
+SAMPLE_RATE = 16000
+
+def _tone(seconds, amplitude=0.5, freq=997.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+def _noise(seconds, level=0.001):
+    return np.random.default_rng(0).normal(0, level, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+class TestSignalFeatures:
+    """Testes para as features de sinal a 10 Hz"""
+
+    def test_frame_count_and_rms(self):
+        """Um quadro a cada 100 ms; RMS de seno 0.5 ~ -9 dBFS"""
+        features = compute_features(_tone(3.05), SAMPLE_RATE)
+
+        assert len(features["rms_db"]) == 31
+        assert features["rms_db"][10] == pytest.approx(-9.03, abs=0.1)
+
+    def test_loudness_matches_bs1770_reference(self):
+        """Seno de 997 Hz em escala cheia mede ~ -3 LUFS (referência do BS.1770)"""
+        features = compute_features(_tone(2.0, amplitude=1.0), SAMPLE_RATE)
+        assert features["loudness_lufs"][10] == pytest.approx(-3.01, abs=0.3)
+
+    def test_speech_mask_follows_energy_in_voice_band(self):
+        """Tom na banda de voz entre trechos de ruído baixo é marcado como fala"""
+        samples = np.concatenate([_noise(2.0), _tone(2.0, freq=440.0) + _noise(2.0), _noise(2.0)])
+        speech = compute_features(samples, SAMPLE_RATE)["speech"]
+
+        assert speech[:18].sum() == 0
+        assert speech[22:38].all()
+        assert speech[42:].sum() == 0
+
+    def test_spectral_flux_peaks_at_onset(self):
+        """Início de som após silêncio gera pico de fluxo espectral"""
+        samples = np.concatenate([_noise(1.0), _tone(1.0)])
+        flux = compute_features(samples, SAMPLE_RATE)["spectral_flux"]
+
+        assert int(np.argmax(flux)) == 10
+
+    def test_blocks_do_not_change_results(self):
+        """Processar em blocos dá o mesmo resultado que de uma vez"""
+        samples = np.concatenate([_noise(1.0), _tone(1.0), _noise(1.0)])
+        with patch('app.services.features.FRAMES_PER_BLOCK', 7):
+            blocked = compute_features(samples, SAMPLE_RATE)
+        whole = compute_features(samples, SAMPLE_RATE)
+
+        for name in whole:
+            np.testing.assert_allclose(blocked[name], whole[name], rtol=1e-5, atol=1e-6)
+
+    def test_feature_window(self):
+        """Janela em segundos vira fatia de quadros"""
+        features = compute_features(_tone(5.0), SAMPLE_RATE)
+        first, window = feature_window(features, 1.0, 2.5)
+
+        assert first == FEATURE_RATE
+        assert len(window["loudness_lufs"]) == 15
+
+    def test_task_and_endpoint(self, client, db_session, tmp_path):
+        """Task grava o .npz e o endpoint devolve a janela pedida"""
+        pcm_path = str(tmp_path / "feat.f32")
+        write_pcm(pcm_path, np.concatenate([_noise(2.0), _tone(2.0, freq=440.0), _noise(2.0)]))
+        video = Video(youtube_id="feat123", title="Features", duration_seconds=6,
+                      status=VideoStatus.audio_extracted, pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        with patch('app.services.features.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            compute_features_task(video.id)
+
+        db_session.refresh(video)
+        assert video.features_path.endswith("feat.features.npz")
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id).one()
+        assert run.stage == PipelineStage.features
+        assert run.status == StageRunStatus.succeeded
+
+        response = client.get(f"/api/videos/{video.id}/features?start=2&end=3")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["frame_rate"] == 10
+        assert data["start"] == 2.0
+        assert data["length"] == 10
+        assert set(data["speech"][2:8]) == {1}
+        assert len(data["loudness_lufs"]) == 10
+
+    def test_endpoint_without_features_returns_404(self, client, db_session):
+        """Sem features calculadas retorna 404"""
+        video = Video(youtube_id="feat456", title="Features", duration_seconds=6, status=VideoStatus.audio_extracted)
+        db_session.add(video)
+        db_session.commit()
+
+        assert client.get(f"/api/videos/{video.id}/features").status_code == 404
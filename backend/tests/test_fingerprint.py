@@ -0,0 +1,181 @@
+import json
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.models.video import Video, VideoStatus
+from app.models.audio_fingerprint import AudioFingerprint, AudioMatch
+from app.services.pcm import write_pcm
+from app.services.fingerprint import (
+    compute_fingerprint, align, frames_to_seconds, fingerprint_task, index_fingerprint, index_mask,
+    _lookup_candidates, INDEX_HASH_MODULUS, MAX_HASH_OCCURRENCES
+)
+from app.services.transcription import transcribe_audio_task
+
+SAMPLE_RATE = 16000
+
+def _music(seconds, seed):
+    """Sequência de acordes aleatórios de 250 ms (picos espectrais bem definidos)"""
+    rng = np.random.default_rng(seed)
+    note = int(0.25 * SAMPLE_RATE)
+    t = np.arange(note) / SAMPLE_RATE
+    out = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    for start in range(0, len(out) - note + 1, note):
+        for freq in rng.uniform(200, 3000, 3):
+            out[start:start + note] += 0.2 * np.sin(2 * np.pi * freq * t) * np.hanning(note)
+    return out + rng.normal(0, 0.01, len(out)).astype(np.float32)
+
+def _reupload(source, start, end, prefix_seconds, seed=99):
+    """Trecho da origem com volume diferente, ruído e uma introdução nova"""
+    rng = np.random.default_rng(seed)
+    clip = source[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] * 0.7
+    audio = np.concatenate([_music(prefix_seconds, seed), clip])
+    return (audio + rng.normal(0, 0.02, len(audio))).astype(np.float32)
+
+class TestFingerprint:
+    """Testes para os fingerprints de picos espectrais"""
+
+    def test_blocks_do_not_change_hashes(self):
+        """Processar em blocos dá os mesmos hashes que de uma vez"""
+        audio = _music(12, 1)
+        with patch('app.services.fingerprint.BLOCK_FRAMES', 64):
+            blocked = compute_fingerprint(audio)
+        whole = compute_fingerprint(audio)
+
+        np.testing.assert_array_equal(np.sort(blocked[0]), np.sort(whole[0]))
+        assert len(whole[0]) > 0
+        assert whole[0].max() < 2 ** 24
+
+    def test_align_finds_offset_and_overlap(self):
+        """Re-upload cortado e re-mixado: offset e trecho em comum"""
+        source = _music(60, 1)
+        query = _reupload(source, 20, 50, prefix_seconds=8)
+
+        alignment = align(*compute_fingerprint(query), *compute_fingerprint(source))
+
+        # Quadro 8 s do re-upload = quadro 20 s da origem
+        assert frames_to_seconds(alignment.offset_frames) == pytest.approx(12.0, abs=0.05)
+        assert frames_to_seconds(alignment.start_frame) == pytest.approx(8.0, abs=1.0)
+        assert frames_to_seconds(alignment.end_frame) == pytest.approx(38.0, abs=1.0)
+        assert alignment.votes > 100
+
+    def test_unrelated_audio_does_not_align(self):
+        """Áudios diferentes não acumulam votos num offset"""
+        alignment = align(*compute_fingerprint(_music(30, 5)), *compute_fingerprint(_music(30, 6)))
+        assert alignment is None or alignment.votes < 20
+
+class TestFingerprintReuse:
+    """Testes para o índice, a task e o reaproveitamento da transcrição"""
+
+    def _video(self, db_session, tmp_path, youtube_id, samples, **kwargs):
+        pcm_path = str(tmp_path / f"{youtube_id}.f32")
+        write_pcm(pcm_path, samples)
+        video = Video(youtube_id=youtube_id, title="Fingerprint", duration_seconds=len(samples) // SAMPLE_RATE,
+                      status=VideoStatus.audio_extracted, pcm_path=pcm_path, **kwargs)
+        db_session.add(video)
+        db_session.commit()
+        return video
+
+    def _fingerprint(self, db_session, video):
+        with patch('app.services.fingerprint.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            fingerprint_task(video.id)
+
+    def test_task_indexes_and_matches(self, client, db_session, tmp_path):
+        """Segundo vídeo encontra o trecho do primeiro pela tabela hash"""
+        source_audio = _music(60, 1)
+        source = self._video(db_session, tmp_path, "fpsrc", source_audio)
+        clip = self._video(db_session, tmp_path, "fpclip", _reupload(source_audio, 20, 50, prefix_seconds=8))
+
+        self._fingerprint(db_session, source)
+        self._fingerprint(db_session, clip)
+
+        assert db_session.query(AudioFingerprint).filter(AudioFingerprint.video_id == source.id).count() > 0
+        assert db_session.query(AudioMatch).filter(AudioMatch.video_id == source.id).count() == 0
+        db_session.refresh(clip)
+        assert clip.fingerprint_path.endswith("fpclip.fp.npz")
+
+        response = client.get(f"/api/videos/{clip.id}/overlap")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["source_video_id"] == source.id
+        assert data["source_start"] - data["start"] == pytest.approx(12.0, abs=0.05)
+        assert data["end"] == pytest.approx(38.0, abs=1.0)
+
+        assert client.get(f"/api/videos/{source.id}/overlap").status_code == 404
+
+    def test_index_keeps_a_sample_of_hashes(self, db_session, tmp_path):
+        """Só a amostra de valores vai para a tabela; hashes repetidos demais ficam de fora"""
+        hashes, offsets = compute_fingerprint(_music(60, 1))
+        video = self._video(db_session, tmp_path, "fpamostra", np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+        count = index_fingerprint(db_session, video, hashes, offsets)
+        db_session.commit()
+
+        assert count == db_session.query(AudioFingerprint).filter(AudioFingerprint.video_id == video.id).count()
+        assert count == pytest.approx(len(hashes) / INDEX_HASH_MODULUS, rel=0.3)
+        rows = db_session.query(AudioFingerprint.hash).filter(AudioFingerprint.video_id == video.id).all()
+        assert index_mask(np.array([row[0] for row in rows])).all()
+
+        common = int(hashes[index_mask(hashes)][0])
+        repeated = np.full(MAX_HASH_OCCURRENCES + 1, common, dtype=np.int32)
+        assert index_fingerprint(db_session, video, repeated, np.arange(len(repeated), dtype=np.int32)) == 0
+
+    def test_lookup_ignores_common_hashes(self, db_session, tmp_path):
+        """Hash presente em muitas linhas da biblioteca não vota"""
+        hashes, offsets = compute_fingerprint(_music(30, 1))
+        source = self._video(db_session, tmp_path, "fpcomum", np.zeros(SAMPLE_RATE, dtype=np.float32))
+        index_fingerprint(db_session, source, hashes, offsets)
+        db_session.commit()
+        assert _lookup_candidates(db_session, 0, hashes, offsets) == [source.id]
+
+        # O mesmo conteúdo em muitos vídeos: todos os hashes viram "comuns"
+        for i in range(MAX_HASH_OCCURRENCES):
+            copy = self._video(db_session, tmp_path, f"fpcopia{i}", np.zeros(SAMPLE_RATE, dtype=np.float32))
+            index_fingerprint(db_session, copy, hashes, offsets)
+        db_session.commit()
+        assert _lookup_candidates(db_session, 0, hashes, offsets) == []
+
+    def test_transcription_reuses_overlap(self, db_session, tmp_path):
+        """Segmentos da origem cobrem o trecho em comum; o Whisper só roda no resto"""
+        source_transcript = tmp_path / "src.json"
+        source_transcript.write_text(json.dumps({
+            "language": "pt", "model": "small", "source": "whisper",
+            "segments": [
+                {"start": 15.0, "end": 21.0, "text": "borda, retranscrita"},
+                {"start": 22.0, "end": 30.0, "text": "primeiro reaproveitado"},
+                {"start": 31.0, "end": 45.0, "text": "segundo reaproveitado"},
+                {"start": 49.0, "end": 55.0, "text": "fora do trecho"},
+            ]
+        }), encoding="utf-8")
+        source = self._video(db_session, tmp_path, "rsrc", np.zeros(SAMPLE_RATE, dtype=np.float32),
+                             transcript_path=str(source_transcript))
+        audio_path = tmp_path / "rclip.mp3"
+        audio_path.write_bytes(b"mp3")
+        clip = self._video(db_session, tmp_path, "rclip", np.zeros(40 * SAMPLE_RATE, dtype=np.float32),
+                           audio_path=str(audio_path))
+        clip.status = VideoStatus.transcribing
+        db_session.add(AudioMatch(video_id=clip.id, source_video_id=source.id, offset_seconds=12.0,
+                                  start_seconds=8.0, end_seconds=38.0, votes=500))
+        db_session.commit()
+
+        new_parts = {"duration": 40.0, "language": "pt", "language_probability": 0.9, "source": "whisper",
+                     "model": "small", "segments": [{"start": 1.0, "end": 7.5, "text": "introdução nova"}]}
+        with patch('app.services.transcription.whisper_transcript', return_value=new_parts) as whisper, \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcript_cache.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(clip.id)
+
+        assert whisper.call_args.kwargs["regions"] == [(0.0, 10.0), (33.0, 40.0)]
+        db_session.refresh(clip)
+        with open(clip.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert [(s["start"], s["end"], s["text"]) for s in transcript["segments"]] == [
+            (1.0, 7.5, "introdução nova"),
+            (10.0, 18.0, "primeiro reaproveitado"),
+            (19.0, 33.0, "segundo reaproveitado"),
+        ]
+        assert transcript["reused"]["source_video_id"] == source.id
+        assert transcript["reused"]["segments"] == 2
@@ -0,0 +1,185 @@
+import os
+from array import array
+import pytest
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRun, StageRunStatus
+from app.services.hls import package_hls_task, rewrite_playlist, build_hls_command, can_stream_copy
+from app.services.keyframes import KeyframeIndex
+
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:6
+#EXT-X-PLAYLIST-TYPE:VOD
+#EXT-X-MAP:URI="init.mp4"
+#EXTINF:6.000000,
+seg_00000.m4s
+#EXTINF:4.000000,
+seg_00001.m4s
+#EXT-X-ENDLIST
+"""
+
+def _create_video(db_session, tmp_path, hls_path=None):
+    source = tmp_path / "original.mp4"
+    source.write_bytes(b"original")
+    video = Video(
+        youtube_id="hls123",
+        title="HLS Test",
+        duration_seconds=10,
+        status=VideoStatus.downloaded,
+        video_path=str(source),
+        hls_path=hls_path
+    )
+    db_session.add(video)
+    db_session.commit()
+    db_session.refresh(video)
+    return video
+
+def _write_package(output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "index.m3u8"), "w") as f:
+        f.write(PLAYLIST)
+    for name, data in (("init.mp4", b"init"), ("seg_00000.m4s", b"seg0"), ("seg_00001.m4s", b"seg1")):
+        with open(os.path.join(output_dir, name), "wb") as f:
+            f.write(data)
+
+def _fake_popen(fail_copy=False):
+    """Simula o ffmpeg: grava o pacote HLS no diretório da playlist"""
+    commands = []
+
+    def popen(command, **kwargs):
+        commands.append(command)
+        process = MagicMock()
+        process.stdout = iter(["out_time_ms=5000000\n"])
+        process.stderr = iter(["codec not supported"])
+        if fail_copy and 'copy' in command:
+            process.wait.return_value = 1
+        else:
+            _write_package(os.path.dirname(command[-1]))
+            process.wait.return_value = 0
+        return process
+
+    return popen, commands
+
+class TestHLS:
+    """Testes para o empacotamento e a entrega HLS"""
+
+    def test_rewrite_playlist_prefixes_segments_and_init(self):
+        """URIs de segmentos e do init recebem a chave do empacotamento"""
+        playlist = rewrite_playlist(PLAYLIST, "hls123-abcd")
+        assert '#EXT-X-MAP:URI="hls123-abcd/init.mp4"' in playlist
+        assert "hls123-abcd/seg_00000.m4s" in playlist
+        assert "#EXTINF:6.000000," in playlist
+
+    def test_command_uses_stream_copy_and_fmp4(self):
+        """Por padrão empacota sem re-encode, em segmentos fMP4"""
+        command = build_hls_command("in.mp4", "/out")
+        assert command[command.index('-c') + 1] == 'copy'
+        assert command[command.index('-hls_segment_type') + 1] == 'fmp4'
+        assert command[-1] == os.path.join("/out", "index.m3u8")
+
+    def test_package_task_stores_hls_dir(self, db_session, tmp_path):
+        """Deve gerar o pacote por stream copy e registrar o diretório"""
+        video = _create_video(db_session, tmp_path)
+        popen, commands = _fake_popen()
+
+        with patch('app.services.hls.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.hls.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.hls.get_probe', return_value=None), \
+             patch('app.services.hls.get_keyframe_index', return_value=None), \
+             patch('app.services.hls.get_media_duration', return_value=10.0), \
+             patch('app.services.media.subprocess.Popen', side_effect=popen):
+            package_hls_task(video.id)
+
+        db_session.refresh(video)
+        assert len(commands) == 1
+        assert video.hls_path.startswith(str(tmp_path / "hls" / "hls123-"))
+        assert os.path.exists(os.path.join(video.hls_path, "index.m3u8"))
+        assert not any(name.endswith(".part") for name in os.listdir(tmp_path / "hls"))
+
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id).one()
+        assert run.status == StageRunStatus.succeeded
+
+    def test_package_task_falls_back_to_transcode(self, db_session, tmp_path):
+        """Se o stream copy falhar, re-encoda"""
+        video = _create_video(db_session, tmp_path)
+        popen, commands = _fake_popen(fail_copy=True)
+
+        with patch('app.services.hls.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.hls.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.hls.get_probe', return_value=None), \
+             patch('app.services.hls.get_keyframe_index', return_value=None), \
+             patch('app.services.hls.get_media_duration', return_value=10.0), \
+             patch('app.services.media.subprocess.Popen', side_effect=popen):
+            package_hls_task(video.id)
+
+        db_session.refresh(video)
+        assert len(commands) == 2
+        assert 'libx264' in commands[1]
+        assert video.hls_path is not None
+        assert video.status == VideoStatus.downloaded
+
+    def test_package_task_transcodes_when_probe_rules_out_copy(self, db_session, tmp_path):
+        """Codec incompatível no probe vai direto para o re-encode"""
+        video = _create_video(db_session, tmp_path)
+        popen, commands = _fake_popen()
+        probe = MagicMock(video_codec="vp9", audio_codec="opus")
+
+        with patch('app.services.hls.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.hls.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.hls.get_probe', return_value=probe), \
+             patch('app.services.hls.get_keyframe_index', return_value=None), \
+             patch('app.services.hls.get_media_duration', return_value=10.0), \
+             patch('app.services.media.subprocess.Popen', side_effect=popen):
+            package_hls_task(video.id)
+
+        assert len(commands) == 1
+        assert 'libx264' in commands[0]
+
+    def test_long_gop_rules_out_stream_copy(self):
+        """GOP maior que dois segmentos força re-encode"""
+        probe = MagicMock(video_codec="h264", audio_codec="aac")
+        assert can_stream_copy(probe, KeyframeIndex(array("d", [0.0, 2.0, 4.0]))) is True
+        assert can_stream_copy(probe, KeyframeIndex(array("d", [0.0, 30.0]))) is False
+
+    def test_playlist_endpoint_rewrites_and_revalidates(self, client, db_session, tmp_path):
+        """Playlist é servida reescrita, com no-cache e validadores"""
+        hls_dir = tmp_path / "hls123-abcd"
+        _write_package(str(hls_dir))
+        video = _create_video(db_session, tmp_path, hls_path=str(hls_dir))
+
+        response = client.get(f"/api/videos/{video.id}/hls/index.m3u8")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/vnd.apple.mpegurl")
+        assert response.headers["cache-control"] == "no-cache"
+        assert "hls123-abcd/seg_00001.m4s" in response.text
+
+        response = client.get(
+            f"/api/videos/{video.id}/hls/index.m3u8",
+            headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+    def test_segment_endpoint_is_immutable(self, client, db_session, tmp_path):
+        """Segmentos são servidos com cache imutável"""
+        hls_dir = tmp_path / "hls123-abcd"
+        _write_package(str(hls_dir))
+        video = _create_video(db_session, tmp_path, hls_path=str(hls_dir))
+
+        response = client.get(f"/api/videos/{video.id}/hls/hls123-abcd/seg_00001.m4s")
+        assert response.status_code == 200
+        assert response.content == b"seg1"
+        assert "immutable" in response.headers["cache-control"]
+
+    def test_segment_endpoint_rejects_stale_key_and_bad_names(self, client, db_session, tmp_path):
+        """Chave antiga ou nomes fora do padrão retornam 404"""
+        hls_dir = tmp_path / "hls123-abcd"
+        _write_package(str(hls_dir))
+        video = _create_video(db_session, tmp_path, hls_path=str(hls_dir))
+
+        assert client.get(f"/api/videos/{video.id}/hls/hls123-old/seg_00001.m4s").status_code == 404
+        assert client.get(f"/api/videos/{video.id}/hls/hls123-abcd/index.m3u8").status_code == 404
+        assert client.get(f"/api/videos/{video.id}/hls/hls123-abcd/..%2Foriginal.mp4").status_code == 404
@@ -0,0 +1,90 @@
+import json
+import os
+import pytest
+from app.models.video import Video, VideoStatus
+
+@pytest.fixture
+def video(db_session, tmp_path):
+    media_path = tmp_path / "cache123.mp4"
+    media_path.write_bytes(os.urandom(64 * 1024))
+    transcript_path = tmp_path / "cache123.json"
+    transcript_path.write_text(json.dumps({"segments": [{"start": 0, "end": 1, "text": "olá"}]}), encoding="utf-8")
+
+    video = Video(
+        youtube_id="cache123",
+        title="Cache Test",
+        duration_seconds=100,
+        status=VideoStatus.transcribed,
+        video_path=str(media_path),
+        audio_path=str(media_path),
+        transcript_path=str(transcript_path)
+    )
+    db_session.add(video)
+    db_session.commit()
+    return video
+
+class TestHttpCaching:
+    """Testes para ETag, Last-Modified, 304 e If-Range"""
+
+    @pytest.mark.parametrize("endpoint", ["stream", "audio-stream", "transcript"])
+    def test_validators_are_sent(self, client, video, endpoint):
+        """Respostas devem trazer ETag forte, Last-Modified e Cache-Control"""
+        response = client.get(f"/api/videos/{video.id}/{endpoint}")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["last-modified"].endswith("GMT")
+        assert response.headers["cache-control"] == "no-cache"
+
+    @pytest.mark.parametrize("endpoint", ["stream", "audio-stream", "transcript"])
+    def test_if_none_match_returns_304(self, client, video, endpoint):
+        """ETag conhecido deve retornar 304 sem corpo"""
+        etag = client.get(f"/api/videos/{video.id}/{endpoint}").headers["etag"]
+
+        response = client.get(f"/api/videos/{video.id}/{endpoint}", headers={"If-None-Match": f'"outro", {etag}'})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self, client, video):
+        """Data igual ao Last-Modified deve retornar 304"""
+        last_modified = client.get(f"/api/videos/{video.id}/stream").headers["last-modified"]
+
+        response = client.get(f"/api/videos/{video.id}/stream", headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+
+    def test_changed_file_is_served_again(self, client, video):
+        """ETag antigo não deve casar depois que o arquivo muda"""
+        etag = client.get(f"/api/videos/{video.id}/transcript").headers["etag"]
+        with open(video.transcript_path, "w", encoding="utf-8") as f:
+            json.dump({"segments": []}, f)
+        os.utime(video.transcript_path, ns=(1, 1))
+
+        response = client.get(f"/api/videos/{video.id}/transcript", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.json() == {"segments": []}
+
+    def test_if_range_with_current_etag_returns_partial(self, client, video):
+        """If-Range com o ETag atual deve honrar o Range"""
+        etag = client.get(f"/api/videos/{video.id}/stream").headers["etag"]
+
+        response = client.get(
+            f"/api/videos/{video.id}/stream",
+            headers={"Range": "bytes=0-99", "If-Range": etag}
+        )
+
+        assert response.status_code == 206
+        assert len(response.content) == 100
+
+    def test_if_range_with_stale_etag_returns_full_file(self, client, video):
+        """If-Range desatualizado deve ignorar o Range e mandar o arquivo todo"""
+        response = client.get(
+            f"/api/videos/{video.id}/stream",
+            headers={"Range": "bytes=0-99", "If-Range": '"desatualizado"'}
+        )
+
+        assert response.status_code == 200
+        assert len(response.content) == 64 * 1024
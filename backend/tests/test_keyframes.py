@@ -0,0 +1,81 @@
+import pytest
+from array import array
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.keyframes import KeyframeIndex, get_keyframe_index
+
+PACKETS_CSV = "0.000000,K__\n2.000000,K__\n4.000000,K__\n10.000000,K__\n"
+
+def _fake_run(command, **kwargs):
+    if '-show_entries' in command:
+        return MagicMock(returncode=0, stdout=PACKETS_CSV, stderr="")
+    return MagicMock(
+        returncode=0,
+        stdout='{"format": {"duration": "12.0"}, "streams": [{"codec_type": "video", "codec_name": "h264"}]}',
+        stderr=""
+    )
+
+@pytest.fixture
+def index():
+    return KeyframeIndex(array("d", [0.0, 2.0, 4.0, 10.0]))
+
+class TestKeyframeIndex:
+    """Testes para o índice de keyframes"""
+
+    def test_before_and_after(self, index):
+        """before/after incluem o próprio instante quando ele é keyframe"""
+        assert index.before(3.0) == 2.0
+        assert index.before(4.0) == 4.0
+        assert index.after(4.5) == 10.0
+        assert index.after(4.0) == 4.0
+
+    def test_out_of_bounds(self, index):
+        """Fora do intervalo retorna None no lado que não existe"""
+        assert index.before(-1.0) is None
+        assert index.after(11.0) is None
+        assert index.nearest(11.0) == 10.0
+
+    def test_nearest_and_between(self, index):
+        """nearest escolhe o mais próximo; between filtra o intervalo"""
+        assert index.nearest(6.5) == 4.0
+        assert index.nearest(7.5) == 10.0
+        assert list(index.between(1.0, 4.0)) == [2.0, 4.0]
+
+    def test_copy_cut_and_max_gap(self, index):
+        """Corte por copy recua o início ao keyframe anterior"""
+        assert index.copy_cut(5.0, 8.0) == (4.0, 8.0)
+        assert index.max_gap() == 6.0
+
+    @patch('app.services.probe.subprocess.run', side_effect=_fake_run)
+    def test_index_built_from_probe_is_cached(self, mock_run, db_session, tmp_path):
+        """O índice vem do probe e é reaproveitado em memória"""
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b"video")
+        video = Video(youtube_id="kf123", title="Keyframes", duration_seconds=12,
+                      status=VideoStatus.downloaded, video_path=str(source))
+        db_session.add(video)
+        db_session.commit()
+
+        first = get_keyframe_index(db_session, video)
+        second = get_keyframe_index(db_session, video)
+
+        assert first is second
+        assert len(first) == 4
+        assert mock_run.call_count == 2
+
+    @patch('app.services.probe.subprocess.run', side_effect=_fake_run)
+    def test_keyframes_endpoint(self, mock_run, client, db_session, tmp_path):
+        """GET /keyframes retorna os vizinhos de t"""
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b"video")
+        video = Video(youtube_id="kf456", title="Keyframes", duration_seconds=12,
+                      status=VideoStatus.downloaded, video_path=str(source))
+        db_session.add(video)
+        db_session.commit()
+
+        response = client.get(f"/api/videos/{video.id}/keyframes?t=5")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["before"], data["after"], data["nearest"]) == (4.0, 10.0, 4.0)
+        assert data["count"] == 4
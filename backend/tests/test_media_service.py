@@ -0,0 +1,98 @@
+import struct
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.media import mp4_has_faststart, ensure_faststart
+
+def _box(box_type: bytes, payload_size: int = 16) -> bytes:
+    return struct.pack(">I4s", 8 + payload_size, box_type) + b"\0" * payload_size
+
+def _write_mp4(path, *boxes):
+    path.write_bytes(b"".join(boxes))
+    return str(path)
+
+class TestFaststart:
+    """Testes para detecção e remux fast-start"""
+
+    def test_detects_moov_before_mdat(self, tmp_path):
+        """moov antes do mdat é fast-start"""
+        path = _write_mp4(tmp_path / "fast.mp4", _box(b"ftyp"), _box(b"moov"), _box(b"mdat", 1024))
+        assert mp4_has_faststart(path) is True
+
+    def test_detects_moov_at_end(self, tmp_path):
+        """moov no fim precisa de remux"""
+        path = _write_mp4(tmp_path / "slow.mp4", _box(b"ftyp"), _box(b"mdat", 1024), _box(b"moov"))
+        assert mp4_has_faststart(path) is False
+
+    def test_handles_64bit_box_size(self, tmp_path):
+        """Boxes com largesize (size == 1) devem ser pulados corretamente"""
+        large_free = struct.pack(">I4sQ", 1, b"free", 16 + 8) + b"\0" * 8
+        path = _write_mp4(tmp_path / "large.mp4", _box(b"ftyp"), large_free, _box(b"moov"), _box(b"mdat"))
+        assert mp4_has_faststart(path) is True
+
+    @patch('app.services.media.subprocess.run')
+    def test_already_faststart_skips_ffmpeg(self, mock_run, tmp_path):
+        """Não deve chamar ffmpeg se o arquivo já é fast-start"""
+        path = _write_mp4(tmp_path / "fast.mp4", _box(b"ftyp"), _box(b"moov"), _box(b"mdat"))
+
+        assert ensure_faststart(path) is True
+        mock_run.assert_not_called()
+
+    @patch('app.services.media.subprocess.run')
+    def test_remux_uses_stream_copy_and_replaces_file(self, mock_run, tmp_path):
+        """Deve remuxar por stream copy e substituir o original"""
+        path = _write_mp4(tmp_path / "slow.mp4", _box(b"ftyp"), _box(b"mdat"), _box(b"moov"))
+        remuxed = _box(b"ftyp") + _box(b"moov") + _box(b"mdat")
+
+        def fake_ffmpeg(command, **kwargs):
+            with open(command[-1], "wb") as f:
+                f.write(remuxed)
+            return MagicMock(returncode=0, stderr="")
+
+        mock_run.side_effect = fake_ffmpeg
+
+        assert ensure_faststart(path) is True
+        command = mock_run.call_args[0][0]
+        assert command[command.index('-c') + 1] == 'copy'
+        assert '+faststart' in command
+        assert open(path, "rb").read() == remuxed
+        assert not (tmp_path / "slow.faststart.mp4").exists()
+
+    @patch('app.services.media.subprocess.run')
+    def test_ffmpeg_failure_is_not_fatal(self, mock_run, tmp_path):
+        """Falha no ffmpeg mantém o arquivo original e retorna False"""
+        original = _box(b"ftyp") + _box(b"mdat") + _box(b"moov")
+        path = _write_mp4(tmp_path / "slow.mp4", original)
+        mock_run.return_value = MagicMock(returncode=1, stderr="boom")
+
+        assert ensure_faststart(path) is False
+        assert open(path, "rb").read() == original
+
+    def test_non_mp4_is_ignored(self, tmp_path):
+        """WebM e afins não passam pelo remux"""
+        path = tmp_path / "video.webm"
+        path.write_bytes(b"\x1a\x45\xdf\xa3")
+        assert ensure_faststart(str(path)) is False
+
+class TestDownloadFaststart:
+    """Integração do fast-start com a task de download"""
+
+    @patch('app.services.download.ensure_faststart', return_value=True)
+    @patch('app.services.download.youtube_service')
+    def test_download_records_faststart(self, mock_youtube_service, mock_faststart, db_session):
+        """Download concluído deve registrar quando o fast-start foi aplicado"""
+        from app.models.video import Video, VideoStatus
+        from app.services.download import download_video_task
+
+        video = Video(youtube_id="fs123", title="Faststart", duration_seconds=10, status=VideoStatus.downloading)
+        db_session.add(video)
+        db_session.commit()
+        mock_youtube_service.download_video.return_value = "/tmp/fs123.mp4"
+
+        with patch('app.services.download.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            download_video_task(video.id)
+
+        db_session.refresh(video)
+        mock_faststart.assert_called_once_with("/tmp/fs123.mp4")
+        assert video.status == VideoStatus.downloaded
+        assert video.faststart_at is not None
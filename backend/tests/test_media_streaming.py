@@ -0,0 +1,109 @@
+import pytest
+from app.api.responses import parse_range_header, RangeNotSatisfiable
+from app.models.video import Video, VideoStatus
+
+FILE_SIZE = 300 * 1024
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / "media.mp4"
+    path.write_bytes(bytes(i % 251 for i in range(FILE_SIZE)))
+    return path
+
+@pytest.fixture
+def video(db_session, media_file):
+    video = Video(
+        youtube_id="stream123",
+        title="Stream Test",
+        duration_seconds=100,
+        status=VideoStatus.audio_extracted,
+        video_path=str(media_file),
+        audio_path=str(media_file)
+    )
+    db_session.add(video)
+    db_session.commit()
+    return video
+
+class TestParseRangeHeader:
+    """Testes para interpretação do header Range"""
+
+    def test_simple_and_open_ranges(self):
+        assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+        assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+        assert parse_range_header("bytes=900-5000", 1000) == [(900, 999)]
+
+    def test_suffix_range(self):
+        assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+        assert parse_range_header("bytes=-5000", 1000) == [(0, 999)]
+
+    def test_multiple_ranges_are_merged(self):
+        assert parse_range_header("bytes=500-599, 0-99, 90-199", 1000) == [(0, 199), (500, 599)]
+
+    def test_invalid_header_is_ignored(self):
+        assert parse_range_header(None, 1000) is None
+        assert parse_range_header("items=0-1", 1000) is None
+        assert parse_range_header("bytes=abc", 1000) is None
+        assert parse_range_header("bytes=50-10", 1000) is None
+
+    def test_unsatisfiable_range(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=1000-", 1000)
+
+class TestMediaStreaming:
+    """Testes para streaming de vídeo e áudio com Range"""
+
+    def test_full_video(self, client, video, media_file):
+        """Sem Range deve retornar o arquivo inteiro"""
+        response = client.get(f"/api/videos/{video.id}/stream")
+
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-type"] == "video/mp4"
+        assert response.content == media_file.read_bytes()
+
+    def test_single_range(self, client, video, media_file):
+        """Range simples deve retornar 206 com o trecho exato"""
+        response = client.get(f"/api/videos/{video.id}/stream", headers={"Range": "bytes=1000-200000"})
+
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 1000-200000/{FILE_SIZE}"
+        assert response.content == media_file.read_bytes()[1000:200001]
+
+    def test_video_rejects_range_past_end(self, client, video):
+        """start >= tamanho do arquivo deve retornar 416"""
+        response = client.get(f"/api/videos/{video.id}/stream", headers={"Range": f"bytes={FILE_SIZE}-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{FILE_SIZE}"
+
+    def test_multi_range(self, client, video, media_file):
+        """Vários ranges devem vir em multipart/byteranges"""
+        response = client.get(f"/api/videos/{video.id}/stream", headers={"Range": "bytes=0-9,100-109"})
+
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        data = media_file.read_bytes()
+        parts = response.content.split(f"--{boundary}".encode())
+        assert parts[0] == b""
+        assert parts[-1] == b"--\r\n"
+        assert parts[1].endswith(b"\r\n\r\n" + data[0:10] + b"\r\n")
+        assert b"Content-Range: bytes 100-109/" in parts[2]
+        assert parts[2].endswith(b"\r\n\r\n" + data[100:110] + b"\r\n")
+
+    def test_audio_range(self, client, video, media_file):
+        """Áudio deve usar a mesma resposta com Range"""
+        response = client.get(f"/api/videos/{video.id}/audio-stream", headers={"Range": "bytes=-10"})
+
+        assert response.status_code == 206
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == media_file.read_bytes()[-10:]
+
+    def test_media_is_not_compressed(self, client, video):
+        """Mídia não deve passar pela compressão gzip"""
+        response = client.get(f"/api/videos/{video.id}/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.pcm import open_pcm, write_pcm, read_pcm_header, PcmFormatError, HEADER_SIZE
+from app.services.audio_extraction import extract_audio_task, build_extraction_command
+
+def _fake_popen(samples: np.ndarray, returncode=0, stderr_lines=None):
+    """Simula o ffmpeg: PCM no stdout e progresso no stderr"""
+    def popen(command, **kwargs):
+        with open(command[command.index('-y') + 1], "wb") as f:
+            f.write(b"mp3")
+        process = MagicMock()
+        process.stdout = io.BytesIO(samples.astype("<f4").tobytes())
+        lines = stderr_lines if stderr_lines is not None else ["out_time_ms=1000000", "progress=end"]
+        process.stderr = iter(f"{line}\n".encode() for line in lines)
+        process.wait.return_value = returncode
+        return process
+    return popen
+
+class TestPcmCache:
+    """Testes para o cache de PCM decodificado"""
+
+    def test_roundtrip_via_memmap(self, tmp_path):
+        """Amostras gravadas voltam via memmap, com cabeçalho"""
+        samples = np.linspace(-1, 1, 32000, dtype=np.float32)
+        path = str(tmp_path / "a.f32")
+        sha = write_pcm(path, samples)
+
+        pcm = open_pcm(path)
+        assert pcm.sample_rate == 16000
+        assert pcm.num_samples == 32000
+        assert pcm.duration == 2.0
+        assert isinstance(pcm.samples, np.memmap)
+        np.testing.assert_array_equal(pcm.samples, samples)
+        assert sha == hashlib.sha256(samples.tobytes()).hexdigest()
+        assert (tmp_path / "a.f32").stat().st_size == HEADER_SIZE + 32000 * 4
+
+    def test_slice_is_a_view(self, tmp_path):
+        """slice() fatia por tempo sem copiar"""
+        samples = np.arange(48000, dtype=np.float32)
+        path = str(tmp_path / "a.f32")
+        write_pcm(path, samples)
+
+        pcm = open_pcm(path)
+        chunk = pcm.slice(1.0, 1.5)
+        assert len(chunk) == 8000
+        assert chunk[0] == 16000
+        assert np.shares_memory(chunk, pcm.samples)
+        assert len(pcm.slice(2.5, 10.0)) == 8000
+
+    def test_empty_and_invalid_files(self, tmp_path):
+        """PCM vazio abre sem mmap; arquivo estranho é rejeitado"""
+        path = str(tmp_path / "empty.f32")
+        write_pcm(path, np.zeros(0, dtype=np.float32))
+        assert open_pcm(path).num_samples == 0
+
+        bogus = tmp_path / "bogus.f32"
+        bogus.write_bytes(b"x" * 100)
+        with pytest.raises(PcmFormatError):
+            read_pcm_header(str(bogus))
+
+    def test_command_has_mp3_and_pcm_outputs(self):
+        """Um único ffmpeg gera o MP3 e o PCM 16 kHz mono"""
+        command = build_extraction_command("in.mp4", "out.mp3")
+        assert "out.mp3" in command
+        assert command[-1] == "pipe:1"
+        assert command[command.index('-f') + 1] == 'f32le'
+        assert command[command.index('pcm_f32le') + 1:command.index('pcm_f32le') + 5] == ['-ar', '16000', '-ac', '1']
+
+    def test_extract_task_writes_pcm_and_hash(self, db_session, tmp_path):
+        """Extração grava MP3, PCM e hash das amostras"""
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b"video")
+        video = Video(youtube_id="pcm123", title="PCM", duration_seconds=2,
+                      status=VideoStatus.extracting_audio, video_path=str(source))
+        db_session.add(video)
+        db_session.commit()
+        samples = np.sin(np.arange(32000, dtype=np.float32) / 10)
+
+        with patch('app.services.audio_extraction.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.audio_extraction.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.audio_extraction.get_media_duration', return_value=2.0), \
+             patch('app.services.audio_extraction.subprocess.Popen', side_effect=_fake_popen(samples)):
+            extract_audio_task(video.id)
+
+        db_session.refresh(video)
+        assert video.status == VideoStatus.audio_extracted
+        assert video.pcm_path.endswith("pcm123.f32")
+        assert video.waveform_path.endswith("pcm123.peaks.npz")
+        np.testing.assert_array_equal(open_pcm(video.pcm_path).samples, samples)
+        assert video.audio_sha256 == hashlib.sha256(samples.astype("<f4").tobytes()).hexdigest()
+
+    def test_extract_task_failure_removes_partial_pcm(self, db_session, tmp_path):
+        """Erro no ffmpeg não deixa PCM parcial"""
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b"video")
+        video = Video(youtube_id="pcm456", title="PCM", duration_seconds=2,
+                      status=VideoStatus.extracting_audio, video_path=str(source))
+        db_session.add(video)
+        db_session.commit()
+
+        with patch('app.services.audio_extraction.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.audio_extraction.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.audio_extraction.get_media_duration', return_value=2.0), \
+             patch('app.services.audio_extraction.subprocess.Popen',
+                   side_effect=_fake_popen(np.zeros(10), returncode=1, stderr_lines=["Invalid data"])):
+            extract_audio_task(video.id)
+
+        db_session.refresh(video)
+        assert video.status == VideoStatus.audio_extraction_failed
+        assert "Invalid data" in video.audio_extraction_error
+        assert not list((tmp_path / "audio").glob("*.f32*"))
@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.models.media_probe import MediaProbe
+from app.services.probe import get_probe, get_media_duration, unpack_keyframes, pack_keyframes
+
+FFPROBE_JSON = {
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "125.500000", "bit_rate": "2500000"},
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+         "avg_frame_rate": "30000/1001", "bit_rate": "2300000", "tags": {"handler_name": "ignorado"}},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100",
+         "channels": 2, "bit_rate": "128000"}
+    ]
+}
+
+PACKETS_CSV = "0.000000,K__\n0.033367,___\n2.002000,K__\n4.004000,K_\nN/A,K__\n"
+
+def _fake_run(command, **kwargs):
+    if '-show_entries' in command:
+        return MagicMock(returncode=0, stdout=PACKETS_CSV, stderr="")
+    return MagicMock(returncode=0, stdout=json.dumps(FFPROBE_JSON), stderr="")
+
+def _create_video(db_session, tmp_path):
+    source = tmp_path / "original.mp4"
+    source.write_bytes(b"video")
+    video = Video(
+        youtube_id="probe123",
+        title="Probe Test",
+        duration_seconds=120,
+        status=VideoStatus.downloaded,
+        video_path=str(source)
+    )
+    db_session.add(video)
+    db_session.commit()
+    db_session.refresh(video)
+    return video
+
+class TestMediaProbe:
+    """Testes para o cache de probe dos arquivos de mídia"""
+
+    @patch('app.services.probe.subprocess.run', side_effect=_fake_run)
+    def test_probe_stores_streams_and_keyframes(self, mock_run, db_session, tmp_path):
+        """Probe grava codecs, resolução e índice de keyframes"""
+        video = _create_video(db_session, tmp_path)
+
+        probe = get_probe(db_session, video)
+
+        assert probe.video_codec == "h264"
+        assert (probe.width, probe.height) == (1920, 1080)
+        assert probe.fps == pytest.approx(29.97)
+        assert probe.audio_codec == "aac"
+        assert probe.audio_sample_rate == 44100
+        assert probe.duration_seconds == pytest.approx(125.5)
+        assert list(unpack_keyframes(probe.keyframes)) == [0.0, 2.002, 4.004]
+        assert probe.keyframe_count == 3
+        assert "handler_name" not in probe.streams_json
+
+    @patch('app.services.probe.subprocess.run', side_effect=_fake_run)
+    def test_probe_is_cached_until_file_changes(self, mock_run, db_session, tmp_path):
+        """Segunda leitura usa o cache; arquivo alterado força novo probe"""
+        video = _create_video(db_session, tmp_path)
+
+        get_probe(db_session, video)
+        get_probe(db_session, video)
+        assert mock_run.call_count == 2  # formato + pacotes, uma única vez
+
+        with open(video.video_path, "ab") as f:
+            f.write(b"remux")
+        get_probe(db_session, video)
+        assert mock_run.call_count == 4
+        assert db_session.query(MediaProbe).count() == 1
+
+    def test_duration_falls_back_to_metadata(self, db_session, tmp_path):
+        """Sem ffprobe, a duração vem dos metadados do YouTube"""
+        video = _create_video(db_session, tmp_path)
+
+        with patch('app.services.probe.subprocess.run', side_effect=FileNotFoundError("ffprobe")):
+            assert get_media_duration(db_session, video) == 120.0
+
+    def test_pack_roundtrip(self):
+        """Keyframes serializados como float64 voltam iguais"""
+        assert list(unpack_keyframes(pack_keyframes([0.0, 1.5, 3.25]))) == [0.0, 1.5, 3.25]
+        assert len(pack_keyframes([0.0, 1.5])) == 16
+
+    @patch('app.services.probe.subprocess.run', side_effect=_fake_run)
+    def test_probe_endpoint(self, mock_run, client, db_session, tmp_path):
+        """GET /probe retorna o resumo sem o blob de keyframes"""
+        video = _create_video(db_session, tmp_path)
+
+        response = client.get(f"/api/videos/{video.id}/probe")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["video_codec"] == "h264"
+        assert data["keyframe_count"] == 3
+        assert "keyframes" not in data
@@ -0,0 +1,115 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRun, StageRunStatus, PipelineStage
+from app.services.proxy import generate_proxy_task, build_proxy_command
+
+def _create_video(db_session, tmp_path, proxy_path=None):
+    source = tmp_path / "original.mp4"
+    source.write_bytes(b"original" * 100)
+    video = Video(
+        youtube_id="proxy123",
+        title="Proxy Test",
+        duration_seconds=100,
+        status=VideoStatus.downloaded,
+        video_path=str(source),
+        proxy_path=proxy_path
+    )
+    db_session.add(video)
+    db_session.commit()
+    db_session.refresh(video)
+    return video
+
+def _fake_popen(output=b"proxy", returncode=0, stderr=""):
+    """Simula o ffmpeg: escreve o arquivo de saída e emite progresso"""
+    def popen(command, **kwargs):
+        with open(command[-1], "wb") as f:
+            f.write(output)
+        process = MagicMock()
+        process.stdout = iter(["out_time_ms=50000000\n", "progress=end\n"])
+        process.stderr = iter([stderr])
+        process.wait.return_value = returncode
+        return process
+    return popen
+
+class TestProxy:
+    """Testes para a rendição proxy do player de revisão"""
+
+    def test_command_scales_and_forces_keyframes(self):
+        """Proxy deve ser reduzido, rápido e com keyframes frequentes"""
+        command = build_proxy_command("in.mp4", "out.mp4")
+        assert command[command.index('-vf') + 1] == 'scale=-2:360'
+        assert command[command.index('-preset') + 1] == 'veryfast'
+        assert command[command.index('-force_key_frames') + 1] == 'expr:gte(t,n_forced*2)'
+        assert '+faststart' in command
+        assert command[-1] == "out.mp4"
+
+    def test_generates_proxy_and_records_stage_run(self, db_session, tmp_path):
+        """Deve gerar o proxy, salvar o caminho e registrar a etapa"""
+        video = _create_video(db_session, tmp_path)
+
+        with patch('app.services.proxy.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.proxy.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.proxy.get_media_duration', return_value=100.0), \
+             patch('app.services.media.subprocess.Popen', side_effect=_fake_popen()):
+            generate_proxy_task(video.id)
+
+        db_session.refresh(video)
+        assert video.proxy_path == str(tmp_path / "proxy" / "proxy123_360p.mp4")
+        assert open(video.proxy_path, "rb").read() == b"proxy"
+        assert video.status == VideoStatus.downloaded
+
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id).one()
+        assert run.stage == PipelineStage.proxy
+        assert run.status == StageRunStatus.succeeded
+
+    def test_failure_does_not_change_video_status(self, db_session, tmp_path):
+        """Falha no proxy é registrada na etapa sem afetar o vídeo"""
+        video = _create_video(db_session, tmp_path)
+
+        with patch('app.services.proxy.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'), \
+             patch('app.services.proxy.settings.DOWNLOADS_PATH', str(tmp_path)), \
+             patch('app.services.proxy.get_media_duration', return_value=100.0), \
+             patch('app.services.media.subprocess.Popen', side_effect=_fake_popen(returncode=1, stderr="boom")):
+            generate_proxy_task(video.id)
+
+        db_session.refresh(video)
+        assert video.status == VideoStatus.downloaded
+        assert video.proxy_path is None
+        assert not (tmp_path / "proxy" / "proxy123_360p.mp4.part.mp4").exists()
+
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id).one()
+        assert run.status == StageRunStatus.failed
+        assert "boom" in run.error
+
+    def test_stream_proxy_rendition(self, client, db_session, tmp_path):
+        """rendition=proxy serve o arquivo leve; o padrão segue sendo o original"""
+        proxy = tmp_path / "proxy.mp4"
+        proxy.write_bytes(b"lightweight")
+        video = _create_video(db_session, tmp_path, proxy_path=str(proxy))
+
+        response = client.get(f"/api/videos/{video.id}/stream?rendition=proxy")
+        assert response.status_code == 200
+        assert response.content == b"lightweight"
+
+        response = client.get(f"/api/videos/{video.id}/stream")
+        assert response.content == b"original" * 100
+
+    def test_stream_proxy_missing_returns_404(self, client, db_session, tmp_path):
+        """Sem proxy gerado deve retornar 404"""
+        video = _create_video(db_session, tmp_path)
+
+        response = client.get(f"/api/videos/{video.id}/stream?rendition=proxy")
+        assert response.status_code == 404
+
+    def test_post_proxy_schedules_task(self, client, db_session, tmp_path):
+        """POST /proxy agenda a geração em background"""
+        video = _create_video(db_session, tmp_path)
+
+        with patch('app.services.proxy.generate_proxy_task') as mock_task:
+            response = client.post(f"/api/videos/{video.id}/proxy")
+
+        assert response.status_code == 200
+        mock_task.assert_called_once_with(video.id)
@@ -0,0 +1,98 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app.models.video import Video, VideoStatus
+
+def _create_videos(db_session, count=20):
+    for i in range(count):
+        db_session.add(Video(
+            youtube_id=f"plan_{i}",
+            title=f"Plan {i}",
+            duration_seconds=100,
+            status=VideoStatus.pending if i % 2 else VideoStatus.downloaded,
+            deleted_at=datetime.now() if i % 5 == 0 else None
+        ))
+    db_session.commit()
+
+def _capture_video_selects(db_session, client, url):
+    """Executa a requisição e retorna os SELECTs emitidos na tabela videos"""
+    engine = db_session.get_bind()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM videos" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200
+    return statements
+
+def _query_plan(db_session, statement, parameters):
+    engine = db_session.get_bind()
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+class TestQueryPlans:
+    """Regressão dos planos de execução das consultas quentes da API"""
+
+    def test_list_uses_active_created_index(self, client, db_session):
+        """Listagem deve usar o índice parcial (created_at, id) e não ordenar em memória"""
+        _create_videos(db_session)
+        statements = _capture_video_selects(db_session, client, "/api/videos")
+
+        list_query = [s for s in statements if "ORDER BY" in s[0]]
+        assert list_query
+        plan = _query_plan(db_session, *list_query[0])
+        assert "ix_videos_active_created" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_status_filter_uses_active_status_index(self, client, db_session):
+        """Filtro por status deve usar o índice parcial (status, created_at)"""
+        _create_videos(db_session)
+        statements = _capture_video_selects(db_session, client, "/api/videos?status=pending")
+
+        assert statements
+        for statement, parameters in statements:
+            plan = _query_plan(db_session, statement, parameters)
+            assert "ix_videos_active_status_created" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_count_does_not_scan_table(self, client, db_session):
+        """Contagem total deve percorrer apenas um índice parcial"""
+        _create_videos(db_session)
+        statements = _capture_video_selects(db_session, client, "/api/videos")
+
+        count_query = [s for s in statements if "count(" in s[0].lower()]
+        assert count_query
+        plan = _query_plan(db_session, *count_query[0])
+        assert "ix_videos_active_" in plan
+
+    def test_stats_group_by_uses_partial_index(self, client, db_session):
+        """Contagem por status do dashboard deve ler só o índice parcial"""
+        from app.services.stats import invalidate_video_stats
+        _create_videos(db_session)
+        invalidate_video_stats()
+        statements = _capture_video_selects(db_session, client, "/api/videos/stats")
+
+        group_by = [s for s in statements if "GROUP BY" in s[0]]
+        assert group_by
+        plan = _query_plan(db_session, *group_by[0])
+        assert "ix_videos_active_status_created" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_lookup_is_index_seek(self, client, db_session):
+        """Busca por id deve ser um seek, nunca um scan"""
+        _create_videos(db_session)
+        video = db_session.query(Video).filter(Video.deleted_at.is_(None)).first()
+        statements = _capture_video_selects(db_session, client, f"/api/videos/{video.id}")
+
+        assert statements
+        plan = _query_plan(db_session, *statements[0])
+        assert plan.startswith("SEARCH")
+        assert "SCAN" not in plan
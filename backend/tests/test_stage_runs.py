@@ -0,0 +1,112 @@
+import pytest
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRun, StageRunStatus, PipelineStage
+from app.services.stage_runs import (
+    start_stage_run,
+    update_stage_progress,
+    finish_stage_run,
+    get_live_progress
+)
+
+def _create_video(db_session, youtube_id="stage123", status=VideoStatus.downloading):
+    video = Video(
+        youtube_id=youtube_id,
+        title="Stage Test",
+        duration_seconds=100,
+        status=status
+    )
+    db_session.add(video)
+    db_session.commit()
+    db_session.refresh(video)
+    return video
+
+class TestStageRuns:
+    """Testes para o histórico de execuções por etapa"""
+
+    def test_start_stage_run_points_video_to_run(self, db_session):
+        """Deve criar a execução e apontar o vídeo para ela"""
+        video = _create_video(db_session)
+
+        run = start_stage_run(db_session, video, PipelineStage.download)
+
+        assert run.id is not None
+        assert run.attempt == 1
+        assert run.status == StageRunStatus.running
+        assert run.worker
+        assert video.current_stage_run_id == run.id
+
+    def test_auxiliary_stage_keeps_main_pointer(self, db_session):
+        """Etapa auxiliar não desvia o progresso exibido da etapa principal"""
+        video = _create_video(db_session)
+
+        download = start_stage_run(db_session, video, PipelineStage.download)
+        proxy = start_stage_run(db_session, video, PipelineStage.proxy)
+
+        assert proxy.id is not None
+        assert video.current_stage_run_id == download.id
+
+    def test_attempts_are_numbered_per_stage(self, db_session):
+        """Retries devem incrementar a tentativa apenas da mesma etapa"""
+        video = _create_video(db_session)
+
+        first = start_stage_run(db_session, video, PipelineStage.download)
+        finish_stage_run(db_session, first, error="Network error")
+        second = start_stage_run(db_session, video, PipelineStage.download)
+        other = start_stage_run(db_session, video, PipelineStage.audio_extraction)
+
+        assert second.attempt == 2
+        assert other.attempt == 1
+        assert first.status == StageRunStatus.failed
+        assert first.error == "Network error"
+
+    def test_progress_is_written_only_to_stage_run(self, db_session):
+        """Ticks de progresso não devem tocar a linha do vídeo"""
+        video = _create_video(db_session)
+        run = start_stage_run(db_session, video, PipelineStage.download)
+
+        assert update_stage_progress(db_session, run, 42.0) is True
+        assert update_stage_progress(db_session, run, 42.05) is False
+
+        db_session.refresh(video)
+        assert run.progress == 42.0
+        assert video.download_progress == 0.0
+        assert get_live_progress(db_session, video, PipelineStage.download, video.download_progress) == 42.0
+
+    def test_finish_records_duration(self, db_session):
+        """Deve registrar término e duração ao finalizar"""
+        video = _create_video(db_session)
+        run = start_stage_run(db_session, video, PipelineStage.download)
+
+        finish_stage_run(db_session, run)
+
+        assert run.status == StageRunStatus.succeeded
+        assert run.progress == 100.0
+        assert run.finished_at is not None
+        assert run.duration_seconds >= 0
+
+    def test_get_video_overlays_live_progress(self, client, db_session):
+        """GET do vídeo deve refletir o progresso da execução em andamento"""
+        video = _create_video(db_session)
+        run = start_stage_run(db_session, video, PipelineStage.download)
+        update_stage_progress(db_session, run, 37.5)
+
+        response = client.get(f"/api/videos/{video.id}")
+
+        assert response.status_code == 200
+        assert response.json()["download_progress"] == 37.5
+
+    def test_stages_endpoint_returns_history(self, client, db_session):
+        """Deve listar todas as tentativas do vídeo"""
+        video = _create_video(db_session)
+        first = start_stage_run(db_session, video, PipelineStage.download)
+        finish_stage_run(db_session, first, error="Falhou")
+        second = start_stage_run(db_session, video, PipelineStage.download)
+
+        response = client.get(f"/api/videos/{video.id}/stages")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["current_stage_run_id"] == second.id
+        assert [r["attempt"] for r in data["runs"]] == [1, 2]
+        assert data["runs"][0]["status"] == "failed"
+        assert data["runs"][1]["stage"] == "download"
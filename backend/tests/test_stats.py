@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import PipelineStage
+from app.services.stage_runs import start_stage_run, finish_stage_run
+from app.services.stats import get_video_stats, invalidate_video_stats
+
+@pytest.fixture(autouse=True)
+def clear_stats_cache():
+    invalidate_video_stats()
+    yield
+    invalidate_video_stats()
+
+def _create_video(db_session, youtube_id, status, deleted=False):
+    video = Video(
+        youtube_id=youtube_id,
+        title="Stats Test",
+        duration_seconds=100,
+        status=status,
+        deleted_at=datetime.now() if deleted else None
+    )
+    db_session.add(video)
+    db_session.commit()
+    return video
+
+class TestVideoStats:
+    """Testes para o resumo do dashboard"""
+
+    def test_counts_by_status(self, db_session):
+        """Deve contar vídeos ativos por status, em andamento e com falha"""
+        _create_video(db_session, "s1", VideoStatus.pending)
+        _create_video(db_session, "s2", VideoStatus.downloading)
+        _create_video(db_session, "s3", VideoStatus.transcribing)
+        _create_video(db_session, "s4", VideoStatus.download_failed)
+        _create_video(db_session, "s5", VideoStatus.pending, deleted=True)
+
+        stats = get_video_stats(db_session)
+
+        assert stats["total"] == 4
+        assert stats["counts"]["pending"] == 1
+        assert stats["counts"]["completed"] == 0
+        assert stats["in_flight"] == 2
+        assert stats["failed"] == 1
+
+    def test_stage_durations_and_retries(self, db_session):
+        """Deve calcular duração média e falhas por etapa"""
+        video = _create_video(db_session, "s6", VideoStatus.downloaded)
+        failed = start_stage_run(db_session, video, PipelineStage.download)
+        finish_stage_run(db_session, failed, error="Erro")
+        ok = start_stage_run(db_session, video, PipelineStage.download)
+        finish_stage_run(db_session, ok)
+
+        stats = get_video_stats(db_session)
+
+        download = stats["stages"]["download"]
+        assert download["runs"] == 2
+        assert download["failed_runs"] == 1
+        assert download["avg_duration_seconds"] is not None
+
+    def test_result_is_cached(self, db_session):
+        """Chamadas dentro do TTL não devem consultar o banco de novo"""
+        _create_video(db_session, "s7", VideoStatus.pending)
+        first = get_video_stats(db_session)
+        _create_video(db_session, "s8", VideoStatus.pending)
+
+        assert get_video_stats(db_session) is first
+
+        invalidate_video_stats()
+        assert get_video_stats(db_session)["total"] == 2
+
+    def test_stats_endpoint(self, client, db_session):
+        """GET /stats não deve colidir com /{video_id}"""
+        _create_video(db_session, "s9", VideoStatus.downloaded)
+
+        response = client.get("/api/videos/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["counts"]["downloaded"] == 1
@@ -0,0 +1,103 @@
+import json
+import sys
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.pcm import write_pcm
+from app.services.time_compression import build_atempo_command, time_compress, rescale_segments
+
+SAMPLE_RATE = 16000
+
+class TestTimeCompression:
+    """Testes para o áudio acelerado e o reescalonamento dos tempos"""
+
+    def test_command_from_samples(self):
+        """Amostras entram e saem como float32 por pipe"""
+        command = build_atempo_command(1.25)
+
+        assert command[command.index('-i') + 1] == 'pipe:0'
+        assert command[command.index('-af') + 1] == 'atempo=1.25'
+        assert command[-3:] == ['-f', 'f32le', 'pipe:1']
+
+    def test_command_from_file(self):
+        """Sem PCM, o ffmpeg decodifica o arquivo direto"""
+        command = build_atempo_command(1.5, "/audio/x.mp3")
+        assert command[command.index('-i') + 1] == "/audio/x.mp3"
+        assert '-vn' in command
+
+    @patch('app.services.time_compression.subprocess.run')
+    def test_time_compress(self, mock_run):
+        """Envia as amostras ao ffmpeg e lê o resultado"""
+        output = np.ones(8000, dtype='<f4')
+        mock_run.return_value = MagicMock(returncode=0, stdout=output.tobytes(), stderr=b"")
+
+        samples = np.zeros(12000, dtype=np.float32)
+        audio = time_compress(samples, 1.5)
+
+        assert len(audio) == 8000
+        stdin = mock_run.call_args.kwargs["input"]
+        assert len(stdin) == 12000 * 4
+        assert np.shares_memory(np.frombuffer(stdin, dtype='<f4'), samples)
+
+    @patch('app.services.time_compression.subprocess.run')
+    def test_ffmpeg_error(self, mock_run):
+        """Falha do ffmpeg vira exceção com o stderr"""
+        mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"Invalid argument")
+        with pytest.raises(Exception, match="Invalid argument"):
+            time_compress(np.zeros(100, dtype=np.float32), 1.25)
+
+    def test_rejects_out_of_range_speed(self):
+        """Velocidade fora de 1x-2x é rejeitada"""
+        with pytest.raises(ValueError):
+            time_compress(np.zeros(100, dtype=np.float32), 3.0)
+
+    def test_rescale_segments_and_words(self):
+        """Segmentos e palavras voltam ao tempo original"""
+        segments = [{"start": 1.0, "end": 2.0, "text": "a b",
+                     "words": [{"start": 1.0, "end": 1.4, "word": "a"}, {"start": 1.5, "end": 2.0, "word": "b"}]}]
+        rescale_segments(segments, 1.5)
+
+        assert (segments[0]["start"], segments[0]["end"]) == (1.5, 3.0)
+        assert segments[0]["words"][1] == {"start": 2.25, "end": 3.0, "word": "b"}
+
+    def test_task_rescales_transcript(self, db_session, tmp_path):
+        """Com TRANSCRIPTION_SPEED o Whisper ouve o áudio acelerado e a transcrição fica no tempo do vídeo"""
+        pcm_path = str(tmp_path / "fast123.f32")
+        write_pcm(pcm_path, np.zeros(6 * SAMPLE_RATE, dtype=np.float32))
+        audio_path = tmp_path / "fast123.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id="fast123", title="Acelerado", duration_seconds=6, status=VideoStatus.transcribing,
+                      audio_path=str(audio_path), pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        model = MagicMock()
+        model.transcribe.return_value = (
+            iter([SimpleNamespace(start=1.0, end=2.0, text="oi", avg_logprob=-0.1, no_speech_prob=0.0, compression_ratio=1.0)]),
+            SimpleNamespace(language="pt", language_probability=0.9, duration=4.0)
+        )
+        fake_module = SimpleNamespace(WhisperModel=MagicMock(return_value=model))
+        compressed = np.zeros(4 * SAMPLE_RATE, dtype=np.float32)
+
+        from app.services.transcription import transcribe_audio_task
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch('app.services.transcription.settings.TRANSCRIPTION_SPEED', 1.5), \
+             patch('app.services.transcription.time_compress', return_value=compressed) as compress, \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        assert compress.call_args.args[1] == 1.5
+        assert model.transcribe.call_args.args[0] is compressed
+
+        db_session.refresh(video)
+        with open(video.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        segment = transcript["segments"][0]
+        assert (segment["start"], segment["end"]) == (1.5, 3.0)
+        assert transcript["duration"] == pytest.approx(6.0)
+        assert transcript["speed"] == 1.5
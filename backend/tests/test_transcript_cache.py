@@ -0,0 +1,101 @@
+import json
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.models.video import Video, VideoStatus
+from app.services.pcm import write_pcm, pcm_sha256
+from app.services.transcript_cache import transcription_profile, cache_key, load_cached, store_cached, audio_identity
+from app.services.transcription import transcribe_audio_task
+
+RESULT = {
+    "duration": 4.0, "language": "pt", "language_probability": 0.97,
+    "segments": [{"start": 0.0, "end": 2.0, "text": "olá"}], "source": "whisper", "model": "small",
+}
+
+class TestTranscriptCache:
+    """Testes para o cache de transcrições por conteúdo do áudio"""
+
+    def _video(self, db_session, tmp_path, youtube_id, samples):
+        pcm_path = str(tmp_path / f"{youtube_id}.f32")
+        sha = write_pcm(pcm_path, samples)
+        audio_path = tmp_path / f"{youtube_id}.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id=youtube_id, title="Cache", duration_seconds=4, status=VideoStatus.transcribing,
+                      audio_path=str(audio_path), pcm_path=pcm_path, audio_sha256=sha)
+        db_session.add(video)
+        db_session.commit()
+        return video
+
+    def _transcribe(self, db_session, tmp_path, video, whisper_result=RESULT):
+        with patch('app.services.transcription.whisper_transcript', return_value=dict(whisper_result)) as whisper, \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcript_cache.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+        return whisper
+
+    def test_pcm_sha256_matches_writer(self, tmp_path):
+        """Hash recalculado do arquivo é o mesmo gravado na extração"""
+        samples = np.random.default_rng(1).uniform(-1, 1, 5000).astype(np.float32)
+        sha = write_pcm(str(tmp_path / "a.f32"), samples)
+        assert pcm_sha256(str(tmp_path / "a.f32")) == sha
+
+    def test_key_depends_on_profile(self, tmp_path):
+        """Mudar o modelo muda a chave"""
+        video = Video(youtube_id="k1", title="Cache")
+        profile = transcription_profile(video)
+        with patch('app.services.transcript_cache.settings.WHISPER_MODEL', "medium"):
+            other = transcription_profile(video)
+
+        assert cache_key("abc", profile) == cache_key("abc", dict(profile))
+        assert cache_key("abc", profile) != cache_key("abc", other)
+        assert cache_key("abc", profile) != cache_key("abd", profile)
+
+    def test_store_and_load(self, tmp_path):
+        """Entrada gravada é lida de volta e nunca sobrescrita"""
+        with patch('app.services.transcript_cache.settings.TRANSCRIPTS_PATH', str(tmp_path)):
+            key = cache_key("abc", {"model": "small"})
+            assert load_cached(key) is None
+            store_cached(key, "abc", {"model": "small"}, RESULT)
+            store_cached(key, "abc", {"model": "small"}, {**RESULT, "segments": []})
+
+            assert load_cached(key) == RESULT
+            assert os.path.exists(tmp_path / "cache" / key[:2] / f"{key}.json")
+
+    def test_identical_audio_reuses_transcript(self, db_session, tmp_path):
+        """Segundo vídeo com o mesmo áudio não roda o Whisper e recebe cópia própria"""
+        samples = np.random.default_rng(2).uniform(-1, 1, 16000).astype(np.float32)
+        first = self._video(db_session, tmp_path, "orig123", samples)
+        reupload = self._video(db_session, tmp_path, "reup456", samples)
+
+        assert self._transcribe(db_session, tmp_path, first).call_count == 1
+        whisper = self._transcribe(db_session, tmp_path, reupload)
+
+        whisper.assert_not_called()
+        db_session.refresh(reupload)
+        assert reupload.status == VideoStatus.transcribed
+        assert reupload.transcript_path != first.transcript_path
+        with open(reupload.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert transcript["youtube_id"] == "reup456"
+        assert transcript["segments"] == RESULT["segments"]
+        assert len(transcript["cache_key"]) == 64
+
+    def test_different_audio_misses(self, db_session, tmp_path):
+        """Áudio diferente roda o Whisper normalmente"""
+        first = self._video(db_session, tmp_path, "aud111", np.zeros(16000, dtype=np.float32))
+        other = self._video(db_session, tmp_path, "aud222", np.ones(16000, dtype=np.float32) * 0.1)
+
+        self._transcribe(db_session, tmp_path, first)
+        assert self._transcribe(db_session, tmp_path, other).call_count == 1
+
+    def test_identity_backfilled_from_pcm(self, db_session, tmp_path):
+        """Vídeo extraído antes do hash existir tem o hash calculado do PCM"""
+        video = self._video(db_session, tmp_path, "old123", np.zeros(1000, dtype=np.float32))
+        expected = video.audio_sha256
+        video.audio_sha256 = None
+
+        assert audio_identity(video) == expected
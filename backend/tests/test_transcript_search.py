@@ -0,0 +1,122 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from app.models.video import Video, VideoStatus
+from app.models.transcript_segment import TranscriptSegment
+from app.services.transcript_store import sync_segments
+from app.services.transcript_search import postgres_search_query, highlight, headline_html, HEADLINE_START, HEADLINE_STOP
+
+def _video(db_session, tmp_path, youtube_id, segments, index=True, **kwargs):
+    transcript_path = tmp_path / f"{youtube_id}.json"
+    transcript_path.write_text(json.dumps({"language": "pt", "segments": segments}), encoding="utf-8")
+    video = Video(youtube_id=youtube_id, title=f"Vídeo {youtube_id}", duration_seconds=60,
+                  status=VideoStatus.transcribed, transcript_path=str(transcript_path), **kwargs)
+    db_session.add(video)
+    db_session.commit()
+    if index:
+        sync_segments(db_session, video.id, segments)
+        db_session.commit()
+    return video
+
+class TestTranscriptSearch:
+    """Testes para a busca textual nas transcrições"""
+
+    @pytest.fixture(autouse=True)
+    def _background_session(self, db_session):
+        """Tasks em background usam a sessão de teste"""
+        with patch('app.services.transcript_store.SessionLocal', return_value=db_session), \
+             patch('app.services.transcript_search.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            yield
+
+    def test_search_across_videos(self, client, db_session, tmp_path):
+        """Hits de vários vídeos com tempo do segmento e termo destacado"""
+        first = _video(db_session, tmp_path, "busca1", [
+            {"start": 0.0, "end": 3.0, "text": "começa a partida"},
+            {"start": 12.0, "end": 15.5, "text": "Que golaço do camisa dez"},
+        ])
+        second = _video(db_session, tmp_path, "busca2", [{"start": 40.0, "end": 44.0, "text": "outro golaço no fim"}])
+        _video(db_session, tmp_path, "apagado", [{"start": 1.0, "end": 2.0, "text": "golaço apagado"}],
+               deleted_at=datetime.now())
+
+        response = client.get("/api/videos/search", params={"q": "golaço"})
+        assert response.status_code == 200
+        hits = response.json()["hits"]
+        assert [(h["video_id"], h["start"], h["end"]) for h in hits] == [(first.id, 12.0, 15.5), (second.id, 40.0, 44.0)]
+        assert hits[0]["snippet"] == "Que <mark>golaço</mark> do camisa dez"
+        assert hits[0]["youtube_id"] == "busca1"
+
+    def test_all_terms_and_pagination(self, client, db_session, tmp_path):
+        """Todos os termos precisam aparecer; limit/offset paginam"""
+        _video(db_session, tmp_path, "termos", [
+            {"start": float(i), "end": i + 0.5, "text": f"pênalti marcado {i}" if i % 2 else "pênalti perdido"}
+            for i in range(6)
+        ])
+
+        hits = client.get("/api/videos/search", params={"q": "pênalti marcado"}).json()["hits"]
+        assert [h["start"] for h in hits] == [1.0, 3.0, 5.0]
+
+        page = client.get("/api/videos/search", params={"q": "pênalti", "limit": 2, "offset": 2}).json()
+        assert [h["start"] for h in page["hits"]] == [2.0, 3.0]
+
+    def test_like_wildcards_are_literal(self, client, db_session, tmp_path):
+        """% e _ na busca não viram curingas"""
+        _video(db_session, tmp_path, "curinga", [{"start": 0.0, "end": 1.0, "text": "posse de bola"}])
+        assert client.get("/api/videos/search", params={"q": "p_sse"}).json()["hits"] == []
+        assert client.get("/api/videos/search", params={"q": "%%"}).json()["hits"] == []
+
+    def test_edit_updates_index(self, client, db_session, tmp_path):
+        """Edição no editor já aparece na busca"""
+        video = _video(db_session, tmp_path, "editado", [{"start": 0.0, "end": 2.0, "text": "bola na trave"}])
+        client.patch(f"/api/videos/{video.id}/transcript",
+                     json={"version": 0, "ops": [{"op": "edit", "idx": 0, "text": "bola no poste"}]})
+
+        assert client.get("/api/videos/search", params={"q": "trave"}).json()["hits"] == []
+        assert len(client.get("/api/videos/search", params={"q": "poste"}).json()["hits"]) == 1
+
+    def test_reindex_old_transcripts(self, client, db_session, tmp_path):
+        """Transcrições anteriores à tabela entram no índice pelo reindex"""
+        video = _video(db_session, tmp_path, "antigo", [{"start": 5.0, "end": 7.0, "text": "cartão vermelho"}],
+                       index=False)
+        assert client.get("/api/videos/search", params={"q": "cartão"}).json()["hits"] == []
+
+        response = client.post("/api/videos/search/reindex")
+        assert response.json()["pending"] == 1
+        assert db_session.query(TranscriptSegment).filter(TranscriptSegment.video_id == video.id).count() == 1
+        assert client.post("/api/videos/search/reindex").json()["pending"] == 0
+        assert len(client.get("/api/videos/search", params={"q": "cartão"}).json()["hits"]) == 1
+
+    def test_query_too_short(self, client):
+        assert client.get("/api/videos/search", params={"q": "a"}).status_code == 422
+
+    def test_highlight(self):
+        assert highlight("Gol, GOL e gol!", ["gol"]) == "<mark>Gol</mark>, <mark>GOL</mark> e <mark>gol</mark>!"
+
+    def test_snippet_is_escaped(self, client, db_session, tmp_path):
+        """Texto da transcrição não vira HTML no trecho; só as marcas ficam cruas"""
+        _video(db_session, tmp_path, "escape", [{"start": 0.0, "end": 2.0, "text": "<script>gol</script> & <b>placa</b>"}])
+
+        hits = client.get("/api/videos/search", params={"q": "gol"}).json()["hits"]
+        assert hits[0]["snippet"] == "&lt;script&gt;<mark>gol</mark>&lt;/script&gt; &amp; &lt;b&gt;placa&lt;/b&gt;"
+        assert highlight("a < b", []) == "a &lt; b"
+
+    def test_headline_html(self):
+        """Marcadores do ts_headline viram <mark> depois de escapar o texto"""
+        headline = f'"{HEADLINE_START}gol{HEADLINE_STOP}" <i>'
+        assert headline_html(headline) == "&quot;<mark>gol</mark>&quot; &lt;i&gt;"
+
+    def test_postgres_query_uses_gin_expression(self):
+        """A expressão da consulta é a mesma do índice GIN; headline só na página"""
+        sql = str(postgres_search_query("gol de placa", 20, 0).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        ))
+        index = next(ix for ix in TranscriptSegment.__table__.indexes if ix.name == "ix_transcript_segments_search")
+        ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+        assert "USING gin (to_tsvector('portuguese', text))" in ddl
+        assert "to_tsvector('portuguese', transcript_segments.text) @@ websearch_to_tsquery('portuguese', 'gol de placa')" in sql
+        assert sql.index("ts_headline") < sql.index("FROM (SELECT")
+        assert "LIMIT 20" in sql
@@ -0,0 +1,338 @@
+import json
+import pytest
+from sqlalchemy import event
+from unittest.mock import patch
+from app.models.video import Video, VideoStatus
+from app.models.transcript_segment import TranscriptSegment
+from app.services import transcript_store
+from app.services.transcript_store import sync_segments, segment_at, segments_in_range, flush_transcript, write_transcript_json
+from app.services.words import write_words, open_words, words_path_for
+from app.services.transcription import transcribe_audio_task
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": "abertura"},
+    {"start": 5.0, "end": 9.0, "text": "primeiro lance"},
+    {"start": 9.0, "end": 15.0, "text": "gol"},
+    {"start": 20.0, "end": 24.0, "text": "replay"},
+    {"start": 24.5, "end": 30.0, "text": "entrevista"},
+]
+
+def _video(db_session, tmp_path, youtube_id="seg123", segments=SEGMENTS):
+    transcript_path = tmp_path / f"{youtube_id}.json"
+    transcript_path.write_text(json.dumps({"language": "pt", "segments": segments}), encoding="utf-8")
+    video = Video(youtube_id=youtube_id, title="Segmentos", duration_seconds=30, status=VideoStatus.transcribed,
+                  transcript_path=str(transcript_path))
+    db_session.add(video)
+    db_session.commit()
+    return video
+
+class TestTranscriptSegments:
+    """Testes para os segmentos da transcrição no banco"""
+
+    def test_lazy_backfill_and_window(self, client, db_session, tmp_path):
+        """Transcrição antiga é carregada do JSON na primeira consulta por janela"""
+        video = _video(db_session, tmp_path)
+        assert db_session.query(TranscriptSegment).count() == 0
+
+        response = client.get(f"/api/videos/{video.id}/transcript", params={"from": 7.0, "to": 21.0})
+        assert response.status_code == 200
+        data = response.json()
+        assert [s["idx"] for s in data["segments"]] == [1, 2, 3]
+        assert data["total"] == 3
+        assert data["segments"][0] == {"idx": 1, "start": 5.0, "end": 9.0, "text": "primeiro lance"}
+        assert db_session.query(TranscriptSegment).filter(TranscriptSegment.video_id == video.id).count() == 5
+
+    def test_pagination(self, client, db_session, tmp_path):
+        """offset/limit paginam a transcrição em ordem de tempo"""
+        video = _video(db_session, tmp_path)
+
+        page = client.get(f"/api/videos/{video.id}/transcript", params={"offset": 2, "limit": 2}).json()
+        assert [s["text"] for s in page["segments"]] == ["gol", "replay"]
+        assert page["total"] == 5
+        assert page["offset"] == 2 and page["limit"] == 2
+
+    def test_full_transcript_unchanged(self, client, db_session, tmp_path):
+        """Sem parâmetros continua devolvendo o arquivo inteiro"""
+        video = _video(db_session, tmp_path)
+        data = client.get(f"/api/videos/{video.id}/transcript").json()
+        assert data["segments"] == SEGMENTS
+
+    def test_segment_at(self, client, db_session, tmp_path):
+        """Segmento no tempo t; pausa entre segmentos dá 404"""
+        video = _video(db_session, tmp_path)
+
+        response = client.get(f"/api/videos/{video.id}/transcript/segment-at", params={"t": 9.0})
+        assert response.status_code == 200
+        assert response.json()["text"] == "gol"
+        assert client.get(f"/api/videos/{video.id}/transcript/segment-at", params={"t": 17.0}).status_code == 404
+
+    def test_put_resyncs_rows(self, client, db_session, tmp_path):
+        """PUT /transcript reescreve as linhas do banco"""
+        video = _video(db_session, tmp_path)
+        client.get(f"/api/videos/{video.id}/transcript", params={"limit": 10})
+
+        response = client.put(f"/api/videos/{video.id}/transcript",
+                              json={"version": 0, "segments": [{"start": 1.0, "end": 2.0, "text": "editado"}]})
+        assert response.status_code == 200
+        data = client.get(f"/api/videos/{video.id}/transcript", params={"limit": 10}).json()
+        assert [s["text"] for s in data["segments"]] == ["editado"]
+
+    def test_task_syncs_rows(self, db_session, tmp_path):
+        """Transcrição nova já grava as linhas"""
+        audio_path = tmp_path / "task123.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id="task123", title="Task", duration_seconds=30, status=VideoStatus.transcribing,
+                      audio_path=str(audio_path))
+        db_session.add(video)
+        db_session.commit()
+
+        result = {"duration": 30.0, "language": "pt", "language_probability": 0.9, "source": "whisper",
+                  "model": "small", "segments": [dict(s) for s in SEGMENTS]}
+
+        def write_locked(path, data):
+            # Mesma trava das gravações das edições
+            assert transcript_store._locks[video.id].locked()
+            write_transcript_json(path, data)
+
+        with patch('app.services.transcription.whisper_transcript', return_value=result), \
+             patch('app.services.transcription.write_transcript_json', side_effect=write_locked) as writer, \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcript_cache.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        rows = db_session.query(TranscriptSegment).filter(TranscriptSegment.video_id == video.id) \
+            .order_by(TranscriptSegment.idx).all()
+        assert [(r.idx, r.start, r.text) for r in rows] == [(i, s["start"], s["text"]) for i, s in enumerate(SEGMENTS)]
+        writer.assert_called_once()
+        db_session.refresh(video)
+        assert video.transcript_version == 1
+
+    def test_queries_use_video_start_index(self, db_session, tmp_path):
+        """Janela e segmento no tempo t são buscas no índice (video_id, start)"""
+        video = _video(db_session, tmp_path)
+        sync_segments(db_session, video.id, SEGMENTS)
+        db_session.commit()
+
+        engine = db_session.get_bind()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "FROM transcript_segments" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            assert segment_at(db_session, video.id, 10.0).text == "gol"
+            assert len(segments_in_range(db_session, video.id, 10.0, 22.0).all()) == 2
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert statements
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plan = " | ".join(row[-1] for row in rows)
+                assert "ix_transcript_segments_video_start" in plan
+
+class TestTranscriptPatch:
+    """Testes para as edições por segmento com controle de versão"""
+
+    @pytest.fixture(autouse=True)
+    def _flush_session(self, db_session):
+        """A gravação em background usa a sessão de teste"""
+        with patch('app.services.transcript_store.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            yield
+
+    def _patch(self, client, video, version, *ops):
+        return client.patch(f"/api/videos/{video.id}/transcript", json={"version": version, "ops": list(ops)})
+
+    def _file_segments(self, video):
+        with open(video.transcript_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_edit_and_retime(self, client, db_session, tmp_path):
+        """Edita texto e tempo; JSON é regravado com a nova versão"""
+        video = _video(db_session, tmp_path)
+
+        response = self._patch(client, video, 0,
+                               {"op": "edit", "idx": 2, "text": " golaço "},
+                               {"op": "retime", "idx": 3, "start": 19.5, "end": 23.0})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["version"] == 1
+        assert data["segments"] == [
+            {"idx": 2, "start": 9.0, "end": 15.0, "text": "golaço"},
+            {"idx": 3, "start": 19.5, "end": 23.0, "text": "replay"},
+        ]
+
+        transcript = self._file_segments(video)
+        assert transcript["version"] == 1
+        assert [s["text"] for s in transcript["segments"]] == ["abertura", "primeiro lance", "golaço", "replay", "entrevista"]
+        assert transcript["segments"][3]["start"] == 19.5
+        assert transcript["language"] == "pt"
+        assert not list(tmp_path.glob("*.part"))
+
+    def test_split_and_merge(self, client, db_session, tmp_path):
+        """Split cria um segmento e desloca os seguintes; merge desfaz"""
+        video = _video(db_session, tmp_path)
+
+        response = self._patch(client, video, 0, {"op": "split", "idx": 1, "at": 7.0})
+        assert response.status_code == 200
+        assert [s["text"] for s in response.json()["segments"]] == ["primeiro", "lance"]
+
+        page = client.get(f"/api/videos/{video.id}/transcript", params={"limit": 10}).json()
+        assert [(s["idx"], s["start"], s["end"]) for s in page["segments"]][:4] == [
+            (0, 0.0, 4.0), (1, 5.0, 7.0), (2, 7.0, 9.0), (3, 9.0, 15.0)
+        ]
+        assert page["total"] == 6
+
+        response = self._patch(client, video, 1, {"op": "merge", "idx": 1})
+        assert response.status_code == 200
+        segments = self._file_segments(video)["segments"]
+        assert [(s["start"], s["end"], s["text"]) for s in segments] == [
+            (s["start"], s["end"], s["text"]) for s in SEGMENTS
+        ]
+
+    def test_version_conflict(self, client, db_session, tmp_path):
+        """Edição sobre versão antiga é rejeitada sem alterar nada"""
+        video = _video(db_session, tmp_path)
+        assert self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "primeira"}).status_code == 200
+
+        response = self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "segunda"})
+        assert response.status_code == 409
+        assert "versão atual: 1" in response.json()["detail"]
+        assert self._file_segments(video)["segments"][0]["text"] == "primeira"
+
+    def test_invalid_op_rolls_back(self, client, db_session, tmp_path):
+        """Operação inválida desfaz as anteriores e não consome a versão"""
+        video = _video(db_session, tmp_path)
+
+        response = self._patch(client, video, 0,
+                               {"op": "edit", "idx": 0, "text": "mudou"},
+                               {"op": "merge", "idx": 4})
+        assert response.status_code == 400
+        db_session.refresh(video)
+        assert video.transcript_version == 0
+        page = client.get(f"/api/videos/{video.id}/transcript", params={"limit": 1}).json()
+        assert page["segments"][0]["text"] == "abertura"
+
+    def test_words_rewritten_only_when_segments_move(self, client, db_session, tmp_path):
+        """Edição de texto não regrava o arquivo de palavras; split sim"""
+        video = _video(db_session, tmp_path)
+        video.words_path = words_path_for(video.transcript_path)
+        write_words(video.words_path, [{"start": 6.0, "end": 6.5, "word": "primeiro"},
+                                       {"start": 7.5, "end": 8.0, "word": "lance"}], SEGMENTS)
+        db_session.commit()
+
+        with patch('app.services.transcript_store.write_words', wraps=write_words) as writer:
+            self._patch(client, video, 0, {"op": "edit", "idx": 1, "text": "primeiro lance!"})
+            writer.assert_not_called()
+
+            self._patch(client, video, 1, {"op": "split", "idx": 1, "at": 7.0})
+            writer.assert_called_once()
+        assert open_words(video.words_path).window()["segment"] == [1, 2]
+
+    def test_flushes_are_coalesced(self, client, db_session, tmp_path):
+        """Edição durante a gravação é gravada pela mesma task, na versão mais nova"""
+        video = _video(db_session, tmp_path)
+        calls = []
+
+        def flush_and_edit(db, flushed):
+            calls.append(flushed.transcript_version)
+            if len(calls) == 1:
+                assert self._patch(client, video, 1, {"op": "edit", "idx": 1, "text": "segunda"}).status_code == 200
+            flush_transcript(db, flushed)
+
+        with patch('app.services.transcript_store.flush_transcript', side_effect=flush_and_edit):
+            self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "primeira"})
+
+        assert calls == [1, 2]
+        transcript = self._file_segments(video)
+        assert transcript["version"] == 2
+        assert [s["text"] for s in transcript["segments"][:2]] == ["primeira", "segunda"]
+
+    def test_full_read_sees_pending_edits(self, client, db_session, tmp_path):
+        """Transcrição inteira reflete o PATCH antes do flush em background; ETag antigo não casa"""
+        video = _video(db_session, tmp_path)
+        url = f"/api/videos/{video.id}/transcript"
+        before = client.get(url)
+        assert before.headers["etag"].endswith('-v0"')
+
+        with patch('app.api.transcription.flush_transcript_task'):
+            self._patch(client, video, 0, {"op": "edit", "idx": 2, "text": "golaço"})
+        assert self._file_segments(video).get("version") is None
+
+        response = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+        assert response.status_code == 200
+        assert response.json()["version"] == 1
+        assert response.json()["segments"][2]["text"] == "golaço"
+        assert response.json()["language"] == "pt"
+        assert self._file_segments(video)["version"] == 1
+
+        assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+        with patch('app.api.transcription.flush_transcript_task'):
+            self._patch(client, video, 1, {"op": "edit", "idx": 2, "text": "gol"})
+        stale = client.get(url, headers={"If-Modified-Since": response.headers["last-modified"]})
+        assert stale.status_code == 200
+        assert stale.json()["segments"][2]["text"] == "gol"
+
+    def test_version_query_outside_global_guard(self, client, db_session, tmp_path):
+        """A versão é consultada sem segurar a trava compartilhada por todos os vídeos"""
+        video = _video(db_session, tmp_path)
+
+        def version_unguarded(db, video_id):
+            assert not transcript_store._locks_guard.locked()
+            return current_version(db, video_id)
+
+        current_version = transcript_store._current_version
+        with patch('app.services.transcript_store._current_version', side_effect=version_unguarded) as query:
+            self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "primeira"})
+
+        assert query.call_count == 2
+        assert self._file_segments(video)["version"] == 1
+        assert transcript_store._flushing == {}
+
+    def test_put_bumps_version(self, client, db_session, tmp_path):
+        """PUT substitui tudo e também avança a versão"""
+        video = _video(db_session, tmp_path)
+        response = client.put(f"/api/videos/{video.id}/transcript", json={"version": 0, "segments": SEGMENTS[:2]})
+        assert response.json()["version"] == 1
+
+        assert self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "x"}).status_code == 409
+        assert self._patch(client, video, 1, {"op": "edit", "idx": 0, "text": "x"}).status_code == 200
+
+    def test_put_writes_under_lock_and_wins_over_pending_flush(self, client, db_session, tmp_path):
+        """PUT grava sob a trava do vídeo; flush de um PATCH anterior não desfaz o PUT"""
+        video = _video(db_session, tmp_path)
+        with patch('app.api.transcription.flush_transcript_task') as pending:
+            self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "editado"})
+
+        def write_locked(path, data):
+            assert transcript_store._locks[video.id].locked()
+            write_transcript_json(path, data)
+
+        with patch('app.api.transcription.write_transcript_json', side_effect=write_locked) as writer:
+            response = client.put(f"/api/videos/{video.id}/transcript", json={"version": 1, "segments": SEGMENTS[:2]})
+        assert response.json()["version"] == 2
+        writer.assert_called_once()
+
+        transcript_store.flush_transcript_task(*pending.call_args.args)
+        transcript = self._file_segments(video)
+        assert transcript["version"] == 2
+        assert [s["text"] for s in transcript["segments"]] == ["abertura", "primeiro lance"]
+
+    def test_put_requires_current_version(self, client, db_session, tmp_path):
+        """PUT sem versão é inválido; sobre versão antiga é rejeitado sem gravar"""
+        video = _video(db_session, tmp_path)
+        url = f"/api/videos/{video.id}/transcript"
+        assert client.put(url, json={"segments": SEGMENTS[:1]}).status_code == 422
+
+        assert self._patch(client, video, 0, {"op": "edit", "idx": 0, "text": "editado"}).status_code == 200
+        response = client.put(url, json={"version": 0, "segments": SEGMENTS[:1]})
+        assert response.status_code == 409
+        assert "versão atual: 1" in response.json()["detail"]
+        assert len(self._file_segments(video)["segments"]) == 5
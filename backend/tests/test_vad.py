@@ -0,0 +1,222 @@
+import json
+import sys
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.models.stage_run import StageRun, StageRunStatus, PipelineStage
+from app.services.pcm import write_pcm
+from app.services.vad import (
+    normalize_intervals, mask_to_intervals, intersect_intervals, save_intervals, SpeechTimeline, detect_speech_task, JOIN_GAP_SECONDS
+)
+
+SAMPLE_RATE = 16000
+
+def _tone(seconds, freq=440.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+def _noise(seconds, level=0.001):
+    return np.random.default_rng(0).normal(0, level, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+class TestSpeechIntervals:
+    """Testes para a normalização dos intervalos de fala"""
+
+    def test_pads_merges_and_drops_short(self):
+        """Margem de 0.2s, pausas curtas unidas, trechos curtos descartados"""
+        intervals = normalize_intervals([(5.0, 6.0), (1.0, 2.0), (2.3, 3.0), (9.0, 9.01)], duration=20.0)
+
+        np.testing.assert_allclose(intervals, [[0.8, 3.2], [4.8, 6.2]])
+
+    def test_clamps_to_duration(self):
+        """Margem não passa do início nem do fim do áudio"""
+        intervals = normalize_intervals([(0.1, 9.95)], duration=10.0)
+        np.testing.assert_allclose(intervals, [[0.0, 10.0]])
+
+    def test_empty(self):
+        """Sem fala retorna array N x 2 vazio"""
+        assert normalize_intervals([], duration=10.0).shape == (0, 2)
+
+    def test_mask_to_intervals(self):
+        """Quadros consecutivos de fala viram intervalos em segundos"""
+        mask = np.array([0, 1, 1, 0, 0, 1, 1, 1], dtype=np.uint8)
+        assert mask_to_intervals(mask, frame_rate=10) == [(0.1, 0.3), (0.5, 0.8)]
+
+    def test_intersect_intervals(self):
+        """Interseção de trechos de fala com trechos a transcrever"""
+        result = intersect_intervals([[1.0, 4.0], [6.0, 9.0]], [(0.0, 2.0), (3.0, 7.0)])
+        np.testing.assert_allclose(result, [[1.0, 2.0], [3.0, 4.0], [6.0, 7.0]])
+
+class TestSpeechTimeline:
+    """Testes para a conversão entre áudio concatenado e tempo original"""
+
+    def test_build_audio_concatenates_speech_with_gaps(self):
+        """Áudio concatenado tem os trechos de fala e o silêncio de junção"""
+        samples = np.arange(10 * SAMPLE_RATE, dtype=np.float32)
+        timeline = SpeechTimeline(np.array([[1.0, 2.0], [5.0, 5.5]]), SAMPLE_RATE)
+        audio = timeline.build_audio(samples)
+
+        assert len(audio) == int((1.5 + JOIN_GAP_SECONDS) * SAMPLE_RATE)
+        assert timeline.duration == pytest.approx(1.5 + JOIN_GAP_SECONDS)
+        assert audio[0] == SAMPLE_RATE
+        second = int((1.0 + JOIN_GAP_SECONDS) * SAMPLE_RATE)
+        assert audio[second] == 5 * SAMPLE_RATE
+        assert not audio[SAMPLE_RATE:second].any()
+
+    def test_batches_limit_concatenated_audio(self):
+        """Lotes agrupam trechos consecutivos até o limite; trecho único é fatia sem cópia"""
+        samples = np.arange(20 * SAMPLE_RATE, dtype=np.float32)
+        timeline = SpeechTimeline(np.array([[1.0, 2.0], [3.0, 4.0], [6.0, 12.0], [13.0, 14.0]]), SAMPLE_RATE)
+
+        assert timeline.batches(max_seconds=3.0) == [(0, 2), (2, 3), (3, 4)]
+        assert timeline.batches() == [(0, 4)]
+
+        batch = timeline.build_audio(samples, 2, 3)
+        assert len(batch) == 6 * SAMPLE_RATE
+        assert np.shares_memory(batch, samples)
+        pair = timeline.build_audio(samples, 0, 2)
+        np.testing.assert_array_equal(pair, timeline.build_audio(samples)[:len(pair)])
+
+    def test_to_original(self):
+        """Tempos voltam para o vídeo; junção é presa ao trecho vizinho"""
+        timeline = SpeechTimeline(np.array([[1.0, 2.0], [5.0, 5.5]]), SAMPLE_RATE)
+
+        assert timeline.to_original(0.5) == pytest.approx(1.5)
+        assert timeline.to_original(1.0 + JOIN_GAP_SECONDS + 0.25) == pytest.approx(5.25)
+        # Dentro do silêncio de junção
+        assert timeline.to_original(1.1) == pytest.approx(2.0)
+        # Fim exatamente no início do segundo trecho pertence ao primeiro
+        assert timeline.to_original(1.0 + JOIN_GAP_SECONDS, is_end=True) == pytest.approx(2.0)
+        assert timeline.to_original(1.0 + JOIN_GAP_SECONDS) == pytest.approx(5.0)
+
+class TestSpeechDetection:
+    """Testes para a task de VAD, endpoint e uso na transcrição"""
+
+    def _video(self, db_session, tmp_path, youtube_id="vad123"):
+        pcm_path = str(tmp_path / f"{youtube_id}.f32")
+        write_pcm(pcm_path, np.concatenate([_noise(3.0), _tone(2.0) + _noise(2.0), _noise(3.0)]))
+        video = Video(youtube_id=youtube_id, title="VAD", duration_seconds=8,
+                      status=VideoStatus.audio_extracted, pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+        return video
+
+    def test_task_with_energy_fallback_and_endpoint(self, client, db_session, tmp_path):
+        """Sem Silero, usa a máscara de energia; endpoint devolve os trechos"""
+        video = self._video(db_session, tmp_path)
+
+        with patch('app.services.vad.silero_intervals', side_effect=ImportError), \
+             patch('app.services.vad.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            detect_speech_task(video.id)
+
+        db_session.refresh(video)
+        assert video.vad_path.endswith("vad123.speech.npy")
+        run = db_session.query(StageRun).filter(StageRun.video_id == video.id).one()
+        assert run.stage == PipelineStage.vad
+        assert run.status == StageRunStatus.succeeded
+
+        response = client.get(f"/api/videos/{video.id}/speech-intervals")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["intervals"]) == 1
+        start, end = data["intervals"][0]
+        assert start == pytest.approx(2.8, abs=0.15)
+        assert end == pytest.approx(5.2, abs=0.15)
+        assert data["speech_ratio"] == pytest.approx(0.3, abs=0.03)
+
+    def test_endpoints_without_vad(self, client, db_session):
+        """Sem intervalos retorna 404; sem PCM não agenda o VAD"""
+        video = Video(youtube_id="vad456", title="VAD", duration_seconds=8, status=VideoStatus.audio_extracted)
+        db_session.add(video)
+        db_session.commit()
+
+        assert client.get(f"/api/videos/{video.id}/speech-intervals").status_code == 404
+        assert client.post(f"/api/videos/{video.id}/vad").status_code == 400
+
+    def test_transcription_uses_speech_only_and_remaps(self, db_session, tmp_path):
+        """Whisper recebe só a fala, sem VAD interno, e os tempos voltam ao vídeo"""
+        video = self._video(db_session, tmp_path, youtube_id="vad789")
+        video.audio_path = str(tmp_path / "vad789.mp3")
+        open(video.audio_path, "wb").close()
+        video.vad_path = str(tmp_path / "vad789.speech.npy")
+        save_intervals(video.vad_path, np.array([[1.0, 2.0], [5.0, 6.0]]))
+        db_session.commit()
+
+        model = MagicMock()
+        confidence = dict(avg_logprob=-0.2, no_speech_prob=0.01, compression_ratio=1.2)
+        segments = [
+            SimpleNamespace(start=0.0, end=1.0, text=" primeiro ", **confidence),
+            SimpleNamespace(start=1.0 + JOIN_GAP_SECONDS, end=2.0 + JOIN_GAP_SECONDS, text="segundo", **confidence),
+        ]
+        model.transcribe.return_value = (iter(segments), SimpleNamespace(
+            language="pt", language_probability=0.99, duration=2.0 + JOIN_GAP_SECONDS
+        ))
+        fake_module = SimpleNamespace(WhisperModel=MagicMock(return_value=model))
+
+        from app.services.transcription import transcribe_audio_task
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        audio, = model.transcribe.call_args.args
+        assert len(audio) == int((2.0 + JOIN_GAP_SECONDS) * SAMPLE_RATE)
+        assert model.transcribe.call_args.kwargs["vad_filter"] is False
+
+        db_session.refresh(video)
+        assert video.status == VideoStatus.transcribed
+        with open(video.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert [(s["start"], s["end"]) for s in transcript["segments"]] == [
+            pytest.approx((1.0, 2.0)), pytest.approx((5.0, 6.0))
+        ]
+        assert transcript["duration"] == pytest.approx(8.0)
+        assert transcript["speech_seconds"] == pytest.approx(2.0 + JOIN_GAP_SECONDS)
+
+    def test_transcription_in_batches(self, db_session, tmp_path):
+        """Cada lote vai ao Whisper separado e os tempos voltam ao vídeo"""
+        video = self._video(db_session, tmp_path, youtube_id="vadlote")
+        video.vad_path = str(tmp_path / "vadlote.speech.npy")
+        save_intervals(video.vad_path, np.array([[1.0, 2.0], [5.0, 6.0]]))
+        db_session.commit()
+
+        model = MagicMock()
+        confidence = dict(avg_logprob=-0.2, no_speech_prob=0.01, compression_ratio=1.2)
+        model.transcribe.side_effect = lambda audio, **kwargs: (
+            iter([SimpleNamespace(start=0.25, end=0.75, text="fala", **confidence)]),
+            SimpleNamespace(language="pt", language_probability=0.99, duration=len(audio) / SAMPLE_RATE)
+        )
+        fake_module = SimpleNamespace(WhisperModel=MagicMock(return_value=model))
+
+        from app.services.transcription import whisper_transcript
+        batches = SpeechTimeline.batches
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch.object(SpeechTimeline, 'batches', lambda timeline: batches(timeline, max_seconds=1.5)), \
+             patch('app.services.transcription.update_stage_progress'):
+            result = whisper_transcript(db_session, None, video)
+
+        assert [len(call.args[0]) for call in model.transcribe.call_args_list] == [SAMPLE_RATE, SAMPLE_RATE]
+        assert fake_module.WhisperModel.call_count == 1
+        assert [(s["start"], s["end"]) for s in result["segments"]] == [
+            pytest.approx((1.25, 1.75)), pytest.approx((5.25, 5.75))
+        ]
+
+    def test_transcription_without_speech_skips_whisper(self, db_session, tmp_path):
+        """Sem trechos de fala o Whisper não recebe áudio vazio"""
+        video = self._video(db_session, tmp_path, youtube_id="vadmudo")
+        video.vad_path = str(tmp_path / "vadmudo.speech.npy")
+        save_intervals(video.vad_path, np.zeros((0, 2)))
+        db_session.commit()
+
+        fake_module = SimpleNamespace(WhisperModel=MagicMock())
+        from app.services.transcription import whisper_transcript
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch('app.services.transcription.update_stage_progress'):
+            result = whisper_transcript(db_session, None, video)
+
+        fake_module.WhisperModel.assert_not_called()
+        assert result["segments"] == [] and result["speech_seconds"] == 0.0
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from app.models.video import Video, VideoStatus
+from app.services.pcm import write_pcm
+from app.services.waveform import compute_peaks, build_waveform, load_waveform, waveform_payload, MAX_WAVEFORM_PIXELS
+
+def _samples(seconds=2.0, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+class TestWaveform:
+    """Testes para os picos multirresolução da waveform"""
+
+    def test_levels_have_expected_lengths(self):
+        """Cada nível tem ceil(amostras / spp) pixels"""
+        samples = _samples(2.0)  # 32000 amostras
+        peaks = compute_peaks(samples)
+
+        assert len(peaks[256]) == 125
+        assert len(peaks[1024]) == 32  # 31.25 -> último pixel parcial
+        assert len(peaks[4096]) == 8
+        assert len(peaks[65536]) == 1
+        assert peaks[256].dtype == np.int8
+
+    def test_coarse_levels_match_direct_computation(self):
+        """Níveis derivados batem com o cálculo direto sobre as amostras"""
+        rng = np.random.default_rng(0)
+        samples = rng.uniform(-1, 1, 50000).astype(np.float32)
+        peaks = compute_peaks(samples)
+
+        direct = samples[:4096 * 12].reshape(-1, 4096)
+        expected_min = np.round(direct.min(axis=1) * 127).astype(np.int8)
+        expected_max = np.round(direct.max(axis=1) * 127).astype(np.int8)
+        np.testing.assert_array_equal(peaks[4096][:12, 0], expected_min)
+        np.testing.assert_array_equal(peaks[4096][:12, 1], expected_max)
+
+    def test_build_and_load_roundtrip(self, tmp_path):
+        """Arquivo .npz guarda todos os níveis e o sample rate"""
+        pcm_path = str(tmp_path / "a.f32")
+        write_pcm(pcm_path, _samples(1.0))
+        peaks = build_waveform(pcm_path, str(tmp_path / "a.peaks.npz"))
+
+        sample_rate, loaded = load_waveform(str(tmp_path / "a.peaks.npz"))
+        assert sample_rate == 16000
+        for level in peaks:
+            np.testing.assert_array_equal(loaded[level], peaks[level])
+
+    def test_payload_window(self):
+        """Janela start/end recorta os pixels correspondentes"""
+        peaks = np.arange(200, dtype=np.int8).reshape(100, 2)
+        payload = waveform_payload(peaks, 1600, 16000, start=1.0, end=2.0)  # 0.1s por pixel
+
+        assert payload["length"] == 10
+        assert payload["start"] == pytest.approx(1.0)
+        assert payload["data"][:2] == [20, 21]
+        assert payload["bits"] == 8
+
+    def test_waveform_endpoint_builds_on_demand(self, client, db_session, tmp_path):
+        """Sem picos salvos, o endpoint gera a partir do PCM e depois revalida com 304"""
+        pcm_path = str(tmp_path / "wf.f32")
+        write_pcm(pcm_path, _samples(2.0))
+        video = Video(youtube_id="wf123", title="Waveform", duration_seconds=2,
+                      status=VideoStatus.audio_extracted, pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        response = client.get(f"/api/videos/{video.id}/waveform?zoom=4096")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["samples_per_pixel"] == 4096
+        assert data["length"] == 8
+        assert len(data["data"]) == 16
+        assert max(data["data"]) == 64  # 0.5 * 127
+
+        db_session.refresh(video)
+        assert video.waveform_path.endswith("wf.peaks.npz")
+
+        response = client.get(
+            f"/api/videos/{video.id}/waveform?zoom=4096",
+            headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+    def test_waveform_endpoint_rejects_unknown_zoom(self, client, db_session, tmp_path):
+        """zoom fora dos níveis pré-calculados retorna 400"""
+        video = Video(youtube_id="wf456", title="Waveform", duration_seconds=2, status=VideoStatus.audio_extracted)
+        db_session.add(video)
+        db_session.commit()
+
+        assert client.get(f"/api/videos/{video.id}/waveform?zoom=300").status_code == 400
+
+    def test_old_file_derives_overview_level(self, tmp_path):
+        """Arquivo sem o nível de visão geral o deriva do nível anterior"""
+        peaks = compute_peaks(_samples(10.0))
+        path = str(tmp_path / "old.npz")
+        np.savez(path, sample_rate=np.int32(16000), **{f"peaks_{level}": peaks[level] for level in (256, 1024, 4096)})
+
+        _, loaded = load_waveform(path)
+        np.testing.assert_array_equal(loaded[65536], peaks[65536])
+
+    def test_waveform_endpoint_defaults_to_overview(self, client, db_session, tmp_path):
+        """Sem zoom vem a visão geral; nível fino sem janela é recusado se grande demais"""
+        pcm_path = str(tmp_path / "long.f32")
+        write_pcm(pcm_path, np.zeros(256 * (MAX_WAVEFORM_PIXELS + 1), dtype=np.float32))
+        video = Video(youtube_id="wf789", title="Waveform", duration_seconds=263,
+                      status=VideoStatus.audio_extracted, pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        data = client.get(f"/api/videos/{video.id}/waveform").json()
+        assert data["samples_per_pixel"] == 65536
+        assert data["length"] == 65
+
+        assert client.get(f"/api/videos/{video.id}/waveform?zoom=256").status_code == 400
+        window = client.get(f"/api/videos/{video.id}/waveform?zoom=256&start=10&end=20")
+        assert window.status_code == 200
+        assert window.json()["length"] == 625
@@ -0,0 +1,152 @@
+import json
+import sys
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.pcm import write_pcm
+from app.services.whisper_tiers import is_low_confidence, redecode_windows, splice_segments, tiered_transcribe, merge_tier_stats
+
+SAMPLE_RATE = 16000
+
+def _segment(start, end, text="ok", avg_logprob=-0.2, no_speech_prob=0.01, compression_ratio=1.2):
+    return {"start": start, "end": end, "text": text, "avg_logprob": avg_logprob,
+            "no_speech_prob": no_speech_prob, "compression_ratio": compression_ratio}
+
+def _whisper_segment(start, end, text, avg_logprob=-0.2, no_speech_prob=0.01, compression_ratio=1.2):
+    return SimpleNamespace(start=start, end=end, text=text, avg_logprob=avg_logprob,
+                           no_speech_prob=no_speech_prob, compression_ratio=compression_ratio)
+
+def _model(*runs):
+    """Modelo falso: cada chamada de transcribe devolve a próxima lista de segmentos"""
+    model = MagicMock()
+    model.transcribe.side_effect = [
+        (iter(segments), SimpleNamespace(language="pt", language_probability=0.95, duration=duration))
+        for duration, segments in runs
+    ]
+    return model
+
+class TestConfidence:
+    """Testes para a seleção de trechos a re-decodificar"""
+
+    def test_low_confidence_rules(self):
+        """logprob baixo ou texto repetitivo re-decodificam; silêncio provável não"""
+        assert not is_low_confidence(_segment(0, 1))
+        assert is_low_confidence(_segment(0, 1, avg_logprob=-0.9))
+        assert is_low_confidence(_segment(0, 1, compression_ratio=3.1))
+        assert not is_low_confidence(_segment(0, 1, avg_logprob=-1.3, no_speech_prob=0.8))
+
+    def test_windows_pad_without_invading_neighbors(self):
+        """Margem não invade segmentos mantidos; trechos próximos são unidos"""
+        segments = [
+            _segment(0.0, 2.0),
+            _segment(2.1, 4.0, avg_logprob=-1.0),
+            _segment(4.5, 6.0, avg_logprob=-1.0),
+            _segment(6.0, 8.0),
+            _segment(12.0, 13.0, compression_ratio=2.9),
+        ]
+
+        assert redecode_windows(segments, duration=13.1) == [(2.0, 6.0), pytest.approx((11.7, 13.1))]
+
+    def test_splice_replaces_segments_inside_window(self):
+        """Segmentos com centro na janela são trocados e a ordem é mantida"""
+        segments = [_segment(0, 2, "a"), _segment(2, 4, "b"), _segment(4, 6, "c")]
+        spliced = splice_segments(segments, (1.8, 4.2), [_segment(2.0, 3.0, "b1"), _segment(3.0, 4.0, "b2")])
+
+        assert [s["text"] for s in spliced] == ["a", "b1", "b2", "c"]
+
+class TestTieredTranscription:
+    """Testes para os dois passes do Whisper"""
+
+    def test_only_low_confidence_audio_is_redecoded(self):
+        """Modelo maior recebe só a janela ruim e o resultado é emendado no lugar"""
+        audio = np.zeros(10 * SAMPLE_RATE, dtype=np.float32)
+        fast = _model((10.0, [
+            _whisper_segment(0.0, 4.0, "tudo certo"),
+            _whisper_segment(4.0, 6.0, "ruim", avg_logprob=-1.2),
+            _whisper_segment(6.0, 10.0, "tudo certo de novo"),
+        ]))
+        accurate = _model((2.0, [_whisper_segment(0.0, 2.0, "corrigido", avg_logprob=-0.3)]))
+        load_accurate = MagicMock(return_value=accurate)
+
+        segments, info, stats = tiered_transcribe(fast, load_accurate, audio, "base", "small")
+
+        assert [s["text"] for s in segments] == ["tudo certo", "corrigido", "tudo certo de novo"]
+        assert segments[1]["start"] == pytest.approx(4.0)
+        assert segments[1]["model"] == "small"
+        assert segments[0]["model"] == "base"
+        chunk = accurate.transcribe.call_args.args[0]
+        assert len(chunk) == 2 * SAMPLE_RATE
+        assert accurate.transcribe.call_args.kwargs["beam_size"] == 5
+        assert fast.transcribe.call_args.kwargs["beam_size"] == 1
+        assert stats["redecoded_seconds"] == pytest.approx(2.0)
+        assert stats["redecoded_ratio"] == pytest.approx(0.2)
+        assert stats["low_confidence_segments"] == 1
+
+    def test_clean_audio_never_loads_larger_model(self):
+        """Sem trechos ruins o modelo maior nem é carregado"""
+        audio = np.zeros(5 * SAMPLE_RATE, dtype=np.float32)
+        fast = _model((5.0, [_whisper_segment(0.0, 5.0, "limpo")]))
+        load_accurate = MagicMock()
+
+        segments, _, stats = tiered_transcribe(fast, load_accurate, audio, "base", "small")
+
+        load_accurate.assert_not_called()
+        assert len(segments) == 1
+        assert stats["redecoded_seconds"] == 0
+        assert stats["speedup"] is None
+
+    def test_merge_stats_baseline_covers_every_batch(self):
+        """Lote sem re-decodificação entra na linha de base pela velocidade dos outros"""
+        def stats(redecoded, accurate, load, fast, baseline):
+            return {"fast_model": "base", "model": "small", "low_confidence_segments": 1 if redecoded else 0,
+                    "redecoded_windows": 1 if redecoded else 0, "redecoded_seconds": redecoded,
+                    "redecoded_ratio": 0.0, "fast_pass_seconds": fast, "model_load_seconds": load,
+                    "accurate_pass_seconds": accurate, "baseline_estimate_seconds": baseline,
+                    "speedup": None, "elapsed_seconds": fast + load + accurate}
+
+        # 600 s com 60 s re-decodificados em 30 s (0,5 s por s de áudio) + 600 s limpos
+        merged = merge_tier_stats([stats(60.0, 30.0, 5.0, 40.0, 305.0), stats(0.0, 0.0, 0.0, 40.0, None)], [600.0, 600.0])
+
+        assert merged["baseline_estimate_seconds"] == pytest.approx(5.0 + 0.5 * 1200.0)
+        assert merged["speedup"] == pytest.approx(605.0 / 115.0, abs=0.01)
+        assert merged["redecoded_ratio"] == pytest.approx(0.05)
+
+        clean = merge_tier_stats([stats(0.0, 0.0, 0.0, 40.0, None)] * 2, [600.0, 600.0])
+        assert clean["baseline_estimate_seconds"] is None
+        assert clean["speedup"] is None
+
+    def test_task_records_tiering_stats(self, db_session, tmp_path):
+        """Modo tiered grava as estatísticas na transcrição"""
+        pcm_path = str(tmp_path / "tier123.f32")
+        write_pcm(pcm_path, np.zeros(10 * SAMPLE_RATE, dtype=np.float32))
+        audio_path = tmp_path / "tier123.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id="tier123", title="Níveis", duration_seconds=10, status=VideoStatus.transcribing,
+                      audio_path=str(audio_path), pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        fast = _model((10.0, [_whisper_segment(0.0, 5.0, "bom"), _whisper_segment(5.0, 10.0, "ruim", avg_logprob=-2.0)]))
+        accurate = _model((5.0, [_whisper_segment(0.0, 5.0, "melhor")]))
+        models = {"base": fast, "small": accurate}
+        fake_module = SimpleNamespace(WhisperModel=MagicMock(side_effect=lambda size, **kwargs: models[size]))
+
+        from app.services.transcription import transcribe_audio_task
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch('app.services.transcription.settings.TRANSCRIPTION_MODE', "tiered"), \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        db_session.refresh(video)
+        assert video.status == VideoStatus.transcribed
+        with open(video.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert [s["text"] for s in transcript["segments"]] == ["bom", "melhor"]
+        assert transcript["tiering"]["fast_model"] == "base"
+        assert transcript["tiering"]["redecoded_seconds"] == pytest.approx(5.0)
+        assert transcript["model"] == "small"
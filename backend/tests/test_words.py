@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.models.video import Video, VideoStatus
+from app.services.pcm import write_pcm
+from app.services.whisper_tiers import segment_dict
+from app.services.words import flatten_words, write_words, open_words, words_path_for, WordsFormatError
+
+SAMPLE_RATE = 16000
+
+SEGMENTS = [{"start": 0.0, "end": 2.0, "text": "olá mundo"}, {"start": 3.0, "end": 5.0, "text": "ação rápida"}]
+WORDS = [
+    {"start": 0.0, "end": 0.8, "word": "olá", "probability": 0.91},
+    {"start": 0.9, "end": 2.0, "word": "mundo", "probability": 0.85},
+    {"start": 3.0, "end": 3.9, "word": "ação", "probability": 0.77},
+    {"start": 4.0, "end": 5.0, "word": "rápida", "probability": 0.99},
+]
+
+class TestWordsFile:
+    """Testes para o arquivo colunar de timestamps por palavra"""
+
+    def test_roundtrip(self, tmp_path):
+        """Palavras gravadas voltam iguais, com acentos e índice do segmento"""
+        path = str(tmp_path / "v.words")
+        assert write_words(path, list(reversed(WORDS)), SEGMENTS) == 4
+
+        index = open_words(path)
+        assert index.count == 4
+        assert index.words() == WORDS
+        assert index.window()["segment"] == [0, 0, 1, 1]
+        assert not os.path.exists(f"{path}.part")
+
+    def test_window(self, tmp_path):
+        """Janela devolve só as palavras que se sobrepõem ao intervalo"""
+        path = str(tmp_path / "v.words")
+        write_words(path, WORDS, SEGMENTS)
+
+        window = open_words(path).window(1.0, 3.5)
+        assert window["word"] == ["mundo", "ação"]
+        assert window["start"] == [0.9, 3.0]
+        assert open_words(path).window(10.0, 20.0)["word"] == []
+
+    def test_empty_and_invalid(self, tmp_path):
+        """Arquivo sem palavras abre vazio; arquivo estranho é rejeitado"""
+        path = str(tmp_path / "empty.words")
+        write_words(path, [], SEGMENTS)
+        assert open_words(path).words() == []
+
+        bad = tmp_path / "bad.words"
+        bad.write_bytes(b"\x00" * 64)
+        with pytest.raises(WordsFormatError):
+            open_words(str(bad))
+
+    def test_flatten_words(self):
+        """Palavras aninhadas saem dos segmentos"""
+        segments = [{**SEGMENTS[0], "words": WORDS[:2]}, {**SEGMENTS[1], "words": WORDS[2:]}, {"start": 6.0, "end": 7.0, "text": "x"}]
+        assert flatten_words(segments) == WORDS
+        assert all("words" not in segment for segment in segments)
+
+    def test_segment_dict_words(self):
+        """Palavras do faster-whisper viram dicts com texto sem espaço"""
+        segment = SimpleNamespace(start=0.0, end=1.0, text=" oi gente", avg_logprob=-0.1, no_speech_prob=0.0,
+                                  compression_ratio=1.0,
+                                  words=[SimpleNamespace(start=0.0, end=0.4, word=" oi", probability=0.98765),
+                                         SimpleNamespace(start=0.5, end=1.0, word=" gente", probability=0.5)])
+        result = segment_dict(segment)
+        assert result["words"] == [
+            {"start": 0.0, "end": 0.4, "word": "oi", "probability": 0.988},
+            {"start": 0.5, "end": 1.0, "word": "gente", "probability": 0.5},
+        ]
+
+    def test_words_path_for(self):
+        assert words_path_for("/data/transcripts/abc.json") == "/data/transcripts/abc.words"
+
+class TestWordsTask:
+    """Testes para a gravação das palavras pela transcrição e o endpoint"""
+
+    def test_task_writes_sidecar(self, client, db_session, tmp_path):
+        """JSON da transcrição fica sem palavras; elas vão para o arquivo colunar"""
+        pcm_path = str(tmp_path / "words123.f32")
+        write_pcm(pcm_path, np.zeros(4 * SAMPLE_RATE, dtype=np.float32))
+        audio_path = tmp_path / "words123.mp3"
+        audio_path.write_bytes(b"mp3")
+        video = Video(youtube_id="words123", title="Palavras", duration_seconds=4, status=VideoStatus.transcribing,
+                      audio_path=str(audio_path), pcm_path=pcm_path)
+        db_session.add(video)
+        db_session.commit()
+
+        model = MagicMock()
+        model.transcribe.return_value = (
+            iter([SimpleNamespace(start=1.0, end=2.0, text=" bom dia", avg_logprob=-0.1, no_speech_prob=0.0,
+                                  compression_ratio=1.0,
+                                  words=[SimpleNamespace(start=1.0, end=1.4, word=" bom", probability=0.9),
+                                         SimpleNamespace(start=1.5, end=2.0, word=" dia", probability=0.8)])]),
+            SimpleNamespace(language="pt", language_probability=0.9, duration=4.0)
+        )
+        fake_module = SimpleNamespace(WhisperModel=MagicMock(return_value=model))
+
+        from app.services.transcription import transcribe_audio_task
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), \
+             patch('app.services.transcription.fetch_captions', return_value=None), \
+             patch('app.services.transcription.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcript_cache.settings.TRANSCRIPTS_PATH', str(tmp_path)), \
+             patch('app.services.transcription.SessionLocal', return_value=db_session), \
+             patch.object(db_session, 'close'):
+            transcribe_audio_task(video.id)
+
+        assert model.transcribe.call_args.kwargs["word_timestamps"] is True
+        db_session.refresh(video)
+        assert video.words_path == words_path_for(video.transcript_path)
+        with open(video.transcript_path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        assert "words" not in transcript
+        assert all("words" not in segment for segment in transcript["segments"])
+        assert [word["word"] for word in open_words(video.words_path).words()] == ["bom", "dia"]
+
+        response = client.get(f"/api/videos/{video.id}/words", params={"start": 1.45})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 1
+        assert data["word"] == ["dia"]
+        assert data["segment"] == [0]
+
+        cached = client.get(f"/api/videos/{video.id}/words", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+
+    def test_words_not_found(self, client, db_session):
+        """Sem arquivo de palavras, 404"""
+        video = Video(youtube_id="nowords1", title="Sem palavras", duration_seconds=4, status=VideoStatus.transcribed)
+        db_session.add(video)
+        db_session.commit()
+
+        assert client.get(f"/api/videos/{video.id}/words").status_code == 404
@@ -19,6 +19,7 @@ interface Video {
   transcription_progress?: number;
   transcription_error?: string;
   transcription_reviewed_at?: string;
+  transcript_version?: number;
 }
 
 interface TranscriptSegment {
@@ -271,10 +272,18 @@ export default function TranscribePage() {
     
     // Salva no backend
     try {
-      await videoService.updateTranscript(video!.id, { segments: updatedTranscript });
+      const { version } = await videoService.updateTranscript(video!.id, {
+        version: video!.transcript_version ?? 0,
+        segments: updatedTranscript,
+      });
+      setVideo({ ...video!, transcript_version: version });
       toast.success('Texto salvo com sucesso!');
-    } catch (error) {
-      toast.error('Erro ao salvar. A edição só está local.');
+    } catch (error: any) {
+      if (error.response?.status === 409) {
+        toast.error('A transcrição foi alterada em outra edição. Recarregue a página.');
+      } else {
+        toast.error('Erro ao salvar. A edição só está local.');
+      }
     }
   };
 
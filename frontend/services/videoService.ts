@@ -101,8 +101,9 @@ export const videoService = {
     return data;
   },
 
-  async updateTranscript(id: number, transcript: { segments: Array<{ start: number; end: number; text: string }> }): Promise<void> {
-    await api.put(`/videos/${id}/transcript`, transcript);
+  async updateTranscript(id: number, transcript: { version: number; segments: Array<{ start: number; end: number; text: string }> }): Promise<{ version: number }> {
+    const { data } = await api.put(`/videos/${id}/transcript`, transcript);
+    return data;
   },
 
   async reviewTranscription(id: number): Promise<Video> {